@@ -7,6 +7,7 @@ import sys
 # Añadir el directorio raíz al path para poder importar src
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from src.database.migrations import initialize_database_and_migrate
 from src.services.contact_service import ContactService
 
 def add_mock_contacts():
@@ -33,4 +34,6 @@ def add_mock_contacts():
         print(f"Error creando contactos: {e}")
 
 if __name__ == "__main__":
+    # Las tablas ya no se crean al importar los modelos
+    initialize_database_and_migrate()
     add_mock_contacts()
@@ -0,0 +1,178 @@
+"""
+Benchmark de arranque en frío para CRM Personal
+
+Mide, en procesos nuevos de Python:
+- el coste de importación por módulo (python -X importtime) al importar src.main
+- el tiempo hasta el primer frame: importar src.main, inicializar la base de
+  datos y construir la vista principal con una página sin ventana
+
+Sale con código 1 si se supera algún presupuesto, para detectar regresiones.
+
+Uso:
+    python scripts/bench_startup.py
+    python scripts/bench_startup.py --runs 5 --import-budget-ms 800 --frame-budget-ms 2000
+    python scripts/bench_startup.py --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+
+# Módulos que no deben cargarse al arrancar (solo bajo demanda)
+LAZY_MODULES = ["pandas", "requests", "src.ui.screens.campaign_screen", "src.ui.screens.report_screen"]
+
+# Código del proceso hijo que mide el primer frame
+FIRST_FRAME_PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+import src.main
+imported = time.perf_counter()
+from src.database.migrations import initialize_database_and_migrate
+initialize_database_and_migrate()
+initialized = time.perf_counter()
+
+class HeadlessPage:
+    # Lo mínimo de ft.Page que usan app.main y la pantalla principal
+    def __init__(self):
+        self.route = "/"
+        self.views = []
+        self.on_route_change = None
+        self.on_view_pop = None
+    def go(self, route):
+        self.route = route
+        self.on_route_change(route)
+    def update(self):
+        pass
+
+from src.ui.app import main
+page = HeadlessPage()
+main(page)
+framed = time.perf_counter()
+assert page.views, "no se construyó ninguna vista"
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "init_db_ms": (initialized - imported) * 1000,
+    "first_view_ms": (framed - initialized) * 1000,
+    "first_frame_ms": (framed - started) * 1000,
+    "lazy_loaded": sorted(m for m in %(lazy)r if m in sys.modules),
+}))
+"""
+
+
+def child_env(database_path, extra=None):
+    """Entorno del proceso hijo: base de datos temporal y logs solo de avisos"""
+    env = dict(os.environ)
+    env["CRM_DATABASE_PATH"] = database_path
+    env["CRM_CSV_IMPORT_PATH"] = os.path.join(os.path.dirname(database_path), "no-import.csv")
+    env["CRM_LOG_LEVEL"] = "WARNING"
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT_DIR), env.get("PYTHONPATH")]))
+    env.update(extra or {})
+    return env
+
+
+def run_child(args, env):
+    """Ejecuta un proceso hijo y muestra su salida de error si falla"""
+    result = subprocess.run(args, cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"El proceso de medición falló (código {result.returncode})")
+    return result
+
+
+def measure_import_costs(env):
+    """Devuelve {módulo: (propio_us, acumulado_us)} según python -X importtime"""
+    result = run_child([sys.executable, "-X", "importtime", "-c", "import src.main"], env)
+    costs = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        costs[module.strip()] = (int(self_us), int(cumulative_us))
+    return costs
+
+
+def measure_first_frame(env):
+    """Ejecuta la sonda del primer frame en un proceso nuevo"""
+    result = run_child([sys.executable, "-c", FIRST_FRAME_PROBE % {"lazy": LAZY_MODULES}], env)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(runs, top):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = child_env(os.path.join(tmpdir, "bench.db"))
+
+        # Primera ejecución: crea y migra la base de datos (no se mide)
+        measure_first_frame(env)
+
+        frames = [measure_first_frame(env) for _ in range(runs)]
+        costs = measure_import_costs(env)
+
+    slowest = sorted(costs.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    return {
+        "runs": runs,
+        "import_ms": statistics.median(f["import_ms"] for f in frames),
+        "init_db_ms": statistics.median(f["init_db_ms"] for f in frames),
+        "first_view_ms": statistics.median(f["first_view_ms"] for f in frames),
+        "first_frame_ms": statistics.median(f["first_frame_ms"] for f in frames),
+        "src_main_import_us": costs.get("src.main", (0, 0))[1],
+        "lazy_loaded": frames[-1]["lazy_loaded"],
+        "slowest_modules": [
+            {"module": module, "self_us": self_us, "cumulative_us": cumulative_us}
+            for module, (self_us, cumulative_us) in slowest
+        ],
+    }
+
+
+def check_budgets(report, import_budget_ms, frame_budget_ms):
+    """Lista de presupuestos superados"""
+    failures = []
+    if report["import_ms"] > import_budget_ms:
+        failures.append(f"importación de src.main {report['import_ms']:.0f} ms > {import_budget_ms} ms")
+    if report["first_frame_ms"] > frame_budget_ms:
+        failures.append(f"primer frame {report['first_frame_ms']:.0f} ms > {frame_budget_ms} ms")
+    for module in report["lazy_loaded"]:
+        failures.append(f"{module} se carga al arrancar y debería importarse bajo demanda")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío de CRM Personal")
+    parser.add_argument("--runs", type=int, default=3, help="Ejecuciones medidas (se usa la mediana)")
+    parser.add_argument("--top", type=int, default=15, help="Módulos más lentos a mostrar")
+    parser.add_argument("--import-budget-ms", type=float, default=1000, help="Presupuesto de importación de src.main")
+    parser.add_argument("--frame-budget-ms", type=float, default=2000, help="Presupuesto hasta el primer frame")
+    parser.add_argument("--output", help="Guardar el resultado en un archivo JSON")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.runs, args.top)
+
+    print(f"Importación de src.main: {report['import_ms']:.0f} ms")
+    print(f"Inicialización de base de datos: {report['init_db_ms']:.0f} ms")
+    print(f"Construcción de la vista principal: {report['first_view_ms']:.0f} ms")
+    print(f"Primer frame: {report['first_frame_ms']:.0f} ms (mediana de {report['runs']})")
+    print("\nMódulos más costosos (acumulado, -X importtime):")
+    for entry in report["slowest_modules"]:
+        print(f"  {entry['cumulative_us'] / 1000:8.1f} ms  {entry['module']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nResultado guardado en {args.output}")
+
+    failures = check_budgets(report, args.import_budget_ms, args.frame_budget_ms)
+    if failures:
+        print("\nPresupuesto superado:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nDentro del presupuesto")
+
+
+if __name__ == "__main__":
+    main()
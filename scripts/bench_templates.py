@@ -0,0 +1,114 @@
+"""
+Benchmark del motor de plantillas de campañas
+
+Renderiza una plantilla para N contactos sintéticos con el motor compilado
+(TemplateEngine.compile + render) y con el algoritmo anterior basado en
+expresiones regulares, comprueba que ambos producen los mismos mensajes y
+muestra los tiempos. No usa la base de datos.
+
+Uso:
+    python scripts/bench_templates.py
+    python scripts/bench_templates.py --contacts 100000 --template "Hola [$nombre] {y a [$familiar:Esposa]}"
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from types import SimpleNamespace
+
+# Añadir el directorio raíz al path para poder importar src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database.profile import RelatedContact
+from src.services.campaign_service import TemplateEngine
+
+DEFAULT_TEMPLATE = (
+    "Hola [$tratamiento] [$nombre] [$apellido], {esperamos que [$familiar] esté bien.} "
+    "Te escribimos para saludarte {a ti y a [$familiar:Esposa]} de parte de todo el equipo."
+)
+
+
+def legacy_process_template(template, contact, relationships=None):
+    """Algoritmo anterior: tres pasadas de expresiones regulares por contacto"""
+    if not template:
+        return ""
+
+    def value_of(var_name):
+        var_lower = var_name.lower()
+        if var_lower == "nombre":
+            return contact.first_name
+        elif var_lower == "apellido":
+            return contact.last_name
+        elif var_lower == "nombre_completo":
+            return f"{contact.first_name} {contact.last_name}"
+        elif var_lower == "tratamiento":
+            return contact.title or ""
+        elif var_lower == "familiar":
+            for rel in relationships or ():
+                return rel.first_name
+        return None
+
+    def process_conditional_block(match):
+        resolved_content = match.group(1)
+        for var_name in re.findall(r'\[\$(.*?)\]', match.group(1)):
+            value = value_of(var_name)
+            if not value:
+                return ""
+            resolved_content = resolved_content.replace(f"[${var_name}]", str(value))
+        return resolved_content
+
+    result = re.sub(r'\{(.*?)\}', process_conditional_block, template)
+    result = re.sub(r'\[\$(.*?)\]', lambda match: str(value_of(match.group(1)) or ""), result)
+    return re.sub(r'\s+', ' ', result).strip()
+
+
+def build_contacts(count):
+    """Contactos sintéticos; uno de cada tres tiene una relación"""
+    titles = ["Sr.", "Sra.", None]
+    contacts = []
+    for i in range(count):
+        contact = SimpleNamespace(rowid=i + 1, first_name=f"Nombre{i}", last_name=f"Apellido{i}", title=titles[i % 3])
+        related = [RelatedContact(i, i + 2, f"Pareja{i} X", "Esposa", f"Pareja{i}")] if i % 3 == 0 else []
+        contacts.append((contact, related))
+    return contacts
+
+
+def measure(render, contacts):
+    started = time.perf_counter()
+    messages = [render(contact, related) for contact, related in contacts]
+    return time.perf_counter() - started, messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de plantillas de campañas")
+    parser.add_argument("--contacts", type=int, default=100_000, help="Número de contactos a renderizar")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="Plantilla a renderizar")
+    args = parser.parse_args()
+
+    contacts = build_contacts(args.contacts)
+    compiled = TemplateEngine.compile(args.template)
+    print(f"Variables de la plantilla: {', '.join(compiled.variables) or '(ninguna)'}")
+    print(f"Columnas de contacto necesarias: {', '.join(sorted(compiled.contact_columns)) or '(ninguna)'}")
+    print(f"Necesita relaciones: {'sí' if compiled.needs_relationships else 'no'}")
+
+    # Referencia sin tipos de relación: el algoritmo anterior no los distinguía
+    untyped = re.sub(r'\[\$familiar:[^\]]*\]', '[$familiar]', args.template)
+    legacy_seconds, legacy_messages = measure(
+        lambda contact, related: legacy_process_template(untyped, contact, related), contacts
+    )
+    compiled_untyped = TemplateEngine.compile(untyped)
+    untyped_seconds, untyped_messages = measure(compiled_untyped.render, contacts)
+    if untyped_messages != legacy_messages:
+        raise SystemExit("El motor compilado no produce los mismos mensajes que el algoritmo anterior")
+    compiled_seconds, _ = measure(compiled.render, contacts)
+
+    print(f"\n{args.contacts} contactos:")
+    print(f"  Algoritmo anterior (regex):  {legacy_seconds:6.2f} s  ({args.contacts / legacy_seconds:,.0f} msg/s)")
+    print(f"  Motor compilado:             {untyped_seconds:6.2f} s  ({args.contacts / untyped_seconds:,.0f} msg/s)")
+    print(f"  Motor compilado (con tipos): {compiled_seconds:6.2f} s  ({args.contacts / compiled_seconds:,.0f} msg/s)")
+    print(f"  Aceleración: x{legacy_seconds / untyped_seconds:.1f} (mensajes idénticos)")
+
+
+if __name__ == "__main__":
+    main()
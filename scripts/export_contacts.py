@@ -0,0 +1,84 @@
+"""
+Exportación de segmentos de contactos sin interfaz gráfica
+
+Uso:
+    python scripts/export_contacts.py contactos.csv
+    python scripts/export_contacts.py clientes.xlsx --tag Cliente --missing-email
+    python scripts/export_contacts.py recordar.csv --without-tag "No contactar" --not-contacted-days 90
+    python scripts/export_contacts.py semana.parquet --columns first_name,last_name,phone_1,tags
+"""
+import argparse
+import os
+import sys
+
+# Añadir el directorio raíz al path para poder importar src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database.migrations import initialize_database_and_migrate
+from src.database.reports import DEFAULT_EXPORT_COLUMNS
+from src.database.segments import Segment
+from src.services.contact_service import TagService
+from src.services.export_service import ExportService, EXPORT_FORMATS
+
+
+def check_tags(*tag_lists):
+    """Termina si alguna etiqueta indicada no existe (un nombre mal escrito no filtraría nada)"""
+    known = {tag.name for tag in TagService.get_all_types()}
+    unknown = [name for tags in tag_lists for name in tags or () if name not in known]
+    if unknown:
+        raise SystemExit(f"Etiquetas desconocidas: {', '.join(unknown)}")
+
+
+def build_segment(args):
+    """Segmento de contactos a partir de los argumentos de la línea de comandos"""
+    check_tags(args.tag, args.all_tag, args.without_tag)
+    return Segment(
+        tags_any=args.tag,
+        tags_all=args.all_tag,
+        tags_none=args.without_tag,
+        exclude_restricted=args.exclude_restricted,
+        status=args.status,
+        missing_phone=args.missing_phone,
+        missing_email=args.missing_email,
+        missing_birthdate=args.missing_birthdate,
+        city=args.city,
+        country=args.country,
+        last_contact_older_than=args.not_contacted_days,
+        birthday_within=args.birthday_within,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta contactos filtrados a CSV, XLSX o Parquet")
+    parser.add_argument("output", help="Archivo de destino (el formato se deduce de la extensión)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="Formato, si no se quiere deducir de la extensión")
+    parser.add_argument("--columns", default=",".join(DEFAULT_EXPORT_COLUMNS),
+                        help="Columnas separadas por comas (atributos de contacto y 'tags')")
+    parser.add_argument("--tag", action="append", help="Solo contactos con esta etiqueta (repetible: cualquiera de ellas)")
+    parser.add_argument("--all-tag", action="append", help="Solo contactos con esta etiqueta (repetible: todas ellas)")
+    parser.add_argument("--without-tag", action="append", help="Excluir contactos con esta etiqueta (repetible)")
+    parser.add_argument("--exclude-restricted", action="store_true", help="Excluir contactos con etiquetas restringidas")
+    parser.add_argument("--missing-phone", action="store_true", help="Solo contactos sin teléfono")
+    parser.add_argument("--missing-email", action="store_true", help="Solo contactos sin correo")
+    parser.add_argument("--missing-birthdate", action="store_true", help="Solo contactos sin fecha de nacimiento")
+    parser.add_argument("--status", help="Solo contactos con este estado (p. ej. Activo)")
+    parser.add_argument("--city", help="Solo contactos de esta ciudad")
+    parser.add_argument("--country", help="Solo contactos de este país")
+    parser.add_argument("--not-contacted-days", type=int, help="Sin contacto en los últimos N días (o nunca)")
+    parser.add_argument("--birthday-within", type=int, help="Cumpleaños en los próximos N días")
+    args = parser.parse_args()
+
+    initialize_database_and_migrate()
+
+    rows = ExportService.export(
+        args.output,
+        fmt=args.format,
+        columns=[column.strip() for column in args.columns.split(",") if column.strip()],
+        progress_callback=lambda written: print(f"\r{written} filas exportadas...", end="", flush=True),
+        segment=build_segment(args),
+    )
+    print(f"\nExportación completada: {rows} contactos en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
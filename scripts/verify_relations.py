@@ -7,6 +7,7 @@ import sys
 # Añadir el directorio raíz al path para poder importar src
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from src.database.migrations import initialize_database_and_migrate
 from src.services.contact_service import ContactService, RelationshipService
 from src.database.connection import engine
 from sqlalchemy.orm import Session
@@ -68,4 +69,6 @@ def verify_relationships():
         print(f"ERROR durante la verificación: {e}")
 
 if __name__ == "__main__":
+    # Las tablas ya no se crean al importar los modelos
+    initialize_database_and_migrate()
     verify_relationships()
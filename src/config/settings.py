@@ -15,11 +15,52 @@ class Settings:
     DEBUG = os.getenv("CRM_DEBUG", "False").lower() == "true"
     LOG_LEVEL = os.getenv("CRM_LOG_LEVEL", "INFO")
     DATABASE_PATH = os.getenv("CRM_DATABASE_PATH", "contacts.db")
+    CSV_IMPORT_PATH = os.getenv("CRM_CSV_IMPORT_PATH", "contacts.csv")  # Importación inicial
+    
+    # Perfil del motor SQLite (aplicado como PRAGMAs en cada conexión)
+    SQLITE_JOURNAL_MODE = os.getenv("CRM_SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("CRM_SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE = int(os.getenv("CRM_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+    SQLITE_CACHE_SIZE = int(os.getenv("CRM_SQLITE_CACHE_SIZE", "-65536"))  # negativo = KiB (64 MiB)
+    SQLITE_TEMP_STORE = os.getenv("CRM_SQLITE_TEMP_STORE", "MEMORY")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("CRM_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_FOREIGN_KEYS = os.getenv("CRM_SQLITE_FOREIGN_KEYS", "True").lower() == "true"
+    
+    # Pool de conexiones (UI + hilos de campañas)
+    DB_POOL_SIZE = int(os.getenv("CRM_DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("CRM_DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = int(os.getenv("CRM_DB_POOL_TIMEOUT", "30"))
     
     # Configuración de WAHA
     WAHA_BASE_URL = os.getenv("WAHA_BASE_URL", "http://localhost:3000")
     WAHA_API_KEY = os.getenv("WAHA_API_KEY", "")
     WAHA_SESSION = os.getenv("WAHA_SESSION", "default")
+    # Sesiones entre las que se reparte una campaña (separadas por comas); por defecto solo WAHA_SESSION
+    WAHA_SESSIONS = [s.strip() for s in os.getenv("WAHA_SESSIONS", WAHA_SESSION).split(",") if s.strip()]
+    
+    # Cliente HTTP de WAHA: tiempos máximos (s), reintentos con espera exponencial y cortocircuito
+    WAHA_CONNECT_TIMEOUT = float(os.getenv("WAHA_CONNECT_TIMEOUT", "5"))
+    WAHA_READ_TIMEOUT = float(os.getenv("WAHA_READ_TIMEOUT", "30"))
+    WAHA_MAX_RETRIES = int(os.getenv("WAHA_MAX_RETRIES", "3"))
+    WAHA_BACKOFF_SECONDS = float(os.getenv("WAHA_BACKOFF_SECONDS", "0.5"))
+    WAHA_BACKOFF_MAX_SECONDS = float(os.getenv("WAHA_BACKOFF_MAX_SECONDS", "30"))
+    WAHA_CIRCUIT_FAILURES = int(os.getenv("WAHA_CIRCUIT_FAILURES", "5"))  # Fallos seguidos que abren el cortocircuito
+    WAHA_CIRCUIT_RESET_SECONDS = float(os.getenv("WAHA_CIRCUIT_RESET_SECONDS", "60"))
+    WAHA_POOL_SIZE = int(os.getenv("WAHA_POOL_SIZE", "10"))  # Conexiones keep-alive abiertas con WAHA
+    WAHA_MAX_CONCURRENCY = int(os.getenv("WAHA_MAX_CONCURRENCY", "8"))  # Peticiones simultáneas del cliente asíncrono
+    
+    # Verificación de números en WhatsApp: validez de la caché y consultas a WAHA por segundo
+    WHATSAPP_STATUS_TTL_DAYS = int(os.getenv("CRM_WHATSAPP_STATUS_TTL_DAYS", "30"))
+    WHATSAPP_VALIDATION_RATE = float(os.getenv("CRM_WHATSAPP_VALIDATION_RATE", "5"))
+    
+    # Ritmo de envío de campañas, por sesión: un mensaje cada intervalo más un retraso
+    # aleatorio de hasta CAMPAIGN_SEND_JITTER_SECONDS, y un máximo de mensajes al día
+    CAMPAIGN_SEND_INTERVAL_SECONDS = float(os.getenv("CRM_CAMPAIGN_SEND_INTERVAL_SECONDS", "10"))
+    CAMPAIGN_SEND_JITTER_SECONDS = float(os.getenv("CRM_CAMPAIGN_SEND_JITTER_SECONDS", "5"))
+    CAMPAIGN_DAILY_CAP = int(os.getenv("CRM_CAMPAIGN_DAILY_CAP", "300"))
+    # Resultados de envío que se acumulan en memoria antes de guardarlos juntos, y espera máxima (s)
+    CAMPAIGN_RESULTS_FLUSH_SIZE = int(os.getenv("CRM_CAMPAIGN_RESULTS_FLUSH_SIZE", "25"))
+    CAMPAIGN_RESULTS_FLUSH_SECONDS = float(os.getenv("CRM_CAMPAIGN_RESULTS_FLUSH_SECONDS", "5"))
     
     # Configuración de la aplicación
     APP_NAME = "CRM Personal"
@@ -31,6 +72,7 @@ class Settings:
     BASE_DIR = Path(__file__).parent.parent.parent
     LOGS_DIR = BASE_DIR / "logs"
     DATA_DIR = BASE_DIR / "data"
+    EXPORT_DIR = Path(os.getenv("CRM_EXPORT_DIR", str(BASE_DIR / "exports")))  # Exportaciones desde reportes
     LOGS_DIR.mkdir(exist_ok=True)
     
     # Ruta de la base de datos
@@ -43,6 +85,19 @@ class Settings:
     def get_database_path(cls):
         """Obtiene la ruta de la base de datos"""
         return cls.DATABASE_PATH
+    
+    @classmethod
+    def get_sqlite_pragmas(cls):
+        """PRAGMAs del perfil SQLite, en el orden en que deben aplicarse"""
+        return [
+            ("busy_timeout", cls.SQLITE_BUSY_TIMEOUT_MS),
+            ("journal_mode", cls.SQLITE_JOURNAL_MODE),
+            ("synchronous", cls.SQLITE_SYNCHRONOUS),
+            ("foreign_keys", "ON" if cls.SQLITE_FOREIGN_KEYS else "OFF"),
+            ("cache_size", cls.SQLITE_CACHE_SIZE),
+            ("mmap_size", cls.SQLITE_MMAP_SIZE),
+            ("temp_store", cls.SQLITE_TEMP_STORE),
+        ]
 
 # Instancia global de configuración
 settings = Settings()
\ No newline at end of file
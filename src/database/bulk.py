@@ -0,0 +1,39 @@
+"""
+Utilidades para operaciones masivas por lotes en CRM Personal
+"""
+
+# SQLite admite como mínimo 999 parámetros por sentencia; los lotes se
+# mantienen por debajo para dejar sitio a los parámetros fijos.
+BULK_CHUNK_SIZE = 500
+
+
+def chunked(values, size=BULK_CHUNK_SIZE):
+    """Divide una secuencia en listas de como mucho `size` elementos"""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def unique_ids(ids):
+    """Identificadores enteros sin repetir, conservando el orden recibido"""
+    return list(dict.fromkeys(int(i) for i in ids))
+
+
+class BulkResult:
+    """Recuento de filas afectadas por una operación masiva"""
+
+    def __init__(self, inserted=0, removed=0, skipped=0):
+        self.inserted = inserted
+        self.removed = removed
+        self.skipped = skipped
+
+    def __eq__(self, other):
+        if not isinstance(other, BulkResult):
+            return NotImplemented
+        return (self.inserted, self.removed, self.skipped) == (other.inserted, other.removed, other.skipped)
+
+    def __str__(self):
+        return f"{self.inserted} añadidos, {self.removed} eliminados, {self.skipped} omitidos"
+
+    def __repr__(self):
+        return f"<BulkResult(inserted={self.inserted}, removed={self.removed}, skipped={self.skipped})>"
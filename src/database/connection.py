@@ -1,12 +1,89 @@
 """
 Conexión a la base de datos para CRM Personal
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import QueuePool, StaticPool
 from src.config.settings import settings
 
-def get_engine():
-    """Obtiene el motor de base de datos"""
-    return create_engine(f'sqlite:///{settings.DATABASE_PATH}', echo=settings.DEBUG)
+# Valores aceptados para los PRAGMAs de texto (evita inyectar SQL desde variables de entorno)
+_ALLOWED_PRAGMA_VALUES = {
+    "journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+    "synchronous": {"OFF", "NORMAL", "FULL", "EXTRA"},
+    "temp_store": {"DEFAULT", "FILE", "MEMORY"},
+    "foreign_keys": {"ON", "OFF"},
+}
+
+# PRAGMAs incluidos en el informe de arranque
+REPORTED_PRAGMAS = [
+    "journal_mode", "synchronous", "foreign_keys", "busy_timeout",
+    "cache_size", "mmap_size", "temp_store", "page_size",
+]
+
+def _pragma_statements(pragmas):
+    """Valida el perfil y genera las sentencias PRAGMA"""
+    statements = []
+    for name, value in pragmas:
+        if name in _ALLOWED_PRAGMA_VALUES:
+            value = str(value).upper()
+            if value not in _ALLOWED_PRAGMA_VALUES[name]:
+                raise ValueError(f"Valor no válido para PRAGMA {name}: {value}")
+        else:
+            value = int(value)
+        statements.append(f"PRAGMA {name} = {value}")
+    return statements
+
+def _on_connect(statements):
+    """Crea el listener que aplica el perfil a cada conexión nueva del pool"""
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+    return apply_pragmas
+
+def get_engine(database_path=None):
+    """
+    Obtiene el motor de base de datos con el perfil SQLite de Settings.
+    Las conexiones se comparten entre el hilo de la UI y los hilos de campañas,
+    por lo que se usa un QueuePool con check_same_thread desactivado; las bases
+    en memoria usan una única conexión (StaticPool).
+    """
+    database_path = database_path or settings.DATABASE_PATH
+    in_memory = database_path == ":memory:"
+    statements = _pragma_statements(settings.get_sqlite_pragmas())
+
+    connect_args = {
+        "check_same_thread": False,
+        # Espera del driver ante bloqueos, alineada con busy_timeout
+        "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+    }
+    if in_memory:
+        pool_args = {"poolclass": StaticPool}
+    else:
+        pool_args = {
+            "poolclass": QueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+        }
+
+    new_engine = create_engine(
+        "sqlite://" if in_memory else f"sqlite:///{database_path}",
+        echo=settings.DEBUG,
+        connect_args=connect_args,
+        **pool_args
+    )
+    event.listen(new_engine, "connect", _on_connect(statements))
+    return new_engine
+
+def get_pragma_report(target_engine=None, connection=None):
+    """Devuelve los PRAGMAs realmente en vigor en una conexión del motor (o en la indicada)"""
+    if connection is None:
+        with (target_engine or engine).connect() as connection:
+            return get_pragma_report(connection=connection)
+    return {name: connection.execute(text(f"PRAGMA {name}")).scalar() for name in REPORTED_PRAGMAS}
 
 # Crear motor de base de datos
-engine = get_engine()
\ No newline at end of file
+engine = get_engine()
@@ -2,246 +2,461 @@
 Módulo para la inicialización de la base de datos y migración de datos desde CSV
 """
 import os
-import pandas as pd
+import time
+from sqlalchemy import text, select, insert, func
 from sqlalchemy.orm import Session
-from datetime import datetime
-from src.models.contact import Contact
+from src.models.contact import Contact, ContactStatus
 from src.models.relationship import RelationshipType, ContactRelationship
 from src.models.tag import TagType, ContactTag
 from src.models.hobby import Hobby, ContactHobby
 from src.models.event import ImportantEvent
-from src.config.logging_config import log_info, log_warning, log_error
-from src.database.connection import engine
+from src.models.segment import SavedSegment, SegmentMember
+from src.models.campaign import Campaign, CampaignMessage
+from src.models.whatsapp_status import WhatsAppStatus
+from src.config.logging_config import log_info, log_warning, log_error, log_debug
+from src.database.connection import engine, get_pragma_report
+from src.database.search_index import (
+    create_search_index, rebuild_search_index, rebuild_phone_index, search_index_exists, drop_insert_trigger,
+    PHONE_FTS_TABLE
+)
 
 def initialize_database_and_migrate():
-    """Inicializa la base de datos y migra datos desde CSV si es necesario"""
+    """
+    Inicializa la base de datos y aplica las migraciones pendientes.
+    Con el esquema al día solo se leen PRAGMA user_version y el perfil SQLite,
+    en una sola conexión.
+    """
+    with engine.connect() as connection:
+        current_version = get_schema_version(connection)
+        up_to_date = current_version >= LATEST_SCHEMA_VERSION
+        # Informar del perfil SQLite realmente aplicado en cada arranque
+        # (en depuración si no hay nada que migrar)
+        report_engine_profile(connection, debug=up_to_date)
     
-    log_info("Iniciando proceso de inicialización y migración de base de datos")
+    if up_to_date:
+        log_info(f"Esquema de base de datos al día (versión {current_version})")
+        return []
     
-    # Crear todas las tablas
-    from src.models.base import Base
-    Base.metadata.create_all(engine)
-    
-    # Agregar columnas faltantes si la tabla ya existe
-    add_missing_columns()
-    
-    # Verificar si la tabla de contactos está vacía
-    with Session(engine) as session:
-        contact_count = session.query(Contact).count()
-        
-        if contact_count == 0:
-            log_info("Base de datos vacía, migrando datos desde contacts.csv")
-            migrate_from_csv(session)
-        else:
-            log_info(f"Base de datos ya contiene {contact_count} contactos, omitiendo migración")
-    
-    # Agregar tipos predeterminados si no existen
-    populate_default_data()
+    log_info(f"Iniciando migración de base de datos desde la versión {current_version} "
+             f"a la {LATEST_SCHEMA_VERSION}")
     
+    applied = apply_schema_migrations(current_version=current_version)
     log_info("Proceso de inicialización de base de datos completado")
+    return applied
+
+# Columnas del CSV exportado de Google Contacts -> columnas de la tabla contacts
+CSV_COLUMN_MAPPING = {
+    'Name Prefix': 'title',
+    'Title': 'title',
+    'First Name': 'first_name',
+    'Middle Name': 'middle_name',
+    'Last Name': 'last_name',
+    'E-mail 1 - Value': 'email_1',
+    'E-mail 2 - Value': 'email_2',
+    'E-mail 3 - Value': 'email_3',
+    'Phone 1 - Value': 'phone_1',
+    'Phone 2 - Value': 'phone_2',
+    'Phone 3 - Value': 'phone_3',
+    'Phone 4 - Value': 'phone_4',
+    'Phone 5 - Value': 'phone_5',
+    'Address 1 - Formatted': 'address',
+    'Address 1 - City': 'city',
+    'Address 1 - Region': 'state',
+    'Address 1 - Postal Code': 'zip_code',
+    'Address 1 - Country': 'country',
+    'Address 2 - Formatted': 'address_2',
+    'Address 2 - City': 'city_2',
+    'Address 2 - Region': 'state_2',
+    'Address 2 - Postal Code': 'zip_code_2',
+    'Address 2 - Country': 'country_2',
+    'Website 1 - Value': 'website',
+    'Birthday': 'birth_date',
+    'Notes': 'notes',
+}
+
+# Filas leídas del CSV en cada lote
+CSV_CHUNK_SIZE = 10000
 
-def migrate_from_csv(session):
-    """Migra datos desde el archivo contacts.csv"""
-    csv_path = "contacts.csv"
+# Valores por defecto del modelo; el executemany directo no aplica los de SQLAlchemy
+CSV_IMPORT_DEFAULTS = {
+    'relationship': '',
+    'status': ContactStatus.ACTIVE.value,
+    'is_phone_verified': False,
+    'is_email_verified': False,
+    'is_name_verified': False,
+    'is_birthdate_verified': False,
+}
+
+def _name_keys(first_names, last_names):
+    """Clave (nombre, apellido) como una sola columna de texto, para comparar en bloque"""
+    return first_names + "\x1f" + last_names
+
+def migrate_from_csv(session, csv_path=None, chunksize=CSV_CHUNK_SIZE, progress_callback=None):
+    """
+    Migra datos desde el archivo contacts.csv (settings.CSV_IMPORT_PATH) por lotes.
+    Los contactos cuyo (nombre, apellido) ya existe en la base de datos o aparece
+    antes en el archivo se omiten. progress_callback(procesadas, agregadas) se
+    llama tras cada lote. Devuelve el número de contactos agregados.
+    """
+    # pandas solo se necesita aquí; importarlo arriba encarecería cada arranque
+    import pandas as pd
+    from src.config.settings import settings
     
+    csv_path = csv_path or settings.CSV_IMPORT_PATH
     if not os.path.exists(csv_path):
         log_warning(f"Archivo {csv_path} no encontrado, omitiendo migración desde CSV")
-        return
+        return 0
     
+    reindex_search = False
+    search_restored = False
     try:
-        # Leer el archivo CSV
-        df = pd.read_csv(csv_path, encoding='utf-8')
+        # Leer solo las columnas mapeadas, todas como texto (los teléfonos no son números)
+        header = pd.read_csv(csv_path, encoding='utf-8', nrows=0).columns
+        cols_to_use = {}
+        for csv_col, db_col in CSV_COLUMN_MAPPING.items():
+            if csv_col in header and db_col not in cols_to_use.values():
+                cols_to_use[csv_col] = db_col
         
-        # Eliminar filas sin nombre completo
-        df.dropna(subset=['First Name', 'Last Name'], inplace=True)
+        # Claves (nombre, apellido) ya presentes en la base de datos
+        existing = pd.DataFrame(
+            session.execute(select(Contact.first_name, Contact.last_name)).all(),
+            columns=['first_name', 'last_name'], dtype=str
+        )
+        seen_keys = pd.Index(_name_keys(existing['first_name'], existing['last_name']))
         
-        # Seleccionar y renombrar columnas relevantes
-        column_mapping = {
-            'Title': 'title',
-            'First Name': 'first_name',
-            'Last Name': 'last_name',
-            'E-mail 1 - Value': 'email_1',
-            'E-mail 2 - Value': 'email_2',
-            'Phone 1 - Value': 'phone_1',
-            'Phone 2 - Value': 'phone_2',
-            'Address 1 - Formatted': 'address',
-            'Birthday': 'birth_date',
-            'Notes': 'notes'
-        }
+        # Indexar la búsqueda una sola vez al final en lugar de fila a fila
+        connection = session.connection()
+        reindex_search = search_index_exists(connection)
+        if reindex_search:
+            drop_insert_trigger(connection)
         
-        # Filtrar columnas que existen en el CSV
-        existing_cols = [col for col in column_mapping.keys() if col in df.columns]
-        cols_to_use = {k: v for k, v in column_mapping.items() if k in existing_cols}
+        # Sentencia INSERT generada una vez y ejecutada por lote como executemany
+        columns = list(cols_to_use.values()) + list(CSV_IMPORT_DEFAULTS)
+        insert_statement = insert(Contact.__table__).compile(dialect=connection.dialect, column_keys=columns)
+        insert_columns = list(insert_statement.positiontup)
         
-        df_filtered = df[existing_cols].rename(columns=cols_to_use)
-        
-        # Agregar columnas que no vienen del CSV
-        df_filtered['relationship_general'] = ''  # Valor por defecto
-        df_filtered['created_at'] = datetime.now()
-        df_filtered['status'] = 'Activo' # Nuevo campo
-        df_filtered['is_phone_verified'] = False # Nuevo campo
-        df_filtered['is_email_verified'] = False # Nuevo campo
-        df_filtered['is_name_verified'] = False # Nuevo campo
-        df_filtered['is_birthdate_verified'] = False # Nuevo campo
-        
-        # Procesar y agregar contactos
+        processed_count = 0
         added_count = 0
-        for _, row in df_filtered.iterrows():
-            # Verificar si ya existe un contacto con el mismo nombre
-            existing_contact = session.query(Contact).filter(
-                Contact.first_name == row['first_name'],
-                Contact.last_name == row['last_name']
-            ).first()
+        reader = pd.read_csv(
+            csv_path, encoding='utf-8', usecols=list(cols_to_use), dtype=str,
+            keep_default_na=False, chunksize=chunksize
+        )
+        for chunk in reader:
+            processed_count += len(chunk)
+            chunk = chunk.rename(columns=cols_to_use)
+            for db_col in cols_to_use.values():
+                chunk[db_col] = chunk[db_col].str.strip()
             
-            if existing_contact:
-                log_info(f"Contacto {row['first_name']} {row['last_name']} ya existe, omitiendo...")
-                continue
+            # Eliminar filas sin nombre completo
+            chunk = chunk[(chunk['first_name'] != '') & (chunk['last_name'] != '')]
             
-            # Crear nuevo contacto
-            contact_data = row.to_dict()
-            # Asegurarse de que los valores nulos sean cadenas vacías
-            for key, value in contact_data.items():
-                if pd.isna(value):
-                    contact_data[key] = ''
+            # Anti-join contra las claves conocidas y duplicados dentro del lote
+            keys = _name_keys(chunk['first_name'], chunk['last_name'])
+            is_new = ~keys.isin(seen_keys) & ~keys.duplicated()
+            new_contacts = chunk[is_new]
+            seen_keys = seen_keys.append(pd.Index(keys[is_new]))
             
-<<<<<<< HEAD
-            # Filtrar solo los campos que existen en el modelo Contact
-            from sqlalchemy import inspect
-            mapper = inspect(Contact)
-            valid_columns = [column.key for column in mapper.attrs]
-=======
-            # Eliminar claves que no pertenecen al modelo Contact
-            valid_contact_fields = [
-                'first_name', 'last_name', 'email_1', 'email_2',
-                'phone_1', 'phone_2',
-                'address',
-                'birth_date', 'notes', 'relationship_general'
-            ]
->>>>>>> 06653bc57d2718102fe2160557cb6bf90df12b44
+            if len(new_contacts):
+                rows = new_contacts.assign(**CSV_IMPORT_DEFAULTS)[insert_columns].to_numpy(dtype=object)
+                connection.exec_driver_sql(str(insert_statement), list(map(tuple, rows)))
+                added_count += len(rows)
             
-            contact_params = {}
-            for field in valid_columns:
-                if field in contact_data:
-                    contact_params[field] = str(contact_data[field]) if contact_data[field] is not None else ''
-            
-            try:
-                new_contact = Contact(**contact_params)
-                session.add(new_contact)
-                added_count += 1
-            except TypeError as te:
-                log_error(f"Error creando instancia de Contact para {row.get('first_name', 'S/N')}: {te}")
-                continue
+            log_info(f"Migración CSV: {processed_count} filas procesadas, {added_count} contactos agregados")
+            if progress_callback:
+                progress_callback(processed_count, added_count)
+        
+        if reindex_search:
+            create_search_index(connection)
+            rebuild_search_index(connection)
+            search_restored = True
         
         session.commit()
         log_info(f"Migración completada: {added_count} contactos agregados desde CSV")
+        return added_count
         
     except Exception as e:
         log_error(f"Error migrando datos desde CSV: {str(e)}")
         session.rollback()
         raise
+    finally:
+        if reindex_search and not search_restored:
+            # DROP TRIGGER no se deshace con el rollback: sin el trigger los contactos
+            # nuevos no llegarían nunca al índice de búsqueda
+            connection = session.connection()
+            create_search_index(connection)
+            rebuild_search_index(connection)
+            session.commit()
 
-def populate_default_data():
-    """Agrega tipos predeterminados a la base de datos si no existen"""
-    
-    with Session(engine) as session:
-        # Agregar tipos de relación predeterminados
-        relationship_types = [
-            "Esposo/a", "Hijo/a", "Padre/Madre", "Hermano/a", "Amigo/a", 
-            "Colega", "Cliente", "Proveedor", "Compañero/a de trabajo"
-        ]
-        
-        for rel_type in relationship_types:
-            existing = session.query(RelationshipType).filter(RelationshipType.name == rel_type).first()
-            if not existing:
-                session.add(RelationshipType(name=rel_type))
-        
-        # Agregar tipos de etiquetas predeterminadas
-        tag_types = [
-            ("Amigo/a", "Contacto con quien tengo una relación personal amistosa", False),
-            ("Colega", "Contacto con quien trabajo o he trabajado", False),
-            ("Cliente", "Persona a la que presto servicios o vendo productos", False),
-            ("Familia", "Miembro de mi familia", False),
-            ("No contactar", "Contacto con quien no debo comunicarme por razones personales", True),
-            ("Trabajo", "Contacto relacionado con mi trabajo o profesión", False)
-        ]
-        
-        for name, description, is_restricted in tag_types:
-            existing = session.query(TagType).filter(TagType.name == name).first()
-            if not existing:
-                session.add(TagType(name=name, description=description, is_restricted=is_restricted))
-        
-        # Agregar hobbies predeterminados
-        hobbies = [
-            "Fútbol", "Lectura", "Cocina", "Música", "Viajes", "Arte", "Tecnología", 
-            "Deportes", "Jardinería", "Fotografía", "Cine", "Animales", "Videojuegos",
-            "Natación", "Ciclismo", "Yoga", "Meditación", "Pintura", "Bailar", "Cantar"
-        ]
-        
-        for hobby_name in hobbies:
-            existing = session.query(Hobby).filter(Hobby.name == hobby_name).first()
-            if not existing:
-                session.add(Hobby(name=hobby_name))
-        
-        session.commit()
-        log_info("Datos predeterminados agregados a la base de datos")
+DEFAULT_RELATIONSHIP_TYPES = [
+    "Esposo/a", "Hijo/a", "Padre/Madre", "Hermano/a", "Amigo/a", 
+    "Colega", "Cliente", "Proveedor", "Compañero/a de trabajo"
+]
+
+DEFAULT_TAG_TYPES = [
+    ("Amigo/a", "Contacto con quien tengo una relación personal amistosa", False),
+    ("Colega", "Contacto con quien trabajo o he trabajado", False),
+    ("Cliente", "Persona a la que presto servicios o vendo productos", False),
+    ("Familia", "Miembro de mi familia", False),
+    ("No contactar", "Contacto con quien no debo comunicarme por razones personales", True),
+    ("Trabajo", "Contacto relacionado con mi trabajo o profesión", False)
+]
+
+DEFAULT_HOBBIES = [
+    "Fútbol", "Lectura", "Cocina", "Música", "Viajes", "Arte", "Tecnología", 
+    "Deportes", "Jardinería", "Fotografía", "Cine", "Animales", "Videojuegos",
+    "Natación", "Ciclismo", "Yoga", "Meditación", "Pintura", "Bailar", "Cantar"
+]
 
-def add_missing_columns():
+def populate_default_data(connection):
+    """Agrega tipos predeterminados a la base de datos si no existen (nombres únicos)"""
+    connection.execute(
+        insert(RelationshipType).prefix_with("OR IGNORE"),
+        [{"name": name} for name in DEFAULT_RELATIONSHIP_TYPES]
+    )
+    connection.execute(
+        insert(TagType).prefix_with("OR IGNORE"),
+        [{"name": name, "description": description, "is_restricted": is_restricted}
+         for name, description, is_restricted in DEFAULT_TAG_TYPES]
+    )
+    connection.execute(
+        insert(Hobby).prefix_with("OR IGNORE"),
+        [{"name": name} for name in DEFAULT_HOBBIES]
+    )
+    log_info("Datos predeterminados agregados a la base de datos")
+
+# Columnas agregadas a contacts después de la primera versión de la aplicación
+LEGACY_CONTACT_COLUMNS = [
+    ('title', 'TEXT'),
+    ('middle_name', 'TEXT'),
+    ('status', "TEXT DEFAULT 'Activo'"),
+    ('is_phone_verified', 'BOOLEAN DEFAULT 0'),
+    ('is_email_verified', 'BOOLEAN DEFAULT 0'),
+    ('is_name_verified', 'BOOLEAN DEFAULT 0'),
+    ('is_birthdate_verified', 'BOOLEAN DEFAULT 0'),
+    ('phone_3', 'TEXT'),
+    ('phone_4', 'TEXT'),
+    ('phone_5', 'TEXT'),
+    ('email_3', 'TEXT'),
+    ('city', 'TEXT'),
+    ('state', 'TEXT'),
+    ('zip_code', 'TEXT'),
+    ('country', 'TEXT'),
+    ('address_2', 'TEXT'),
+    ('city_2', 'TEXT'),
+    ('state_2', 'TEXT'),
+    ('zip_code_2', 'TEXT'),
+    ('country_2', 'TEXT'),
+    ('website', 'TEXT'),
+    ('last_contact_date', 'TEXT'),
+    ('last_contact_channel', 'TEXT'),
+    ('facebook', 'TEXT'),
+    ('instagram', 'TEXT'),
+    ('linkedin', 'TEXT'),
+    ('twitter', 'TEXT'),
+    ('tiktok', 'TEXT')
+]
+
+def add_missing_columns(connection):
     """Agrega columnas faltantes a la tabla de contactos si no existen"""
-    import sqlite3
+    existing_cols = {row[1] for row in connection.execute(text("PRAGMA table_info(contacts)"))}
+    for col_name, col_type in LEGACY_CONTACT_COLUMNS:
+        if col_name not in existing_cols:
+            log_info(f"Agregando columna {col_name} a la tabla contacts")
+            connection.execute(text(f"ALTER TABLE contacts ADD COLUMN {col_name} {col_type}"))
+
+def report_engine_profile(connection=None, debug=False):
+    """
+    Registra los PRAGMAs en vigor y avisa si alguno difiere del perfil configurado
+    :param connection: Conexión en la que leerlos (por defecto una nueva del motor)
+    :param debug: Si es True el perfil se registra en nivel de depuración
+    """
     from src.config.settings import settings
     
-    db_path = settings.DATABASE_PATH
-    if not os.path.exists(db_path):
+    report = get_pragma_report(engine, connection)
+    (log_debug if debug else log_info)("Perfil SQLite en vigor: " + ", ".join(f"{k}={v}" for k, v in report.items()))
+    
+    journal_mode = str(report.get("journal_mode", "")).upper()
+    if journal_mode not in (settings.SQLITE_JOURNAL_MODE.upper(), "MEMORY"):
+        log_warning(f"journal_mode solicitado {settings.SQLITE_JOURNAL_MODE}, en vigor {journal_mode}")
+    if bool(report.get("foreign_keys")) != settings.SQLITE_FOREIGN_KEYS:
+        log_warning("foreign_keys no coincide con la configuración")
+    return report
+
+def ensure_indexes(connection):
+    """Crea los índices declarados en los modelos que falten en tablas ya existentes"""
+    for index in Contact.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+def ensure_search_index(connection):
+    """Crea el índice FTS5 de contactos y lo llena si la base de datos es anterior a él"""
+    existed = search_index_exists(connection)
+    create_search_index(connection)
+    if not existed:
+        log_info("Construyendo índice de búsqueda de contactos (FTS5)")
+        rebuild_search_index(connection)
+
+def migration_000_base_schema(connection):
+    """
+    Esquema base, para bases de datos nuevas o anteriores al versionado: crea las
+    tablas que falten, completa las columnas de contacts y sus índices, y el
+    índice de búsqueda FTS5. Todas las operaciones son idempotentes.
+    """
+    from src.models.base import Base
+    Base.metadata.create_all(connection)
+    add_missing_columns(connection)
+    ensure_indexes(connection)
+    ensure_search_index(connection)
+
+def _deduplicate_links(connection, table_name, key_columns):
+    """Elimina filas repetidas de una tabla de asociación conservando la más antigua"""
+    keys = ", ".join(key_columns)
+    result = connection.execute(text(
+        f"DELETE FROM {table_name} WHERE id NOT IN "
+        f"(SELECT MIN(id) FROM {table_name} GROUP BY {keys})"
+    ))
+    if result.rowcount:
+        log_info(f"Eliminados {result.rowcount} vínculos duplicados en {table_name}")
+
+def migration_001_association_indexes(connection):
+    """
+    Índices compuestos sobre contact_tags, contact_hobbies, contact_relationships
+    e important_events, y unicidad de los vínculos etiqueta/hobby por contacto.
+    SQLite no permite añadir restricciones a tablas existentes, así que la
+    unicidad se impone con índices UNIQUE tras depurar duplicados.
+    """
+    _deduplicate_links(connection, ContactTag.__tablename__, ["contact_id", "tag_type_id"])
+    _deduplicate_links(connection, ContactHobby.__tablename__, ["contact_id", "hobby_id"])
+    
+    for model in (ContactTag, ContactHobby, ContactRelationship, ImportantEvent):
+        for index in model.__table__.indexes:
+            index.create(connection, checkfirst=True)
+    
+    # Estadísticas para que el planificador elija los índices nuevos
+    connection.execute(text("ANALYZE"))
+
+def migration_002_default_data(connection):
+    """Tipos de relación, etiquetas y hobbies predeterminados"""
+    populate_default_data(connection)
+
+def migration_003_initial_import(connection):
+    """Importa contacts.csv si la base de datos aún no tiene contactos"""
+    contact_count = connection.execute(select(func.count()).select_from(Contact)).scalar()
+    if contact_count:
+        log_info(f"Base de datos ya contiene {contact_count} contactos, omitiendo migración")
         return
-        
-    cols_to_add = [
-        ('title', 'TEXT'),
-        ('middle_name', 'TEXT'),
-        ('status', 'TEXT DEFAULT "Activo"'),
-        ('is_phone_verified', 'BOOLEAN DEFAULT 0'),
-        ('is_email_verified', 'BOOLEAN DEFAULT 0'),
-        ('is_name_verified', 'BOOLEAN DEFAULT 0'),
-        ('is_birthdate_verified', 'BOOLEAN DEFAULT 0'),
-        ('phone_3', 'TEXT'),
-        ('phone_4', 'TEXT'),
-        ('phone_5', 'TEXT'),
-        ('email_3', 'TEXT'),
-        ('city', 'TEXT'),
-        ('state', 'TEXT'),
-        ('zip_code', 'TEXT'),
-        ('country', 'TEXT'),
-        ('address_2', 'TEXT'),
-        ('city_2', 'TEXT'),
-        ('state_2', 'TEXT'),
-        ('zip_code_2', 'TEXT'),
-        ('country_2', 'TEXT'),
-        ('website', 'TEXT'),
-        ('last_contact_date', 'TEXT'),
-        ('last_contact_channel', 'TEXT'),
-        ('facebook', 'TEXT'),
-        ('instagram', 'TEXT'),
-        ('linkedin', 'TEXT'),
-        ('twitter', 'TEXT'),
-        ('tiktok', 'TEXT')
-    ]
+    log_info("Base de datos vacía, migrando datos desde contacts.csv")
+    with Session(bind=connection) as session:
+        migrate_from_csv(session)
+
+def migration_004_saved_segments(connection):
+    """Tablas de segmentos guardados y de su pertenencia materializada"""
+    for model in (SavedSegment, SegmentMember):
+        model.__table__.create(connection, checkfirst=True)
+        for index in model.__table__.indexes:
+            index.create(connection, checkfirst=True)
+
+def migration_005_campaign_outbox(connection):
+    """Campañas y su cola persistente de mensajes (outbox)"""
+    for model in (Campaign, CampaignMessage):
+        model.__table__.create(connection, checkfirst=True)
+        for index in model.__table__.indexes:
+            index.create(connection, checkfirst=True)
+
+def migration_006_campaign_sessions(connection):
+    """Sesión de WAHA de cada mensaje de campaña (reparto entre sesiones y límite diario)"""
+    existing_cols = {row[1] for row in connection.execute(text("PRAGMA table_info(campaign_messages)"))}
+    if "session" not in existing_cols:
+        connection.execute(text("ALTER TABLE campaign_messages ADD COLUMN session VARCHAR"))
+    for index in CampaignMessage.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+def migration_007_whatsapp_status(connection):
+    """Caché del estado de WhatsApp de cada número verificado en WAHA"""
+    WhatsAppStatus.__table__.create(connection, checkfirst=True)
+    for index in WhatsAppStatus.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+def migration_008_phone_search_index(connection):
+    """Índice de búsqueda de teléfonos por tramos de dígitos (FTS5 trigram)"""
+    existed = search_index_exists(connection, PHONE_FTS_TABLE)
+    create_search_index(connection)
+    if not existed:
+        rebuild_phone_index(connection)
+
+def migration_009_nullable_message_contact(connection):
+    """
+    contact_id de campaign_messages pasa a admitir nulos, para conservar los
+    mensajes enviados al eliminar el contacto. SQLite no permite cambiar una
+    columna, así que la tabla se reconstruye con el esquema del modelo.
+    """
+    columns = {row[1]: row[3] for row in connection.execute(text("PRAGMA table_info(campaign_messages)"))}
+    if not columns.get("contact_id"):
+        return
+    table = CampaignMessage.__table__
+    for index in table.indexes:
+        connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    connection.execute(text("ALTER TABLE campaign_messages RENAME TO campaign_messages_old"))
+    table.create(connection)
+    names = ", ".join(column.name for column in table.columns)
+    connection.execute(text(f"INSERT INTO campaign_messages ({names}) SELECT {names} FROM campaign_messages_old"))
+    connection.execute(text("DROP TABLE campaign_messages_old"))
+
+# Migraciones de esquema versionadas, en orden. El número de versión se
+# guarda en PRAGMA user_version y nunca debe reutilizarse. Las bases de datos
+# en la versión 0 (nuevas o anteriores al versionado) pasan antes por el
+# esquema base.
+SCHEMA_MIGRATIONS = [
+    (1, "Índices y unicidad de tablas de asociación", migration_001_association_indexes),
+    (2, "Datos predeterminados", migration_002_default_data),
+    (3, "Importación inicial de contactos", migration_003_initial_import),
+    (4, "Segmentos guardados", migration_004_saved_segments),
+    (5, "Cola de mensajes de campañas", migration_005_campaign_outbox),
+    (6, "Sesión de envío de los mensajes de campañas", migration_006_campaign_sessions),
+    (7, "Caché de estado de WhatsApp", migration_007_whatsapp_status),
+    (8, "Índice de búsqueda de teléfonos", migration_008_phone_search_index),
+    (9, "Mensajes de campañas de contactos eliminados", migration_009_nullable_message_contact),
+]
+
+LATEST_SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+def get_schema_version(connection):
+    """Versión de esquema registrada en la base de datos"""
+    return connection.execute(text("PRAGMA user_version")).scalar()
+
+def set_schema_version(connection, version):
+    """Registra la versión de esquema (PRAGMA no admite parámetros)"""
+    connection.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+def _run_migration(target_engine, version, description, step):
+    """Ejecuta un paso en su propia transacción, registra su versión y su duración"""
+    log_info(f"Aplicando migración de esquema {version}: {description}")
+    started = time.perf_counter()
+    with target_engine.begin() as connection:
+        # pysqlite solo abre la transacción antes de INSERT/UPDATE/DELETE: sin un BEGIN
+        # explícito, los CREATE y ALTER de un paso fallido quedarían aplicados
+        connection.exec_driver_sql("BEGIN")
+        step(connection)
+        set_schema_version(connection, version)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    log_info(f"Migración de esquema {version} aplicada en {elapsed_ms:.1f} ms")
+
+def apply_schema_migrations(target_engine=None, current_version=None):
+    """Aplica, cada una en su propia transacción, las migraciones pendientes"""
+    target_engine = target_engine or engine
+    if current_version is None:
+        with target_engine.connect() as connection:
+            current_version = get_schema_version(connection)
     
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Obtener columnas existentes
-        cursor.execute("PRAGMA table_info(contacts)")
-        existing_cols = [row[1] for row in cursor.fetchall()]
-        
-        for col_name, col_type in cols_to_add:
-            if col_name not in existing_cols:
-                log_info(f"Agregando columna {col_name} a la tabla contacts")
-                cursor.execute(f"ALTER TABLE contacts ADD COLUMN {col_name} {col_type}")
-        
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        log_error(f"Error agregando columnas faltantes: {e}")
+    if current_version == 0:
+        _run_migration(target_engine, 0, "Esquema base", migration_000_base_schema)
+    
+    applied = []
+    for version, description, step in SCHEMA_MIGRATIONS:
+        if version <= current_version:
+            continue
+        _run_migration(target_engine, version, description, step)
+        applied.append(version)
+    return applied
 
 def check_database_exists():
     """Verifica si la base de datos existe"""
@@ -0,0 +1,99 @@
+"""
+Cola persistente (outbox) de mensajes de campaña para CRM Personal
+"""
+import threading
+from collections import namedtuple
+from datetime import datetime
+from src.config.logging_config import log_error
+
+# Mensajes pendientes que el worker lee de cada vez
+OUTBOX_BATCH_SIZE = 50
+
+# Error registrado para los mensajes que quedaron "Enviando" al cerrarse la aplicación
+INTERRUPTED_ERROR = "Envío interrumpido: no se sabe si llegó, no se reintenta automáticamente"
+
+
+class OutboxMessage(namedtuple("OutboxMessage", ["id", "contact_id", "recipient_name", "chat_id", "text", "attempts"])):
+    """Mensaje pendiente de la cola, listo para enviarse"""
+    __slots__ = ()
+
+
+class DeliveryResult(namedtuple("DeliveryResult", ["message_id", "contact_id", "finished_at", "error"])):
+    """Resultado de un envío pendiente de guardar (error None si se envió)"""
+    __slots__ = ()
+
+
+class DeliveryBuffer:
+    """
+    Acumula en memoria los resultados de envío y los escribe juntos (write-behind)
+    cuando hay max_size o cuando el más antiguo lleva max_seconds esperando, aunque
+    no lleguen más. Al salir del bloque with se escribe lo que quede, también si
+    el envío se detiene o falla.
+    """
+
+    def __init__(self, write, max_size, max_seconds):
+        """
+        :param write: Función que guarda una lista de DeliveryResult en una transacción
+        :param max_size: Resultados que provocan la escritura
+        :param max_seconds: Espera máxima de un resultado en memoria
+        """
+        self.write = write
+        self.max_size = max(1, max_size)
+        self.max_seconds = max_seconds
+        self.flushes = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def add(self, result):
+        """Añade un resultado; escribe el lote si se llenó"""
+        with self._lock:
+            self._pending.append(result)
+            full = len(self._pending) >= self.max_size
+            if not full and self._timer is None and self.max_seconds > 0:
+                # La escritura por tiempo la hace un temporizador: el envío puede quedar en pausa
+                self._timer = threading.Timer(self.max_seconds, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full or self.max_seconds <= 0:
+            self.flush()
+
+    def flush(self):
+        """Escribe los resultados acumulados; si la escritura falla vuelven al búfer"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            try:
+                self.write(pending)
+            except Exception:
+                self._pending = pending + self._pending
+                raise
+            self.flushes += 1
+            return len(pending)
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except Exception as e:
+            # Se reintenta con el siguiente lote o al cerrar el búfer
+            log_error(f"No se pudieron guardar los resultados de envío: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.flush()
+        return False
+
+
+def now_timestamp():
+    """Fecha y hora actual en el formato de texto que usa la base de datos"""
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
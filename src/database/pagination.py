@@ -0,0 +1,48 @@
+"""
+Utilidades de paginación por cursor (keyset) para CRM Personal
+"""
+import base64
+import json
+
+
+class InvalidCursorError(ValueError):
+    """El cursor recibido no es válido para esta consulta"""
+
+
+def encode_cursor(key):
+    """Codifica la clave de ordenación de una fila como cursor opaco"""
+    payload = json.dumps(list(key), separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, key_length):
+    """Decodifica un cursor y valida que tenga la longitud de clave esperada"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    except Exception as e:
+        raise InvalidCursorError(f"Cursor inválido: {cursor!r}") from e
+    if not isinstance(key, list) or len(key) != key_length:
+        raise InvalidCursorError(f"Cursor inválido para esta consulta: {cursor!r}")
+    return key
+
+
+class ContactPage:
+    """Página de contactos obtenida con paginación keyset"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, has_next=False, has_prev=False, total=None):
+        self.items = items
+        self.total = total
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.has_next = has_next
+        self.has_prev = has_prev
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __repr__(self):
+        return (f"<ContactPage(items={len(self.items)}, total={self.total}, "
+                f"has_prev={self.has_prev}, has_next={self.has_next})>")
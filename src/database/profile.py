@@ -0,0 +1,65 @@
+"""
+Perfil de contacto de solo lectura para CRM Personal
+"""
+from collections import namedtuple
+from types import MappingProxyType
+from sqlalchemy import inspect
+
+
+class RelatedContact(namedtuple("RelatedContact",
+                                ["relationship_id", "contact_id", "full_name", "relationship_type", "first_name"],
+                                defaults=(None,))):
+    """Contacto relacionado, visto desde el contacto del perfil"""
+    __slots__ = ()
+
+    @classmethod
+    def from_relationship(cls, relationship, contact_id):
+        """Construye la vista a partir de una relación con sus contactos y tipo cargados"""
+        if relationship.contact_id == contact_id:
+            other = relationship.related_contact
+        else:
+            other = relationship.contact
+        return cls(relationship.id, other.rowid, other.full_name, relationship.relationship_type.name,
+                   other.first_name)
+
+
+class ContactProfile:
+    """
+    Contacto con sus etiquetas, hobbies, eventos y relaciones en ambas direcciones.
+    Copia los valores mientras la sesión está abierta, así que puede usarse después
+    de cerrarla sin consultas perezosas. Los campos del contacto se leen como
+    atributos (profile.first_name) y las colecciones son tuplas.
+    """
+
+    def __init__(self, fields, tags=(), hobbies=(), events=(), relationships=()):
+        self._fields = MappingProxyType(dict(fields))
+        self.tags = tuple(tags)
+        self.hobbies = tuple(hobbies)
+        self.events = tuple(events)
+        self.relationships = tuple(relationships)
+
+    @classmethod
+    def from_contact(cls, contact):
+        """Construye el perfil desde un Contact con sus colecciones ya cargadas"""
+        fields = {attr.key: getattr(contact, attr.key) for attr in inspect(type(contact)).column_attrs}
+        relationships = [
+            RelatedContact.from_relationship(rel, contact.rowid)
+            for rel in list(contact.relationships) + list(contact.relationships_as_related)
+        ]
+        return cls(fields, contact.tags, contact.hobbies, contact.events, relationships)
+
+    def __getattr__(self, name):
+        fields = self.__dict__.get("_fields")
+        if fields is not None and name in fields:
+            return fields[name]
+        raise AttributeError(f"'ContactProfile' no tiene el atributo {name!r}")
+
+    @property
+    def full_name(self):
+        """Devuelve el nombre completo del contacto"""
+        return f"{self.first_name} {self.last_name}"
+
+    def __repr__(self):
+        return (f"<ContactProfile(rowid={self.rowid}, name='{self.full_name}', tags={len(self.tags)}, "
+                f"hobbies={len(self.hobbies)}, events={len(self.events)}, "
+                f"relationships={len(self.relationships)})>")
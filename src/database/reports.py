@@ -0,0 +1,31 @@
+"""
+Filas de reporte de contactos para CRM Personal
+"""
+from collections import namedtuple
+
+# Filas que se leen de la base de datos en cada lote del cursor (yield_per)
+REPORT_BATCH_SIZE = 500
+
+# Filas por página en la pantalla de reportes
+REPORT_PAGE_SIZE = 50
+
+# Filas por lote al exportar segmentos
+EXPORT_BATCH_SIZE = 2000
+
+# Columnas exportadas si no se eligen otras ("tags" = nombres de etiquetas)
+DEFAULT_EXPORT_COLUMNS = ["first_name", "last_name", "phone_1", "email_1", "city", "country", "status", "tags"]
+
+
+class ReportRow(namedtuple("ReportRow", ["rowid", "first_name", "last_name", "phone_1", "email_1", "tags"])):
+    """Fila de reporte: datos básicos del contacto y los nombres de sus etiquetas"""
+    __slots__ = ()
+
+    @property
+    def full_name(self):
+        """Devuelve el nombre completo del contacto"""
+        return f"{self.first_name} {self.last_name}"
+
+    @property
+    def sort_key(self):
+        """Clave de ordenación del reporte (nombre, apellido, rowid) para el cursor"""
+        return (self.first_name, self.last_name, self.rowid)
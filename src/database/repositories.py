@@ -1,14 +1,57 @@
 """
 Repositorios de acceso a datos para CRM Personal
 """
-from sqlalchemy import or_, case, and_
-from sqlalchemy.orm import Session, joinedload
+import threading
+from datetime import date
+from itertools import islice
+from sqlalchemy import or_, and_, delete, insert, update, func, select, table, column, tuple_, bindparam, inspect, type_coerce, literal, Enum, String
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, joinedload, selectinload, aliased, load_only
+from sqlalchemy.orm.attributes import set_committed_value
 from src.models.contact import Contact
 from src.models.relationship import ContactRelationship, RelationshipType
 from src.models.tag import ContactTag, TagType
 from src.models.hobby import ContactHobby, Hobby
 from src.models.event import ImportantEvent
+from src.models.segment import SavedSegment, SegmentMember
+from src.models.campaign import Campaign, CampaignMessage, CampaignStatus, MessageStatus
+from src.models.whatsapp_status import WhatsAppStatus
 from src.database.connection import engine
+from src.database.pagination import ContactPage, encode_cursor, decode_cursor
+from src.database.bulk import BulkResult, BULK_CHUNK_SIZE, chunked, unique_ids
+from src.database.profile import ContactProfile, RelatedContact
+from src.database.segments import Segment
+from src.database.outbox import OutboxMessage, DeliveryResult, OUTBOX_BATCH_SIZE, INTERRUPTED_ERROR, now_timestamp
+from src.database.reports import ReportRow, REPORT_BATCH_SIZE, REPORT_PAGE_SIZE, EXPORT_BATCH_SIZE, DEFAULT_EXPORT_COLUMNS
+from src.database.search_index import build_search, normalize_query
+
+class ContactCountCache:
+    """
+    Caché en memoria del número de contactos por búsqueda normalizada.
+    Cualquier escritura sobre contactos la invalida por completo; el contador
+    de generación evita guardar un total calculado antes de esa escritura.
+    """
+    _lock = threading.Lock()
+    _counts = {}
+    _generation = 0
+
+    @classmethod
+    def get(cls, key):
+        """Devuelve (total o None, generación actual)"""
+        with cls._lock:
+            return cls._counts.get(key), cls._generation
+
+    @classmethod
+    def set(cls, key, total, generation):
+        with cls._lock:
+            if generation == cls._generation:
+                cls._counts[key] = total
+
+    @classmethod
+    def invalidate(cls):
+        with cls._lock:
+            cls._counts.clear()
+            cls._generation += 1
 
 class ContactRepository:
     """Repositorio para operaciones de contactos"""
@@ -19,98 +62,324 @@ class ContactRepository:
         with Session(engine) as session:
             return session.query(Contact).all()
             
+    @staticmethod
+    def _apply_search(stmt, search):
+        """Restringe una consulta de contactos a las coincidencias de la búsqueda (SearchMatch)"""
+        fts = table(search.table, column("rowid"))
+        return stmt.join(fts, fts.c.rowid == Contact.rowid).filter(search.condition())
+            
     @staticmethod
     def get_paginated(offset=0, limit=10, query=None):
         """Obtiene una página de contactos, opcionalmente filtrados por búsqueda"""
         with Session(engine) as session:
             stmt = session.query(Contact)
-            if query:
-                term = query.strip()
-                filter_cond = or_(
-                    Contact.first_name.ilike(f"%{term}%"),
-                    Contact.last_name.ilike(f"%{term}%"),
-                    Contact.phone_1.ilike(f"%{term}%")
-                )
-                stmt = stmt.filter(filter_cond)
-                
-                # Para búsquedas, aplicamos la misma lógica de relevancia que en search()
-                relevance = case(
-                    (Contact.first_name.ilike(f"{term}%"), 0),
-                    (Contact.last_name.ilike(f"{term}%"), 0),
-                    (Contact.phone_1.ilike(f"{term}%"), 0),
-                    else_=1
-                )
-                stmt = stmt.order_by(relevance, Contact.first_name)
+            if query and query.strip():
+                search = build_search(query)
+                if search is None:
+                    return []
+                stmt = ContactRepository._apply_search(stmt, search)
+                # Para búsquedas, ordenamos por relevancia bm25 igual que en search()
+                stmt = stmt.order_by(search.rank(), Contact.first_name)
             
             return stmt.offset(offset).limit(limit).all()
             
+    @staticmethod
+    def get_page(limit=10, query=None, after=None, before=None):
+        """
+        Obtiene una página de contactos con paginación por cursor (keyset).
+        El orden es (relevancia, nombre, apellido, rowid) al buscar y
+        (nombre, apellido, rowid) sin búsqueda; el cursor codifica esa clave
+        para que cualquier página cueste lo mismo que la primera.
+        :param after: Cursor de la fila tras la cual empieza la página (siguiente)
+        :param before: Cursor de la fila antes de la cual termina la página (anterior)
+        :return: ContactPage
+        """
+        with Session(engine) as session:
+            return ContactRepository._fetch_page(session, limit, query, after, before)
+
+    @staticmethod
+    def get_page_with_count(limit=10, query=None, after=None, before=None):
+        """
+        Igual que get_page, pero además rellena ContactPage.total con el número
+        de contactos que coinciden con la búsqueda. El total se obtiene en la
+        misma sentencia que la página y se guarda en caché por búsqueda
+        normalizada hasta la siguiente escritura sobre contactos.
+        """
+        cache_key = ContactRepository._count_cache_key(query)
+        total, generation = ContactCountCache.get(cache_key)
+        with Session(engine) as session:
+            page = ContactRepository._fetch_page(
+                session, limit, query, after, before, with_total=total is None
+            )
+            if total is None:
+                total = page.total
+                if total is None:
+                    # Página vacía tras un cursor: el total no vino en las filas
+                    total = ContactRepository._count(session, query)
+                ContactCountCache.set(cache_key, total, generation)
+        page.total = total
+        return page
+
+    @staticmethod
+    def _fetch_page(session, limit, query, after, before, with_total=False):
+        """Ejecuta la consulta keyset de una página; opcionalmente incluye el total"""
+        searching = bool(query and query.strip())
+        search = build_search(query) if searching else None
+        if searching and search is None:
+            # El texto no contiene palabras buscables: no hay coincidencias
+            return ContactPage([], total=0 if with_total else None)
+        entities = [Contact]
+        if searching:
+            rank = search.rank()
+            entities.append(rank)
+            sort_key = [rank, Contact.first_name, Contact.last_name, Contact.rowid]
+        else:
+            sort_key = [Contact.first_name, Contact.last_name, Contact.rowid]
+        count_stmt = ContactRepository._count_statement(query) if with_total else None
+        if count_stmt is not None:
+            # Subconsulta escalar no correlacionada: SQLite la evalúa una sola vez
+            entities.append(count_stmt.scalar_subquery())
+
+        stmt = session.query(*entities)
+        if searching:
+            stmt = ContactRepository._apply_search(stmt, search)
+
+        backwards = before is not None
+        cursor = before if backwards else after
+        if cursor is not None:
+            key = tuple_(*decode_cursor(cursor, len(sort_key)))
+            stmt = stmt.filter(tuple_(*sort_key) < key if backwards else tuple_(*sort_key) > key)
+
+        order = [col.desc() for col in sort_key] if backwards else sort_key
+        rows = stmt.order_by(*order).limit(limit + 1).all()
+        if len(entities) == 1:
+            rows = [(contact,) for contact in rows]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backwards:
+            rows.reverse()
+
+        items = [row[0] for row in rows]
+        if searching:
+            keys = [(row[1], row[0].first_name, row[0].last_name, row[0].rowid) for row in rows]
+        else:
+            keys = [(c.first_name, c.last_name, c.rowid) for c in items]
+
+        total = None
+        if with_total:
+            if rows and count_stmt is not None:
+                total = rows[0][-1]
+            elif cursor is None:
+                # Sin cursor y sin filas: no hay ninguna coincidencia
+                total = 0
+
+        return ContactPage(
+            items,
+            next_cursor=encode_cursor(keys[-1]) if keys else None,
+            prev_cursor=encode_cursor(keys[0]) if keys else None,
+            has_next=True if backwards else has_more,
+            has_prev=has_more if backwards else cursor is not None,
+            total=total
+        )
+
+    @staticmethod
+    def _count_statement(query):
+        """Sentencia de conteo para una búsqueda; None si no puede coincidir ningún contacto"""
+        if query and query.strip():
+            search = build_search(query)
+            if search is None:
+                return None
+            # El conteo se resuelve solo con el índice, sin tocar contacts
+            return select(func.count()).select_from(table(search.table)).where(search.condition())
+        return select(func.count()).select_from(Contact)
+
+    @staticmethod
+    def _count_cache_key(query):
+        """Clave de caché del conteo: None para el listado sin filtro"""
+        return normalize_query(query) if query and query.strip() else None
+
+    @staticmethod
+    def _count(session, query):
+        count_stmt = ContactRepository._count_statement(query)
+        return session.execute(count_stmt).scalar() if count_stmt is not None else 0
+            
     @staticmethod
     def count_all(query=None):
         """Cuenta el total de contactos, opcionalmente con filtro de búsqueda"""
+        cache_key = ContactRepository._count_cache_key(query)
+        total, generation = ContactCountCache.get(cache_key)
+        if total is not None:
+            return total
         with Session(engine) as session:
-            stmt = session.query(Contact)
-            if query:
-                term = query.strip()
-                filter_cond = or_(
-                    Contact.first_name.ilike(f"%{term}%"),
-                    Contact.last_name.ilike(f"%{term}%"),
-                    Contact.phone_1.ilike(f"%{term}%")
+            total = ContactRepository._count(session, query)
+        ContactCountCache.set(cache_key, total, generation)
+        return total
+
+    @staticmethod
+    def get_filtered(tag_ids=None, missing_phone=False, missing_email=False, status=None, with_tags=False,
+                     segment=None, columns=None):
+        """
+        Obtiene contactos filtrados por múltiples criterios para reportes: un
+        Segment o, si no se indica, los filtros clásicos (cualquiera de tag_ids).
+        Con with_tags=True también carga contact.tags con una sola consulta extra
+        (filtrada por la misma subconsulta), sin importar cuántos contactos haya.
+        Con columns solo se cargan esos atributos (y rowid); leer otros después
+        de cerrar la sesión falla.
+        """
+        if segment is None:
+            segment = Segment.from_filters(tag_ids, missing_phone, missing_email, status)
+        conditions = segment.conditions()
+        with Session(engine) as session:
+            stmt = session.query(Contact).filter(*conditions)
+            if columns is not None:
+                attributes = inspect(Contact).column_attrs
+                unknown = [name for name in columns if name not in attributes]
+                if unknown:
+                    raise ValueError(f"Columnas de contacto desconocidas: {unknown}")
+                stmt = stmt.options(load_only(*(getattr(Contact, name) for name in columns)))
+            contacts = stmt.all()
+            if with_tags and contacts:
+                contact_ids = stmt.with_entities(Contact.rowid).subquery()
+                tags_by_contact = TagRepository._tags_by_contact(
+                    session, ContactTag.contact_id.in_(select(contact_ids.c.rowid))
                 )
-                stmt = stmt.filter(filter_cond)
-            return stmt.count()
+                for contact in contacts:
+                    set_committed_value(contact, "tags", tags_by_contact.get(contact.rowid, []))
+            return contacts
 
     @staticmethod
-    def get_filtered(tag_ids=None, missing_phone=False, missing_email=False, status=None):
+    def count_filtered(segment=None, **filters):
+        """Cuenta los contactos del segmento (o de los filtros clásicos de reportes)"""
+        conditions = Segment.coerce(segment, **filters).conditions()
+        with Session(engine) as session:
+            return session.scalar(select(func.count()).select_from(Contact).where(*conditions))
+
+    @staticmethod
+    def iter_report_rows(segment=None, after=None, batch_size=REPORT_BATCH_SIZE, **filters):
         """
-        Obtiene contactos filtrados por múltiples criterios para reportes.
+        Recorre los contactos del segmento (o de los filtros clásicos) como ReportRow, ordenados por (nombre,
+        apellido, rowid), leyendo del cursor por lotes (yield_per) y cargando las
+        etiquetas de cada lote con una consulta. En memoria solo vive el lote
+        actual; la sesión se cierra al agotar o cerrar el generador.
+        :param after: Cursor de la fila tras la cual empieza el recorrido
         """
+        sort_key = [Contact.first_name, Contact.last_name, Contact.rowid]
+        stmt = select(
+            Contact.rowid, Contact.first_name, Contact.last_name, Contact.phone_1, Contact.email_1
+        ).where(*Segment.coerce(segment, **filters).conditions())
+        if after is not None:
+            stmt = stmt.where(tuple_(*sort_key) > tuple_(*decode_cursor(after, len(sort_key))))
+        stmt = stmt.order_by(*sort_key).execution_options(yield_per=batch_size)
+
         with Session(engine) as session:
-            stmt = session.query(Contact)
-            
-            if tag_ids:
-                stmt = stmt.join(ContactTag).filter(ContactTag.tag_type_id.in_(tag_ids))
-            
-            if missing_phone:
-                stmt = stmt.filter(or_(Contact.phone_1 == None, Contact.phone_1 == ""))
-            
-            if missing_email:
-                stmt = stmt.filter(or_(Contact.email_1 == None, Contact.email_1 == ""))
-                
-            if status:
-                stmt = stmt.filter(Contact.status == status)
-                
-            return stmt.distinct().all()
+            for batch in session.execute(stmt).partitions():
+                tags_by_contact = TagRepository._tags_by_contact(
+                    session, ContactTag.contact_id.in_([row.rowid for row in batch])
+                )
+                for row in batch:
+                    tags = tuple(tag.name for tag in tags_by_contact.get(row.rowid, ()))
+                    yield ReportRow(row.rowid, row.first_name, row.last_name, row.phone_1, row.email_1, tags)
+
+    @staticmethod
+    def get_report_page(limit=REPORT_PAGE_SIZE, after=None, segment=None, **filters):
+        """
+        Obtiene una página del reporte leyendo solo limit + 1 filas del recorrido
+        de iter_report_rows. Para volver atrás basta con guardar los cursores
+        con los que empezó cada página.
+        :return: ContactPage de ReportRow
+        """
+        rows = ContactRepository.iter_report_rows(segment, after=after, batch_size=limit + 1, **filters)
+        try:
+            items = list(islice(rows, limit + 1))
+        finally:
+            rows.close()
+        has_next = len(items) > limit
+        items = items[:limit]
+        return ContactPage(
+            items,
+            next_cursor=encode_cursor(items[-1].sort_key) if has_next else None,
+            has_next=has_next,
+            has_prev=after is not None
+        )
+
+    @staticmethod
+    def exportable_columns():
+        """Nombres de todas las columnas que admite export_columns, en el orden del modelo"""
+        return [name for name in inspect(Contact).column_attrs.keys() if name != "rowid"] + ["tags"]
+
+    @staticmethod
+    def export_columns(columns=None):
+        """
+        Expresiones SQL de las columnas a exportar, en el orden pedido. Admite
+        cualquier atributo de Contact más "tags" (nombres de etiquetas agregados
+        en SQL); rechaza los desconocidos.
+        """
+        columns = list(columns or DEFAULT_EXPORT_COLUMNS)
+        attributes = inspect(Contact).column_attrs
+        unknown = [name for name in columns if name != "tags" and name not in attributes]
+        if unknown:
+            raise ValueError(f"Columnas no válidas para exportar: {unknown}")
+        expressions = {}
+        for name in columns:
+            if name == "tags":
+                expressions[name] = ContactRepository._tag_names_column().label(name)
+                continue
+            column = attributes[name].columns[0]
+            if isinstance(column.type, Enum):
+                # El valor guardado ("Activo"), no el miembro del Enum de Python
+                column = type_coerce(column, String)
+            expressions[name] = column.label(name)
+        return expressions
+
+    @staticmethod
+    def iter_export_batches(columns=None, segment=None, batch_size=EXPORT_BATCH_SIZE, **filters):
+        """
+        Recorre los contactos del segmento (o de los filtros clásicos) como lotes de tuplas con las columnas
+        pedidas, leyendo del cursor con yield_per: la memoria no depende del
+        tamaño del segmento.
+        """
+        expressions = ContactRepository.export_columns(columns)
+        stmt = select(*expressions.values()).where(
+            *Segment.coerce(segment, **filters).conditions()
+        ).order_by(Contact.first_name, Contact.last_name, Contact.rowid).execution_options(yield_per=batch_size)
+        with Session(engine) as session:
+            for partition in session.execute(stmt).partitions():
+                yield [tuple(row) for row in partition]
+
+    @staticmethod
+    def _tag_names_column():
+        """Subconsulta correlacionada con los nombres de etiquetas del contacto, ordenados"""
+        names = select(TagType.name).join(
+            ContactTag, ContactTag.tag_type_id == TagType.id
+        ).where(ContactTag.contact_id == Contact.rowid).order_by(TagType.name).correlate(Contact).subquery()
+        return select(func.group_concat(names.c.name, ", ")).scalar_subquery()
+
+    @staticmethod
+    def get_segment_ids(segment):
+        """Ids (rowid) de los contactos del segmento, en orden de rowid"""
+        with Session(engine) as session:
+            return list(session.scalars(
+                select(Contact.rowid).where(*segment.conditions()).order_by(Contact.rowid)
+            ))
 
     @staticmethod
     def search(query_term, limit=20):
         """
-        Busca contactos por nombre, apellido o teléfono con ponderación.
-        Prioridad: Inicia con > Contiene
+        Busca contactos por nombre, teléfono, correo o notas usando el índice FTS5.
+        Cada palabra se busca por prefijo y los resultados se ordenan por relevancia bm25;
+        un número se busca como tramo de dígitos en cualquier teléfono.
         """
-        if not query_term:
+        if not query_term or not query_term.strip():
             return []
             
-        with Session(engine) as session:
-            term = query_term.strip()
-            # Condición de filtro: Coincide en nombre, apellido o teléfono
-            filter_cond = or_(
-                Contact.first_name.ilike(f"%{term}%"),
-                Contact.last_name.ilike(f"%{term}%"),
-                Contact.phone_1.ilike(f"%{term}%")
-            )
-            
-            # Lógica de ordenamiento ponderado
-            # 0 = Mayor prioridad (Empieza con)
-            # 1 = Menor prioridad (Contiene, pero no empieza con)
-            relevance = case(
-                (Contact.first_name.ilike(f"{term}%"), 0),
-                (Contact.last_name.ilike(f"{term}%"), 0),
-                (Contact.phone_1.ilike(f"{term}%"), 0),
-                else_=1
-            )
+        search = build_search(query_term)
+        if search is None:
+            return []
             
-            return session.query(Contact).filter(filter_cond).order_by(
-                relevance, 
+        with Session(engine) as session:
+            stmt = ContactRepository._apply_search(session.query(Contact), search)
+            return stmt.order_by(
+                search.rank(),
                 Contact.first_name, 
                 Contact.last_name
             ).limit(limit).all()
@@ -127,7 +396,10 @@ class ContactRepository:
         with Session(engine) as session:
             contact = Contact(**contact_data)
             session.add(contact)
+            session.flush()
+            SegmentRepository.refresh_contacts(session, [contact.rowid])
             session.commit()
+            ContactCountCache.invalidate()
             session.refresh(contact)
             return contact
     
@@ -139,11 +411,115 @@ class ContactRepository:
             if contact:
                 for key, value in contact_data.items():
                     setattr(contact, key, value)
+                session.flush()
+                SegmentRepository.refresh_contacts(session, [contact.rowid])
                 session.commit()
+                ContactCountCache.invalidate()
                 session.refresh(contact)
                 return contact
             return None
     
+    @staticmethod
+    def get_profile(contact_id):
+        """
+        Carga un contacto con etiquetas, hobbies, eventos y relaciones en ambas
+        direcciones (una consulta por colección) y devuelve un ContactProfile
+        de solo lectura, o None si no existe.
+        """
+        with Session(engine) as session:
+            contact = session.execute(
+                select(Contact).where(Contact.rowid == contact_id).options(
+                    selectinload(Contact.tags),
+                    selectinload(Contact.hobbies),
+                    selectinload(Contact.events),
+                    selectinload(Contact.relationships).options(
+                        joinedload(ContactRelationship.related_contact),
+                        joinedload(ContactRelationship.relationship_type)
+                    ),
+                    selectinload(Contact.relationships_as_related).options(
+                        joinedload(ContactRelationship.contact),
+                        joinedload(ContactRelationship.relationship_type)
+                    )
+                )
+            ).scalar_one_or_none()
+            if contact is None:
+                return None
+            return ContactProfile.from_contact(contact)
+
+    @staticmethod
+    def get_by_ids(contact_ids):
+        """Obtiene varios contactos por id, consultando por lotes"""
+        contacts = []
+        with Session(engine) as session:
+            for chunk in chunked(unique_ids(contact_ids)):
+                contacts.extend(session.query(Contact).filter(Contact.rowid.in_(chunk)).all())
+        return contacts
+
+    @staticmethod
+    def bulk_update(contact_ids, values):
+        """
+        Asigna los mismos valores a varios contactos con UPDATE ... WHERE rowid IN (...)
+        por lotes, en una sola transacción. Devuelve el número de filas afectadas.
+        """
+        ContactRepository._contact_columns(values.keys())
+        contact_ids = unique_ids(contact_ids)
+        updated = 0
+        with Session(engine) as session:
+            for chunk in chunked(contact_ids):
+                result = session.execute(
+                    update(Contact).where(Contact.rowid.in_(chunk)).values(values),
+                    execution_options={"synchronize_session": False}
+                )
+                updated += result.rowcount
+            SegmentRepository.refresh_contacts(session, contact_ids)
+            session.commit()
+        ContactCountCache.invalidate()
+        return updated
+
+    @staticmethod
+    def bulk_update_mapping(mappings):
+        """
+        Actualiza cada contacto con sus propios valores, p. ej.
+        [{"rowid": 1, "phone_1": "+58..."}, ...]. Las filas con los mismos campos
+        se envían juntas como executemany. Devuelve el número de filas afectadas.
+        """
+        groups = {}
+        for mapping in mappings:
+            fields = tuple(sorted(key for key in mapping if key != "rowid"))
+            if fields:
+                groups.setdefault(fields, []).append(mapping)
+
+        contacts = Contact.__table__
+        updated = 0
+        with Session(engine) as session:
+            for fields, rows in groups.items():
+                columns = ContactRepository._contact_columns(fields)
+                stmt = update(contacts).where(
+                    contacts.c.rowid == bindparam("b_rowid")
+                ).values({
+                    columns[field].name: bindparam(f"b_{field}", type_=columns[field].type)
+                    for field in fields
+                })
+                for chunk in chunked(rows):
+                    params = [
+                        {"b_rowid": row["rowid"], **{f"b_{field}": row[field] for field in fields}}
+                        for row in chunk
+                    ]
+                    updated += session.execute(stmt, params).rowcount
+            SegmentRepository.refresh_contacts(session, [mapping["rowid"] for mapping in mappings])
+            session.commit()
+        ContactCountCache.invalidate()
+        return updated
+
+    @staticmethod
+    def _contact_columns(fields):
+        """Columnas de contacts para los atributos dados; rechaza los desconocidos"""
+        attributes = inspect(Contact).column_attrs
+        unknown = [field for field in fields if field not in attributes or field == "rowid"]
+        if unknown:
+            raise ValueError(f"Campos de contacto no válidos para actualización masiva: {unknown}")
+        return {field: attributes[field].columns[0] for field in fields}
+
     @staticmethod
     def get_by_tag(tag_name):
         """Obtiene contactos que tienen una etiqueta específica, con carga ansiosa de etiquetas"""
@@ -158,12 +534,31 @@ class ContactRepository:
 
     @staticmethod
     def delete(contact_id):
-        """Elimina un contacto"""
+        """Elimina un contacto junto con sus filas dependientes"""
         with Session(engine) as session:
             contact = session.query(Contact).filter(Contact.rowid == contact_id).first()
             if contact:
+                # Con foreign_keys activo, las tablas sin cascada ORM deben limpiarse antes
+                session.execute(delete(ContactHobby).where(ContactHobby.contact_id == contact_id))
+                session.execute(delete(ImportantEvent).where(ImportantEvent.contact_id == contact_id))
+                session.execute(delete(ContactTag).where(ContactTag.contact_id == contact_id))
+                session.execute(delete(ContactRelationship).where(or_(
+                    ContactRelationship.contact_id == contact_id,
+                    ContactRelationship.related_contact_id == contact_id
+                )))
+                # Sus mensajes de campañas sin enviar se descartan; los enviados (o en curso)
+                # se conservan sin el contacto para el historial y el límite diario
+                session.execute(delete(CampaignMessage).where(
+                    CampaignMessage.contact_id == contact_id,
+                    CampaignMessage.status.in_([MessageStatus.PENDING, MessageStatus.FAILED, MessageStatus.SKIPPED])
+                ))
+                session.execute(update(CampaignMessage).where(
+                    CampaignMessage.contact_id == contact_id
+                ).values(contact_id=None))
+                SegmentRepository.forget_contacts(session, [contact_id])
                 session.delete(contact)
                 session.commit()
+                ContactCountCache.invalidate()
                 return True
             return False
 
@@ -190,6 +585,45 @@ class RelationshipRepository:
                 (ContactRelationship.related_contact_id == contact_id)
             ).all()
 
+    @staticmethod
+    def get_related_by_contact_ids(contact_ids):
+        """
+        Obtiene los contactos relacionados de varios contactos, en ambas
+        direcciones, como {contact_id: [RelatedContact]} con nombres y tipo de
+        relación. Una sola consulta por lote de ids, sin cargar objetos ORM.
+        Los contactos sin relaciones no aparecen.
+        """
+        contact = aliased(Contact)
+        related = aliased(Contact)
+        related_by_contact = {}
+        with Session(engine) as session:
+            for chunk in chunked(unique_ids(contact_ids)):
+                rows = session.execute(
+                    select(
+                        ContactRelationship.id,
+                        contact.rowid, contact.first_name, contact.last_name,
+                        related.rowid, related.first_name, related.last_name,
+                        RelationshipType.name,
+                    ).join(contact, contact.rowid == ContactRelationship.contact_id)
+                    .join(related, related.rowid == ContactRelationship.related_contact_id)
+                    .join(RelationshipType, RelationshipType.id == ContactRelationship.relationship_type_id)
+                    .where(or_(
+                        ContactRelationship.contact_id.in_(chunk),
+                        ContactRelationship.related_contact_id.in_(chunk)
+                    ))
+                    .order_by(ContactRelationship.id)
+                )
+                wanted = set(chunk)
+                for rel_id, a_id, a_first, a_last, b_id, b_first, b_last, type_name in rows:
+                    # Cada relación se ve desde los dos contactos que une
+                    for owner, other_id, first, last in ((a_id, b_id, b_first, b_last),
+                                                         (b_id, a_id, a_first, a_last)):
+                        if owner in wanted:
+                            related_by_contact.setdefault(owner, []).append(
+                                RelatedContact(rel_id, other_id, f"{first} {last}", type_name, first)
+                            )
+        return related_by_contact
+
 class TagRepository:
     """Repositorio para operaciones de etiquetas"""
     
@@ -207,24 +641,594 @@ class TagRepository:
                 ContactTag, 
                 (TagType.id == ContactTag.tag_type_id)
             ).filter(ContactTag.contact_id == contact_id).all()
+
+    @staticmethod
+    def get_by_contact_ids(contact_ids):
+        """
+        Obtiene las etiquetas de varios contactos como {contact_id: [TagType]},
+        consultando por lotes. Los contactos sin etiquetas no aparecen.
+        """
+        tags_by_contact = {}
+        with Session(engine) as session:
+            for chunk in chunked(unique_ids(contact_ids)):
+                tags_by_contact.update(
+                    TagRepository._tags_by_contact(session, ContactTag.contact_id.in_(chunk))
+                )
+        return tags_by_contact
+
+    @staticmethod
+    def get_restricted_contact_ids(contact_ids):
+        """Contactos, de los dados, con alguna etiqueta restringida ("No contactar"), consultando por lotes"""
+        restricted = set()
+        with Session(engine) as session:
+            for chunk in chunked(unique_ids(contact_ids)):
+                restricted.update(session.scalars(
+                    select(ContactTag.contact_id).join(
+                        TagType, TagType.id == ContactTag.tag_type_id
+                    ).where(
+                        ContactTag.contact_id.in_(chunk),
+                        TagType.is_restricted == True
+                    ).distinct()
+                ))
+        return restricted
+
+    @staticmethod
+    def _tags_by_contact(session, contact_filter):
+        """Agrupa por contacto las etiquetas de los vínculos que cumplen el filtro"""
+        rows = session.query(ContactTag.contact_id, TagType).join(
+            TagType, TagType.id == ContactTag.tag_type_id
+        ).filter(contact_filter).order_by(ContactTag.contact_id, TagType.name)
+        tags_by_contact = {}
+        for contact_id, tag_type in rows:
+            tags_by_contact.setdefault(contact_id, []).append(tag_type)
+        return tags_by_contact
             
     @staticmethod
     def bulk_add_tag(contact_ids, tag_type_id):
-        """Añade una misma etiqueta a múltiples contactos"""
-        with Session(engine) as session:
-            for contact_id in contact_ids:
-                # Verificar si ya tiene la etiqueta
-                exists = session.query(ContactTag).filter(
-                    ContactTag.contact_id == contact_id,
-                    ContactTag.tag_type_id == tag_type_id
-                ).first()
-                
-                if not exists:
-                    contact_tag = ContactTag(contact_id=contact_id, tag_type_id=tag_type_id)
-                    session.add(contact_tag)
+        """
+        Añade una misma etiqueta a múltiples contactos con INSERT OR IGNORE ... SELECT
+        por lotes. Los vínculos ya existentes y los contactos inexistentes se omiten.
+        """
+        contact_ids = unique_ids(contact_ids)
+        inserted = 0
+        with Session(engine) as session:
+            for chunk in chunked(contact_ids):
+                result = session.execute(TagRepository._insert_links(chunk, [tag_type_id]))
+                inserted += result.rowcount
+            SegmentRepository.refresh_contacts(session, contact_ids)
+            session.commit()
+        return BulkResult(inserted=inserted, skipped=len(contact_ids) - inserted)
+
+    @staticmethod
+    def bulk_remove_tag(contact_ids, tag_type_id):
+        """Quita una etiqueta de múltiples contactos; los que no la tienen se omiten"""
+        contact_ids = unique_ids(contact_ids)
+        removed = 0
+        with Session(engine) as session:
+            for chunk in chunked(contact_ids):
+                result = session.execute(
+                    delete(ContactTag).where(
+                        ContactTag.tag_type_id == tag_type_id,
+                        ContactTag.contact_id.in_(chunk)
+                    )
+                )
+                removed += result.rowcount
+            SegmentRepository.refresh_contacts(session, contact_ids)
+            session.commit()
+        return BulkResult(removed=removed, skipped=len(contact_ids) - removed)
+
+    @staticmethod
+    def bulk_replace_tags(contact_ids, tag_type_ids):
+        """
+        Deja a cada contacto exactamente con las etiquetas indicadas: quita las
+        demás y añade las que falten. Omitidos son los vínculos que ya existían.
+        """
+        contact_ids = unique_ids(contact_ids)
+        tag_type_ids = unique_ids(tag_type_ids)
+        inserted = removed = 0
+        with Session(engine) as session:
+            for chunk in chunked(contact_ids):
+                stmt = delete(ContactTag).where(ContactTag.contact_id.in_(chunk))
+                if tag_type_ids:
+                    stmt = stmt.where(ContactTag.tag_type_id.not_in(tag_type_ids))
+                removed += session.execute(stmt).rowcount
+                if tag_type_ids:
+                    inserted += session.execute(TagRepository._insert_links(chunk, tag_type_ids)).rowcount
+            SegmentRepository.refresh_contacts(session, contact_ids)
+            session.commit()
+        requested = len(contact_ids) * len(tag_type_ids)
+        return BulkResult(inserted=inserted, removed=removed, skipped=requested - inserted)
+
+    @staticmethod
+    def _insert_links(contact_ids, tag_type_ids):
+        """INSERT OR IGNORE de los vínculos contacto/etiqueta que existan en ambas tablas"""
+        pairs = select(Contact.rowid, TagType.id).join(
+            TagType, TagType.id.in_(tag_type_ids)
+        ).where(Contact.rowid.in_(contact_ids))
+        return insert(ContactTag).prefix_with("OR IGNORE").from_select(
+            ["contact_id", "tag_type_id"], pairs
+        )
+
+class SegmentRepository:
+    """
+    Repositorio de segmentos guardados. La pertenencia de cada segmento se
+    materializa en segment_members y member_count; las escrituras de
+    ContactRepository y TagRepository llaman a refresh_contacts en su misma
+    transacción para reevaluar solo los contactos que cambiaron. Los segmentos
+    con criterios relativos a la fecha se reevalúan completos una vez al día,
+    al leerlos.
+    """
+
+    @staticmethod
+    def get_all():
+        """Obtiene los segmentos guardados, por nombre"""
+        with Session(engine) as session:
+            segments = session.query(SavedSegment).order_by(SavedSegment.name).all()
+            if SegmentRepository._ensure_fresh(session, segments):
+                session.commit()
+                for saved in segments:
+                    session.refresh(saved)
+            return segments
+
+    @staticmethod
+    def get_by_id(segment_id):
+        """Obtiene un segmento guardado por id"""
+        with Session(engine) as session:
+            saved = session.get(SavedSegment, segment_id)
+            if saved and SegmentRepository._ensure_fresh(session, [saved]):
+                session.commit()
+                session.refresh(saved)
+            return saved
+
+    @staticmethod
+    def create(name, segment):
+        """Guarda un segmento y calcula su pertenencia"""
+        SegmentRepository._check_savable(segment)
+        with Session(engine) as session:
+            saved = SavedSegment(name=name, criteria=segment.to_json())
+            session.add(saved)
+            session.flush()
+            SegmentRepository._rebuild(session, saved)
+            session.commit()
+            session.refresh(saved)
+            return saved
+
+    @staticmethod
+    def update(segment_id, name=None, segment=None):
+        """Renombra un segmento o cambia sus criterios (y recalcula su pertenencia)"""
+        if segment is not None:
+            SegmentRepository._check_savable(segment)
+        with Session(engine) as session:
+            saved = session.get(SavedSegment, segment_id)
+            if not saved:
+                return None
+            if name is not None:
+                saved.name = name
+            if segment is not None:
+                saved.criteria = segment.to_json()
+                SegmentRepository._rebuild(session, saved)
+            session.commit()
+            session.refresh(saved)
+            return saved
+
+    @staticmethod
+    def delete(segment_id):
+        """Elimina un segmento guardado y su pertenencia"""
+        with Session(engine) as session:
+            saved = session.get(SavedSegment, segment_id)
+            if not saved:
+                return False
+            session.execute(delete(SegmentMember).where(SegmentMember.segment_id == segment_id))
+            session.delete(saved)
             session.commit()
             return True
 
+    @staticmethod
+    def count(segment_id):
+        """Número de contactos del segmento, leído de member_count"""
+        saved = SegmentRepository.get_by_id(segment_id)
+        return saved.member_count if saved else 0
+
+    @staticmethod
+    def get_member_ids(segment_id):
+        """Ids de los contactos del segmento, en orden de rowid"""
+        SegmentRepository.get_by_id(segment_id)  # Reevalúa si depende de la fecha
+        with Session(engine) as session:
+            return list(session.scalars(
+                select(SegmentMember.contact_id).where(
+                    SegmentMember.segment_id == segment_id
+                ).order_by(SegmentMember.contact_id)
+            ))
+
+    @staticmethod
+    def refresh(segment_id=None):
+        """
+        Recalcula por completo uno o todos los segmentos. Necesario solo tras
+        cambios que no pasan por los repositorios (p. ej. renombrar etiquetas
+        usadas por nombre en los criterios).
+        """
+        with Session(engine) as session:
+            query = session.query(SavedSegment)
+            if segment_id is not None:
+                query = query.filter(SavedSegment.id == segment_id)
+            segments = query.all()
+            for saved in segments:
+                SegmentRepository._rebuild(session, saved)
+            session.commit()
+            return len(segments)
+
+    @staticmethod
+    def refresh_contacts(session, contact_ids):
+        """
+        Reevalúa los segmentos guardados solo para los contactos indicados, dentro
+        de la transacción de quien los modificó: añade los que ahora cumplen,
+        quita los que ya no y ajusta member_count con la diferencia.
+        """
+        segments = session.query(SavedSegment).all()
+        if not segments:
+            return
+        contact_ids = unique_ids(contact_ids)
+        for saved in segments:
+            matching = select(Contact.rowid).where(*Segment.from_json(saved.criteria).conditions())
+            delta = 0
+            # El DELETE usa cada lote dos veces: medio lote para no pasar de 999 parámetros
+            for chunk in chunked(contact_ids, BULK_CHUNK_SIZE // 2):
+                delta -= session.execute(delete(SegmentMember).where(
+                    SegmentMember.segment_id == saved.id,
+                    SegmentMember.contact_id.in_(chunk),
+                    SegmentMember.contact_id.not_in(matching.where(Contact.rowid.in_(chunk)))
+                )).rowcount
+                delta += session.execute(SegmentRepository._insert_members(
+                    saved.id, matching.where(Contact.rowid.in_(chunk))
+                )).rowcount
+            if delta:
+                saved.member_count += delta
+
+    @staticmethod
+    def forget_contacts(session, contact_ids):
+        """Quita de todos los segmentos a contactos que se van a eliminar"""
+        for chunk in chunked(unique_ids(contact_ids)):
+            counts = session.execute(
+                select(SegmentMember.segment_id, func.count()).where(
+                    SegmentMember.contact_id.in_(chunk)
+                ).group_by(SegmentMember.segment_id)
+            ).all()
+            for segment_id, removed in counts:
+                session.execute(update(SavedSegment).where(SavedSegment.id == segment_id).values(
+                    member_count=SavedSegment.member_count - removed
+                ))
+            session.execute(delete(SegmentMember).where(SegmentMember.contact_id.in_(chunk)))
+
+    @staticmethod
+    def _rebuild(session, saved):
+        """Recalcula desde cero la pertenencia de un segmento"""
+        session.execute(delete(SegmentMember).where(SegmentMember.segment_id == saved.id))
+        matching = select(Contact.rowid).where(*Segment.from_json(saved.criteria).conditions())
+        saved.member_count = session.execute(SegmentRepository._insert_members(saved.id, matching)).rowcount
+        saved.refreshed_on = date.today().isoformat()
+
+    @staticmethod
+    def _ensure_fresh(session, segments):
+        """Reevalúa los segmentos que dependen de la fecha si no se evaluaron hoy"""
+        today = date.today().isoformat()
+        stale = [
+            saved for saved in segments
+            if saved.refreshed_on != today and Segment.from_json(saved.criteria).is_date_relative()
+        ]
+        for saved in stale:
+            SegmentRepository._rebuild(session, saved)
+        return bool(stale)
+
+    @staticmethod
+    def _insert_members(segment_id, contact_ids_select):
+        """INSERT OR IGNORE en segment_members de los contactos seleccionados"""
+        rows = contact_ids_select.with_only_columns(literal(segment_id), Contact.rowid)
+        return insert(SegmentMember).prefix_with("OR IGNORE").from_select(["segment_id", "contact_id"], rows)
+
+    @staticmethod
+    def _check_savable(segment):
+        """Un segmento guardado no puede depender de otro: su pertenencia quedaría desfasada"""
+        if segment.member_of is not None:
+            raise ValueError("Un segmento guardado no puede usar el criterio member_of")
+
+class CampaignRepository:
+    """
+    Repositorio de campañas y de su cola de mensajes (campaign_messages). Cada
+    cambio de estado de un mensaje es una transacción propia: un mensaje se
+    marca "Enviando" antes de llamar a WAHA y "Enviado" o "Fallido" después,
+    así que tras un cierre inesperado la campaña sigue donde se quedó y ningún
+    mensaje enviado vuelve a enviarse.
+    """
+
+    @staticmethod
+    def create(name, target, template_a, template_b, messages):
+        """
+        Crea una campaña con todos sus mensajes ya renderizados, en una transacción.
+        :param messages: Diccionarios con contact_id, recipient_name, chat_id, text y,
+                         opcionalmente, status y last_error (mensajes omitidos)
+        """
+        created_at = now_timestamp()
+        with Session(engine) as session:
+            campaign = Campaign(name=name, target=target, template_a=template_a, template_b=template_b,
+                                status=CampaignStatus.RUNNING, created_at=created_at)
+            session.add(campaign)
+            session.flush()
+            rows = [
+                {
+                    "campaign_id": campaign.id,
+                    "status": MessageStatus.PENDING,
+                    "last_error": None,
+                    "attempts": 0,
+                    "created_at": created_at,
+                    **message,
+                }
+                for message in messages
+            ]
+            for chunk in chunked(rows):
+                # Un contacto repetido en los destinatarios se encola una sola vez
+                session.execute(insert(CampaignMessage).prefix_with("OR IGNORE"), chunk)
+            session.commit()
+            session.refresh(campaign)
+            return campaign
+
+    @staticmethod
+    def get_by_id(campaign_id):
+        """Obtiene una campaña por id"""
+        with Session(engine) as session:
+            return session.get(Campaign, campaign_id)
+
+    @staticmethod
+    def get_unfinished():
+        """Campañas en curso (interrumpidas o aún sin terminar), de la más antigua a la más nueva"""
+        with Session(engine) as session:
+            return session.query(Campaign).filter(
+                Campaign.status == CampaignStatus.RUNNING
+            ).order_by(Campaign.id).all()
+
+    @staticmethod
+    def get_progress(campaign_id):
+        """Número de mensajes de la campaña por estado: {MessageStatus: n}"""
+        with Session(engine) as session:
+            rows = session.execute(
+                select(CampaignMessage.status, func.count()).where(
+                    CampaignMessage.campaign_id == campaign_id
+                ).group_by(CampaignMessage.status)
+            )
+            return {status: count for status, count in rows}
+
+    @staticmethod
+    def get_pending_batch(campaign_id, limit=OUTBOX_BATCH_SIZE):
+        """Siguientes mensajes pendientes de la campaña, en orden de encolado"""
+        with Session(engine) as session:
+            rows = session.execute(
+                select(
+                    CampaignMessage.id, CampaignMessage.contact_id, CampaignMessage.recipient_name,
+                    CampaignMessage.chat_id, CampaignMessage.text, CampaignMessage.attempts,
+                ).where(
+                    CampaignMessage.campaign_id == campaign_id,
+                    CampaignMessage.status == MessageStatus.PENDING
+                ).order_by(CampaignMessage.id).limit(limit)
+            )
+            return [OutboxMessage(*row) for row in rows]
+
+    @staticmethod
+    def count_sent_since(waha_session, since):
+        """
+        Mensajes enviados desde una sesión de WAHA a partir de una fecha (YYYY-MM-DD).
+        Cuentan también los que WAHA pudo entregar sin que conste aún: "Enviando"
+        (resultado en el búfer de otra campaña) o interrumpidos.
+        """
+        with Session(engine) as session:
+            return session.scalar(
+                select(func.count()).select_from(CampaignMessage).where(
+                    CampaignMessage.session == waha_session,
+                    or_(
+                        CampaignMessage.sent_at >= since,
+                        and_(
+                            or_(CampaignMessage.status == MessageStatus.SENDING,
+                                CampaignMessage.last_error == INTERRUPTED_ERROR),
+                            CampaignMessage.updated_at >= since
+                        )
+                    )
+                )
+            )
+
+    @staticmethod
+    def mark_sending(message_id, waha_session=None):
+        """
+        Reserva un mensaje pendiente para enviarlo (desde la sesión de WAHA indicada).
+        Devuelve False si ya no estaba pendiente (otro worker lo tomó), en cuyo caso
+        no debe enviarse.
+        """
+        with Session(engine) as session:
+            result = session.execute(
+                update(CampaignMessage).where(
+                    CampaignMessage.id == message_id,
+                    CampaignMessage.status == MessageStatus.PENDING
+                ).values(
+                    status=MessageStatus.SENDING,
+                    session=waha_session,
+                    attempts=CampaignMessage.attempts + 1,
+                    updated_at=now_timestamp()
+                )
+            )
+            session.commit()
+            return result.rowcount == 1
+
+    @staticmethod
+    def mark_sent(message_id, contact_id, channel="whatsapp"):
+        """Marca el mensaje como enviado y registra el último contacto, en la misma transacción"""
+        CampaignRepository.save_results([DeliveryResult(message_id, contact_id, now_timestamp(), None)], channel)
+
+    @staticmethod
+    def save_results(results, channel="whatsapp"):
+        """
+        Guarda un lote de resultados de envío (DeliveryResult) en una transacción:
+        estado de los mensajes, último contacto de los destinatarios y segmentos
+        guardados, con una sentencia por tabla en lugar de una por mensaje
+        """
+        sent = [r for r in results if r.error is None]
+        failed = [r for r in results if r.error is not None]
+        messages = CampaignMessage.__table__
+        contacts = Contact.__table__
+        # Último envío de cada contacto (puede aparecer más de una vez en el lote)
+        last_contact = {}
+        for result in sent:
+            last_contact[result.contact_id] = max(result.finished_at, last_contact.get(result.contact_id, ""))
+
+        with Session(engine) as session:
+            if sent:
+                session.execute(
+                    update(messages).where(messages.c.id == bindparam("b_id")).values(
+                        status=MessageStatus.SENT, sent_at=bindparam("b_at"),
+                        updated_at=bindparam("b_at"), last_error=None
+                    ),
+                    [{"b_id": r.message_id, "b_at": r.finished_at} for r in sent]
+                )
+                session.execute(
+                    update(contacts).where(contacts.c.rowid == bindparam("b_rowid")).values(
+                        last_contact_date=bindparam("b_at"), last_contact_channel=channel
+                    ),
+                    [{"b_rowid": contact_id, "b_at": sent_at} for contact_id, sent_at in last_contact.items()]
+                )
+                SegmentRepository.refresh_contacts(session, list(last_contact))
+            if failed:
+                session.execute(
+                    update(messages).where(messages.c.id == bindparam("b_id")).values(
+                        status=MessageStatus.FAILED, last_error=bindparam("b_error"), updated_at=bindparam("b_at")
+                    ),
+                    [{"b_id": r.message_id, "b_error": str(r.error), "b_at": r.finished_at} for r in failed]
+                )
+            session.commit()
+
+    @staticmethod
+    def release(message_id):
+        """Devuelve a la cola un mensaje reservado que no llegó a enviarse"""
+        with Session(engine) as session:
+            session.execute(
+                update(CampaignMessage).where(
+                    CampaignMessage.id == message_id,
+                    CampaignMessage.status == MessageStatus.SENDING
+                ).values(
+                    status=MessageStatus.PENDING,
+                    session=None,
+                    attempts=CampaignMessage.attempts - 1,
+                    updated_at=now_timestamp()
+                )
+            )
+            session.commit()
+
+    @staticmethod
+    def mark_failed(message_id, error):
+        """Marca el mensaje como fallido con el motivo"""
+        with Session(engine) as session:
+            session.execute(
+                update(CampaignMessage).where(CampaignMessage.id == message_id).values(
+                    status=MessageStatus.FAILED, last_error=str(error), updated_at=now_timestamp()
+                )
+            )
+            session.commit()
+
+    @staticmethod
+    def recover_interrupted(campaign_id):
+        """
+        Mensajes que quedaron "Enviando" por un cierre inesperado: pasan a fallidos,
+        porque WAHA pudo haberlos entregado y reenviarlos podría duplicarlos.
+        """
+        with Session(engine) as session:
+            result = session.execute(
+                update(CampaignMessage).where(
+                    CampaignMessage.campaign_id == campaign_id,
+                    CampaignMessage.status == MessageStatus.SENDING
+                ).values(status=MessageStatus.FAILED, last_error=INTERRUPTED_ERROR, updated_at=now_timestamp())
+            )
+            session.commit()
+            return result.rowcount
+
+    @staticmethod
+    def retry_failed(campaign_id, include_interrupted=False):
+        """
+        Vuelve a poner en cola los mensajes fallidos y reabre la campaña
+        :param include_interrupted: Si es True reintenta también los interrumpidos,
+                                    que WAHA pudo haber entregado (riesgo de duplicarlos)
+        """
+        conditions = [
+            CampaignMessage.campaign_id == campaign_id,
+            CampaignMessage.status == MessageStatus.FAILED
+        ]
+        if not include_interrupted:
+            conditions.append(or_(CampaignMessage.last_error.is_(None),
+                                  CampaignMessage.last_error != INTERRUPTED_ERROR))
+        with Session(engine) as session:
+            result = session.execute(
+                update(CampaignMessage).where(*conditions).values(
+                    status=MessageStatus.PENDING, updated_at=now_timestamp()
+                )
+            )
+            if result.rowcount:
+                session.execute(update(Campaign).where(Campaign.id == campaign_id).values(
+                    status=CampaignStatus.RUNNING, finished_at=None
+                ))
+            session.commit()
+            return result.rowcount
+
+    @staticmethod
+    def set_status(campaign_id, status):
+        """Cambia el estado de la campaña (y registra el final si termina)"""
+        finished_at = now_timestamp() if status != CampaignStatus.RUNNING else None
+        with Session(engine) as session:
+            session.execute(update(Campaign).where(Campaign.id == campaign_id).values(
+                status=status, finished_at=finished_at
+            ))
+            session.commit()
+
+class WhatsAppStatusRepository:
+    """Caché de resultados de verificar números en WAHA (tabla whatsapp_status)"""
+
+    @staticmethod
+    def get_fresh(phones, since):
+        """
+        Resultados guardados para los números dados, comprobados desde la fecha indicada
+        :param phones: Números normalizados (+58...)
+        :param since: Fecha y hora mínima (YYYY-MM-DD HH:MM:SS); los anteriores han caducado
+        :return: {número: fila con exists, chat_id y checked_at}
+        """
+        cached = {}
+        with Session(engine) as session:
+            for chunk in chunked(list(dict.fromkeys(phones))):
+                rows = session.execute(
+                    select(WhatsAppStatus.phone, WhatsAppStatus.exists, WhatsAppStatus.chat_id,
+                           WhatsAppStatus.checked_at).where(
+                        WhatsAppStatus.phone.in_(chunk),
+                        WhatsAppStatus.checked_at >= since
+                    )
+                )
+                cached.update((row.phone, row) for row in rows)
+        return cached
+
+    @staticmethod
+    def save(results):
+        """
+        Guarda (o reemplaza) resultados de verificación en una transacción
+        :param results: Diccionarios con phone, exists, chat_id y checked_at
+        """
+        if not results:
+            return 0
+        stmt = sqlite_insert(WhatsAppStatus)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WhatsAppStatus.phone],
+            set_={
+                "exists": stmt.excluded.exists,
+                "chat_id": stmt.excluded.chat_id,
+                "checked_at": stmt.excluded.checked_at,
+            }
+        )
+        with Session(engine) as session:
+            for chunk in chunked(results):
+                session.execute(stmt, chunk)
+            session.commit()
+        return len(results)
+
 class HobbyRepository:
     """Repositorio para operaciones de hobbies"""
     
@@ -0,0 +1,207 @@
+"""
+Índice de búsqueda de texto completo (FTS5) sobre la tabla de contactos
+"""
+import re
+from collections import namedtuple
+from sqlalchemy import text, literal_column, func
+
+# Nombre de la tabla virtual FTS5
+FTS_TABLE = "contacts_fts"
+
+# Columnas de contacts indexadas, en el mismo orden que en la tabla virtual
+FTS_COLUMNS = [
+    "first_name", "middle_name", "last_name",
+    "phone_1", "phone_2", "phone_3", "phone_4", "phone_5",
+    "email_1", "email_2", "email_3",
+    "notes",
+]
+
+# Pesos de bm25 por columna (mismo orden que FTS_COLUMNS).
+# Los nombres pesan más que los teléfonos, y estos más que correos y notas.
+FTS_WEIGHTS = [
+    10.0, 5.0, 10.0,
+    4.0, 4.0, 4.0, 4.0, 4.0,
+    2.0, 2.0, 2.0,
+    1.0,
+]
+
+_columns_sql = ", ".join(FTS_COLUMNS)
+_new_values_sql = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_old_values_sql = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+# Tabla de contenido externo: el índice no duplica los datos de contacts,
+# y los triggers lo mantienen sincronizado en cada escritura.
+SEARCH_INDEX_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_columns_sql},
+        content='contacts',
+        content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_columns_sql}) VALUES (new.rowid, {_new_values_sql});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns_sql}) VALUES ('delete', old.rowid, {_old_values_sql});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_columns_sql} ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns_sql}) VALUES ('delete', old.rowid, {_old_values_sql});
+        INSERT INTO {FTS_TABLE}(rowid, {_columns_sql}) VALUES (new.rowid, {_new_values_sql});
+    END""",
+]
+
+# Índice aparte de teléfonos: solo los dígitos de phone_1..phone_5, separados por
+# espacios, con tokenizador trigram para encontrar cualquier tramo de un número
+# ("1234567" en "0424-123-4567", "58414" en "+58 414-4202222")
+PHONE_FTS_TABLE = "contacts_phone_fts"
+PHONE_COLUMNS = ["phone_1", "phone_2", "phone_3", "phone_4", "phone_5"]
+
+# Caracteres que se quitan al guardar un teléfono como dígitos
+PHONE_SEPARATORS = [" ", "-", ".", "(", ")", "+", "/"]
+
+# trigram no puede buscar tramos de menos de tres caracteres
+MIN_PHONE_DIGITS = 3
+
+
+def _digits_sql(expression):
+    """Expresión SQL con los dígitos de un teléfono (SQLite no tiene expresiones regulares)"""
+    expression = f"coalesce({expression}, '')"
+    for separator in PHONE_SEPARATORS:
+        expression = f"replace({expression}, '{separator}', '')"
+    return expression
+
+
+def _phone_digits_sql(prefix):
+    """Dígitos de todos los teléfonos de una fila (new., old. o sin prefijo)"""
+    return " || ' ' || ".join(_digits_sql(f"{prefix}{c}") for c in PHONE_COLUMNS)
+
+
+PHONE_INDEX_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {PHONE_FTS_TABLE} USING fts5(
+        digits,
+        tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {PHONE_FTS_TABLE}_ai AFTER INSERT ON contacts BEGIN
+        INSERT INTO {PHONE_FTS_TABLE}(rowid, digits) VALUES (new.rowid, {_phone_digits_sql("new.")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {PHONE_FTS_TABLE}_ad AFTER DELETE ON contacts BEGIN
+        DELETE FROM {PHONE_FTS_TABLE} WHERE rowid = old.rowid;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {PHONE_FTS_TABLE}_au AFTER UPDATE OF {", ".join(PHONE_COLUMNS)} ON contacts BEGIN
+        DELETE FROM {PHONE_FTS_TABLE} WHERE rowid = old.rowid;
+        INSERT INTO {PHONE_FTS_TABLE}(rowid, digits) VALUES (new.rowid, {_phone_digits_sql("new.")});
+    END""",
+]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# Una búsqueda que solo tiene dígitos y separadores de teléfono
+_PHONE_QUERY_RE = re.compile(r"^[\d\s+\-.()/]+$")
+
+
+class SearchMatch(namedtuple("SearchMatch", ["table", "expression", "weights"])):
+    """Tabla FTS5 en la que se busca y expresión MATCH que se le aplica"""
+    __slots__ = ()
+
+    def condition(self):
+        """Condición WHERE ... MATCH sobre la tabla"""
+        return literal_column(self.table).op("MATCH")(self.expression)
+
+    def rank(self):
+        """Relevancia bm25 (menor es mejor), ponderada por columna"""
+        return func.bm25(literal_column(self.table), *self.weights)
+
+
+def create_search_index(connection):
+    """Crea las tablas FTS5 (general y de teléfonos) y sus triggers si no existen"""
+    for statement in SEARCH_INDEX_DDL + PHONE_INDEX_DDL:
+        connection.execute(text(statement))
+
+
+def rebuild_search_index(connection):
+    """Reconstruye los índices completos a partir de la tabla contacts"""
+    connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    rebuild_phone_index(connection)
+
+
+def rebuild_phone_index(connection):
+    """Reconstruye el índice de teléfonos a partir de la tabla contacts"""
+    connection.execute(text(f"DELETE FROM {PHONE_FTS_TABLE}"))
+    connection.execute(text(
+        f"INSERT INTO {PHONE_FTS_TABLE}(rowid, digits) SELECT rowid, {_phone_digits_sql('')} FROM contacts"
+    ))
+
+
+def drop_insert_trigger(connection):
+    """
+    Quita el trigger de inserción para cargas masivas; después se debe llamar a
+    create_search_index (que lo vuelve a crear) y a rebuild_search_index.
+    """
+    connection.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai"))
+    connection.execute(text(f"DROP TRIGGER IF EXISTS {PHONE_FTS_TABLE}_ai"))
+
+
+def search_index_exists(connection, name=FTS_TABLE):
+    """Indica si la tabla FTS5 (por defecto la general) ya existe en la base de datos"""
+    row = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": name}
+    ).first()
+    return row is not None
+
+
+def phone_digits(query_term):
+    """
+    Dígitos de una búsqueda que es un número de teléfono ("+58 414-420", "(0424) 123"),
+    o None si el texto tiene otras cosas o menos de MIN_PHONE_DIGITS dígitos
+    """
+    if not query_term or not _PHONE_QUERY_RE.match(query_term):
+        return None
+    digits = "".join(filter(str.isdigit, query_term))
+    if digits.startswith("0") and len(digits) > MIN_PHONE_DIGITS:
+        # Prefijo nacional: "0414..." también debe encontrar los guardados como "+58 414..."
+        digits = digits[1:]
+    return digits if len(digits) >= MIN_PHONE_DIGITS else None
+
+
+def build_search(query_term):
+    """
+    Búsqueda a aplicar para el texto del usuario: los números se buscan como
+    tramo de dígitos en el índice de teléfonos, el resto por prefijo en el
+    índice general (ver build_match_expression). None si no hay nada buscable.
+    """
+    digits = phone_digits(query_term)
+    if digits:
+        return SearchMatch(PHONE_FTS_TABLE, f'"{digits}"', ())
+    match_expression = build_match_expression(query_term)
+    if match_expression is None:
+        return None
+    return SearchMatch(FTS_TABLE, match_expression, tuple(FTS_WEIGHTS))
+
+
+def build_match_expression(query_term):
+    """
+    Convierte el texto escrito por el usuario en una expresión MATCH de FTS5.
+    Cada palabra se busca por prefijo y todas deben coincidir:
+    "ana 0414" -> '"ana"* "0414"*'
+    Devuelve None si el texto no contiene palabras buscables.
+    """
+    if not query_term:
+        return None
+    tokens = _TOKEN_RE.findall(query_term)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def normalize_query(query_term):
+    """
+    Forma canónica de una búsqueda (palabras en minúsculas), usada como clave
+    de caché: "  Ana,  PÉREZ" y "ana pérez" producen el mismo resultado.
+    """
+    if not query_term:
+        return ""
+    digits = phone_digits(query_term)
+    if digits:
+        # Búsqueda de teléfono: "+58 414" y "58414" son la misma
+        return f"tel:{digits}"
+    return " ".join(token.lower() for token in _TOKEN_RE.findall(query_term))
@@ -0,0 +1,206 @@
+"""
+Segmentos de contactos para CRM Personal
+
+Un Segment describe un conjunto de contactos con criterios combinables (todos
+deben cumplirse) y se compila a condiciones WHERE sobre contacts. Las
+condiciones de etiquetas son semi-joins EXISTS / NOT EXISTS correlacionados
+que usan el índice (contact_id, tag_type_id) de contact_tags, así que nunca
+hace falta DISTINCT. Los segmentos se pueden guardar como JSON con to_dict()
+y reconstruir con from_dict().
+"""
+import json
+from datetime import date, timedelta
+from sqlalchemy import and_, or_, exists, select, func
+from src.models.contact import Contact, ContactStatus
+from src.models.tag import ContactTag, TagType
+from src.models.segment import SegmentMember
+
+# Banderas de verificación filtrables (True = verificado, False = no verificado)
+VERIFICATION_FLAGS = ("is_phone_verified", "is_email_verified", "is_name_verified", "is_birthdate_verified")
+
+# Criterios del segmento y su valor por defecto (el que no filtra)
+SEGMENT_FIELDS = {
+    "tags_all": (),               # Tiene todas estas etiquetas
+    "tags_any": (),               # Tiene al menos una de estas etiquetas
+    "tags_none": (),              # No tiene ninguna de estas etiquetas
+    "exclude_restricted": False,  # Excluye contactos con etiquetas restringidas ("No contactar")
+    "status": None,               # Estado del contacto ("Activo", "Inactivo"...)
+    "is_phone_verified": None,
+    "is_email_verified": None,
+    "is_name_verified": None,
+    "is_birthdate_verified": None,
+    "missing_phone": False,
+    "missing_email": False,
+    "missing_birthdate": False,
+    "city": None,                 # Sin distinguir mayúsculas
+    "country": None,              # Sin distinguir mayúsculas
+    "last_contact_older_than": None,  # Días: sin contacto en ese plazo (o nunca contactado)
+    "last_contact_within": None,      # Días: contactado en ese plazo
+    "birthday_within": None,          # Días: cumpleaños entre hoy y hoy + N
+    "member_of": None,                # Id de un segmento guardado (su pertenencia materializada)
+}
+
+# Criterios relativos a la fecha actual: su resultado cambia con los días aunque no haya escrituras
+RELATIVE_DATE_FIELDS = ("last_contact_older_than", "last_contact_within", "birthday_within")
+
+
+class Segment:
+    """
+    Criterios de segmentación de contactos. Las etiquetas se indican por id
+    (int) o por nombre (str).
+
+        Segment(tags_any=["Cliente"], tags_none=["Proveedor"], missing_email=True)
+    """
+
+    def __init__(self, **criteria):
+        unknown = sorted(set(criteria) - set(SEGMENT_FIELDS))
+        if unknown:
+            raise ValueError(f"Criterios de segmento desconocidos: {unknown}")
+        for name, default in SEGMENT_FIELDS.items():
+            value = criteria.get(name, default)
+            if name.startswith("tags_"):
+                value = tuple(value or ())
+            setattr(self, name, value)
+        if isinstance(self.status, ContactStatus):
+            self.status = self.status.value
+
+    @classmethod
+    def from_filters(cls, tag_ids=None, missing_phone=False, missing_email=False, status=None):
+        """Segmento equivalente a los filtros clásicos de reportes (cualquiera de tag_ids)"""
+        return cls(tags_any=tag_ids, missing_phone=missing_phone, missing_email=missing_email, status=status)
+
+    @classmethod
+    def coerce(cls, segment=None, **filters):
+        """Devuelve el segmento recibido o el construido a partir de los filtros clásicos"""
+        if segment is not None:
+            if filters:
+                raise ValueError("Indique un segmento o filtros, no ambos")
+            return segment
+        return cls.from_filters(**filters)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstruye un segmento guardado con to_dict()"""
+        return cls(**dict(data or {}))
+
+    @classmethod
+    def from_json(cls, text):
+        """Reconstruye un segmento guardado con to_json()"""
+        return cls.from_dict(json.loads(text or "{}"))
+
+    def to_json(self):
+        """Criterios como texto JSON (para guardar el segmento)"""
+        return json.dumps(self.to_dict(), ensure_ascii=False, sort_keys=True)
+
+    def to_dict(self):
+        """Criterios con valor distinto del predeterminado, serializables como JSON"""
+        data = {}
+        for name, default in SEGMENT_FIELDS.items():
+            value = getattr(self, name)
+            if value != default:
+                data[name] = list(value) if name.startswith("tags_") else value
+        return data
+
+    def is_empty(self):
+        """True si el segmento no filtra nada (todos los contactos)"""
+        return not self.to_dict()
+
+    def is_date_relative(self):
+        """True si algún criterio depende de la fecha actual"""
+        return any(getattr(self, name) is not None for name in RELATIVE_DATE_FIELDS)
+
+    def conditions(self, today=None):
+        """
+        Condiciones WHERE sobre contacts para este segmento.
+        :param today: Fecha de referencia para los criterios relativos (por defecto hoy)
+        """
+        today = today or date.today()
+        conditions = []
+
+        for tag in self.tags_all:
+            conditions.append(exists(_tag_links([tag])))
+        if self.tags_any:
+            conditions.append(exists(_tag_links(self.tags_any)))
+        if self.tags_none:
+            conditions.append(~exists(_tag_links(self.tags_none)))
+        if self.exclude_restricted:
+            restricted = select(TagType.id).where(TagType.is_restricted == True)
+            conditions.append(~exists(_contact_tags().where(ContactTag.tag_type_id.in_(restricted))))
+
+        if self.status:
+            conditions.append(Contact.status == ContactStatus(self.status))
+        for flag in VERIFICATION_FLAGS:
+            value = getattr(self, flag)
+            if value is True:
+                conditions.append(getattr(Contact, flag) == True)
+            elif value is False:
+                conditions.append(or_(getattr(Contact, flag) == False, getattr(Contact, flag) == None))
+
+        if self.missing_phone:
+            conditions.append(_is_blank(Contact.phone_1))
+        if self.missing_email:
+            conditions.append(_is_blank(Contact.email_1))
+        if self.missing_birthdate:
+            conditions.append(_is_blank(Contact.birth_date))
+        if self.city:
+            conditions.append(Contact.city.collate("NOCASE") == self.city)
+        if self.country:
+            conditions.append(Contact.country.collate("NOCASE") == self.country)
+
+        # Las fechas se guardan como texto ISO ("YYYY-MM-DD[ HH:MM:SS]"): se comparan como cadenas
+        if self.last_contact_older_than is not None:
+            cutoff = (today - timedelta(days=self.last_contact_older_than)).isoformat()
+            conditions.append(or_(_is_blank(Contact.last_contact_date), Contact.last_contact_date < cutoff))
+        if self.last_contact_within is not None:
+            cutoff = (today - timedelta(days=self.last_contact_within)).isoformat()
+            conditions.append(Contact.last_contact_date >= cutoff)
+        if self.birthday_within is not None:
+            conditions.append(_birthday_within(today, self.birthday_within))
+        if self.member_of is not None:
+            conditions.append(exists(select(SegmentMember.id).where(
+                SegmentMember.segment_id == self.member_of,
+                SegmentMember.contact_id == Contact.rowid
+            )))
+
+        return conditions
+
+    def __eq__(self, other):
+        return isinstance(other, Segment) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        criteria = ", ".join(f"{name}={value!r}" for name, value in self.to_dict().items())
+        return f"<Segment({criteria})>"
+
+
+def _contact_tags():
+    """Vínculos de etiqueta del contacto de la consulta exterior"""
+    return select(ContactTag.id).where(ContactTag.contact_id == Contact.rowid)
+
+
+def _tag_links(tags):
+    """Vínculos del contacto con cualquiera de las etiquetas (ids o nombres)"""
+    ids = [tag for tag in tags if isinstance(tag, int)]
+    names = [tag for tag in tags if not isinstance(tag, int)]
+    matches = []
+    if ids:
+        matches.append(ContactTag.tag_type_id.in_(ids))
+    if names:
+        matches.append(ContactTag.tag_type_id.in_(select(TagType.id).where(TagType.name.in_(names))))
+    return _contact_tags().where(or_(*matches))
+
+
+def _is_blank(column):
+    return or_(column == None, column == "")
+
+
+def _birthday_within(today, days):
+    """Cumpleaños (mes-día) entre hoy y hoy + days; admite 'YYYY-MM-DD' y '--MM-DD'"""
+    month_day = func.substr(Contact.birth_date, -5)
+    if days >= 365:
+        return ~_is_blank(Contact.birth_date)
+    start = today.strftime("%m-%d")
+    end = (today + timedelta(days=days)).strftime("%m-%d")
+    if start <= end:
+        return month_day.between(start, end)
+    # La ventana cruza el fin de año
+    return or_(month_day >= start, and_(month_day <= end, ~_is_blank(Contact.birth_date)))
@@ -0,0 +1,58 @@
+"""
+Modelos de Campañas para CRM Personal
+"""
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Enum, Index
+import enum
+from src.models.base import Base, BaseModel
+
+class CampaignStatus(str, enum.Enum):
+    RUNNING = "En curso"       # Creada o interrumpida: se puede reanudar
+    COMPLETED = "Completada"
+    CANCELLED = "Cancelada"
+
+class MessageStatus(str, enum.Enum):
+    PENDING = "Pendiente"
+    SENDING = "Enviando"       # Reservado justo antes de llamar a WAHA
+    SENT = "Enviado"
+    FAILED = "Fallido"
+    SKIPPED = "Omitido"        # Sin teléfono o mensaje vacío: nunca se envía
+
+class Campaign(Base, BaseModel):
+    __tablename__ = 'campaigns'
+
+    name = Column(String, nullable=False)  # Ej: "Clientes - 2026-10-18 10:30"
+    target = Column(Text)  # Destinatarios: JSON del segmento
+    template_a = Column(Text, nullable=False)
+    template_b = Column(Text)
+    status = Column(Enum(CampaignStatus), nullable=False, default=CampaignStatus.RUNNING)
+    created_at = Column(String, nullable=False)  # YYYY-MM-DD HH:MM:SS
+    finished_at = Column(String)
+
+    def __repr__(self):
+        return f"<Campaign(id={self.id}, name='{self.name}', status={self.status})>"
+
+class CampaignMessage(Base, BaseModel):
+    """Mensaje ya renderizado de una campaña (outbox): se envía como mucho una vez"""
+    __tablename__ = 'campaign_messages'
+    __table_args__ = (
+        # Un mensaje por contacto y campaña: volver a encolar no duplica envíos
+        Index('uq_campaign_messages_campaign_contact', 'campaign_id', 'contact_id', unique=True),
+        # Vaciado de la cola: pendientes de una campaña en orden de id
+        Index('ix_campaign_messages_campaign_status', 'campaign_id', 'status', 'id'),
+        # Límite diario por sesión de WAHA: enviados hoy desde cada sesión
+        Index('ix_campaign_messages_session_sent', 'session', 'sent_at'),
+    )
+
+    campaign_id = Column(Integer, ForeignKey('campaigns.id'), nullable=False)
+    # Nulo si se eliminó el contacto: el mensaje enviado se conserva en el historial
+    contact_id = Column(Integer, ForeignKey('contacts.rowid'))
+    recipient_name = Column(String)
+    chat_id = Column(String)  # Ej: 584141234567@c.us
+    session = Column(String)  # Sesión de WAHA que lo envió
+    text = Column(Text)
+    status = Column(Enum(MessageStatus), nullable=False, default=MessageStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    created_at = Column(String, nullable=False)
+    updated_at = Column(String)
+    sent_at = Column(String)
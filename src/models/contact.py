@@ -1,7 +1,7 @@
 """
 Modelo de Contacto para CRM Personal
 """
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Date, Boolean, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Date, Boolean, Enum, Index, event
 from sqlalchemy.orm import relationship
 import enum
 
@@ -10,10 +10,14 @@ class ContactStatus(str, enum.Enum):
     INACTIVE = "Inactivo"
     BLOCKED = "Bloqueado"
 from src.models.base import Base
-from src.database.connection import engine
+from src.database.search_index import create_search_index
 
 class Contact(Base):
     __tablename__ = 'contacts'
+    __table_args__ = (
+        # Soporta el orden y la paginación por cursor (nombre, apellido, rowid)
+        Index('ix_contacts_name_order', 'first_name', 'last_name'),
+    )
 
     # Usar rowid como clave primaria en lugar de crear una nueva columna id
     # En SQLite, cada tabla tiene una columna rowid implícita que actúa como PK
@@ -81,6 +85,12 @@ class Contact(Base):
     # Etiquetas
     tags = relationship("TagType", secondary="contact_tags", backref="contacts")
 
+    # Hobbies
+    hobbies = relationship("Hobby", secondary="contact_hobbies", backref="contacts")
+
+    # Eventos importantes (solo lectura; se gestionan desde ImportantEvent)
+    events = relationship("ImportantEvent", viewonly=True)
+
     @property
     def full_name(self):
         """Devuelve el nombre completo del contacto"""
@@ -89,9 +99,13 @@ class Contact(Base):
     def __repr__(self):
         return f"<Contact(rowid={self.rowid}, name='{self.full_name}')>"
 
+@event.listens_for(Contact.__table__, "after_create")
+def _create_contacts_search_index(target, connection, **kw):
+    """Crea el índice FTS5 junto con la tabla de contactos"""
+    create_search_index(connection)
+
 # Importar después de Contact para evitar importación circular
 from src.models.relationship import ContactRelationship
 from src.models.tag import TagType
-
-# Crear las tablas
-Base.metadata.create_all(engine)
\ No newline at end of file
+from src.models.hobby import Hobby
+from src.models.event import ImportantEvent
\ No newline at end of file
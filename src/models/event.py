@@ -1,12 +1,15 @@
 """
 Modelos de Eventos para CRM Personal
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from src.models.base import Base, BaseModel
 
 class ImportantEvent(Base, BaseModel):
     __tablename__ = 'important_events'
+    __table_args__ = (
+        Index('ix_important_events_contact', 'contact_id'),
+    )
     
     contact_id = Column(Integer, ForeignKey('contacts.rowid'), nullable=False)
     title = Column(String, nullable=False)  # Ej: "Cumpleaños de Juan", "Aniversario de bodas"
@@ -1,7 +1,7 @@
 """
 Modelos de Hobbies para CRM Personal
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from src.models.base import Base, BaseModel
 
@@ -12,6 +12,11 @@ class Hobby(Base, BaseModel):
 
 class ContactHobby(Base, BaseModel):
     __tablename__ = 'contact_hobbies'
+    __table_args__ = (
+        # Un mismo hobby no puede repetirse en un contacto
+        Index('uq_contact_hobbies_contact_hobby', 'contact_id', 'hobby_id', unique=True),
+        Index('ix_contact_hobbies_hobby_contact', 'hobby_id', 'contact_id'),
+    )
     
     contact_id = Column(Integer, ForeignKey('contacts.rowid'), nullable=False)
     hobby_id = Column(Integer, ForeignKey('hobbies.id'), nullable=False)
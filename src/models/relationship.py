@@ -1,7 +1,7 @@
 """
 Modelos de Relaciones para CRM Personal
 """
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from src.models.base import Base, BaseModel
 
@@ -12,6 +12,11 @@ class RelationshipType(Base, BaseModel):
 
 class ContactRelationship(Base, BaseModel):
     __tablename__ = 'contact_relationships'
+    __table_args__ = (
+        # Las relaciones se consultan en ambas direcciones
+        Index('ix_contact_relationships_contact', 'contact_id', 'related_contact_id'),
+        Index('ix_contact_relationships_related', 'related_contact_id', 'contact_id'),
+    )
     
     contact_id = Column(Integer, ForeignKey('contacts.rowid'), nullable=False)
     related_contact_id = Column(Integer, ForeignKey('contacts.rowid'), nullable=False)
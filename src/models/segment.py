@@ -0,0 +1,28 @@
+"""
+Modelos de Segmentos guardados para CRM Personal
+"""
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index
+from src.models.base import Base, BaseModel
+
+class SavedSegment(Base, BaseModel):
+    __tablename__ = 'saved_segments'
+
+    name = Column(String, unique=True, nullable=False)  # Ej: "Clientes sin teléfono verificado"
+    criteria = Column(Text, nullable=False)  # JSON de Segment.to_dict()
+    member_count = Column(Integer, nullable=False, default=0)  # Se mantiene junto con segment_members
+    refreshed_on = Column(String)  # Fecha (YYYY-MM-DD) de la última evaluación completa
+
+    def __repr__(self):
+        return f"<SavedSegment(id={self.id}, name='{self.name}', members={self.member_count})>"
+
+class SegmentMember(Base, BaseModel):
+    __tablename__ = 'segment_members'
+    __table_args__ = (
+        # Un contacto aparece una sola vez por segmento
+        Index('uq_segment_members_segment_contact', 'segment_id', 'contact_id', unique=True),
+        # Actualización incremental: segmentos de los contactos modificados
+        Index('ix_segment_members_contact_segment', 'contact_id', 'segment_id'),
+    )
+
+    segment_id = Column(Integer, ForeignKey('saved_segments.id'), nullable=False)
+    contact_id = Column(Integer, ForeignKey('contacts.rowid'), nullable=False)
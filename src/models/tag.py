@@ -1,7 +1,7 @@
 """
 Modelos de Etiquetas para CRM Personal
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from src.models.base import Base, BaseModel
 
@@ -14,6 +14,11 @@ class TagType(Base, BaseModel):
 
 class ContactTag(Base, BaseModel):
     __tablename__ = 'contact_tags'
+    __table_args__ = (
+        # Una misma etiqueta no puede repetirse en un contacto
+        Index('uq_contact_tags_contact_tag', 'contact_id', 'tag_type_id', unique=True),
+        Index('ix_contact_tags_tag_contact', 'tag_type_id', 'contact_id'),
+    )
     
     contact_id = Column(Integer, ForeignKey('contacts.rowid'), nullable=False)
     tag_type_id = Column(Integer, ForeignKey('tag_types.id'), nullable=False)
@@ -0,0 +1,21 @@
+"""
+Modelo de la caché de estado de WhatsApp para CRM Personal
+"""
+from sqlalchemy import Column, String, Boolean, Index
+from src.models.base import Base, BaseModel
+
+class WhatsAppStatus(Base, BaseModel):
+    """Resultado de verificar un número en WAHA; se reutiliza mientras no caduque"""
+    __tablename__ = 'whatsapp_status'
+    __table_args__ = (
+        # Un resultado por número normalizado (+58...)
+        Index('uq_whatsapp_status_phone', 'phone', unique=True),
+    )
+
+    phone = Column(String, nullable=False)  # Formato internacional: +584141234567
+    exists = Column(Boolean, nullable=False)  # Tiene cuenta de WhatsApp
+    chat_id = Column(String)  # Ej: 584141234567@c.us, según WAHA
+    checked_at = Column(String, nullable=False)  # YYYY-MM-DD HH:MM:SS
+
+    def __repr__(self):
+        return f"<WhatsAppStatus(phone='{self.phone}', exists={self.exists}, checked_at='{self.checked_at}')>"
@@ -1,2 +1,11 @@
 from src.services.contact_service import ContactService, RelationshipService, TagService, HobbyService, EventService
-from src.services.waha_service import WahaService
+
+def __getattr__(name):
+    # WahaService y AsyncWahaService arrastran requests/httpx; se importan solo cuando se usan
+    if name == "WahaService":
+        from src.services.waha_service import WahaService
+        return WahaService
+    if name == "AsyncWahaService":
+        from src.services.async_waha_service import AsyncWahaService
+        return AsyncWahaService
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
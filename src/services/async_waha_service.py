@@ -0,0 +1,311 @@
+"""
+Servicio asíncrono para conectarse a WAHA (WhatsApp HTTP API)
+
+Misma interfaz que WahaService, con corrutinas sobre httpx, para operaciones
+con muchas llamadas (validar números, enviar desde varias sesiones): las
+peticiones se lanzan a la vez, con un máximo de simultáneas y un pool de
+conexiones compartido. Usa el mismo cortocircuito y las mismas métricas que el
+cliente síncrono. Las pantallas de Flet, que no tienen bucle de eventos, usan
+los métodos *_sync desde su hilo de trabajo.
+"""
+import asyncio
+import queue
+import threading
+import time
+import weakref
+import httpx
+from src.config.settings import settings
+from src.config.logging_config import log_info, log_error, handle_error
+from src.services.waha_client import WahaClientBase, RETRYABLE_STATUSES, UNPROCESSED_STATUSES
+from src.services.waha_service import WahaService
+from src.services.send_scheduler import TokenBucket
+
+
+class AsyncWahaClient(WahaClientBase):
+    """Cliente HTTP asíncrono de WAHA para un bucle de eventos"""
+
+    def __init__(self, max_concurrency=None, pool_size=None, **options):
+        """
+        :param max_concurrency: Peticiones simultáneas como mucho
+        :param pool_size: Conexiones que se mantienen abiertas con WAHA
+        :param options: Ver WahaClientBase
+        """
+        super().__init__(**options)
+        self.max_concurrency = max_concurrency or settings.WAHA_MAX_CONCURRENCY
+        pool_size = pool_size or settings.WAHA_POOL_SIZE
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def aclose(self):
+        """Cierra las conexiones del pool"""
+        await self.http.aclose()
+
+    async def request(self, method, url, endpoint, idempotent=True, **kwargs):
+        """
+        Hace una petición a WAHA con reintentos (ver WahaClient.request)
+        :return: Respuesta (ya comprobada con raise_for_status)
+        """
+        trial = self.breaker.before_request()
+        try:
+            return await self._request(method, url, endpoint, idempotent, **kwargs)
+        finally:
+            # Una prueba cancelada no debe dejar el cortocircuito bloqueado
+            if trial:
+                self.breaker.release_trial()
+
+    async def _request(self, method, url, endpoint, idempotent, **kwargs):
+        metrics = self.stats.endpoint(endpoint)
+        retry_statuses = RETRYABLE_STATUSES if idempotent else UNPROCESSED_STATUSES
+        retry_errors = (httpx.TransportError,) if idempotent else (httpx.ConnectError, httpx.ConnectTimeout)
+
+        attempt = 0
+        while True:
+            # La espera entre reintentos no ocupa hueco de concurrencia
+            async with self.semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await self.http.request(method, url, **kwargs)
+                except httpx.HTTPError as e:
+                    metrics.record(time.perf_counter() - started, error=True)
+                    if not (isinstance(e, retry_errors) and attempt < self.max_retries):
+                        # Conexión rechazada o sin respuesta tras los reintentos: WAHA está caído
+                        self.breaker.record_failure()
+                        raise
+                    response = None
+                    reason, retry_after = e, None
+                else:
+                    metrics.record(time.perf_counter() - started, error=response.status_code >= 400)
+                    reason, retry_after = response.status_code, response.headers.get("Retry-After")
+
+            if response is not None and not (response.status_code in retry_statuses and attempt < self.max_retries):
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                response.raise_for_status()
+                return response
+
+            attempt += 1
+            metrics.record_retry()
+            await asyncio.sleep(self.retry_delay(attempt, retry_after, endpoint, reason))
+
+
+class _BackgroundLoop:
+    """Bucle de eventos en un hilo propio, para llamar al servicio desde código síncrono"""
+
+    _loop = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls):
+        with cls._lock:
+            if cls._loop is None:
+                cls._loop = asyncio.new_event_loop()
+                threading.Thread(target=cls._loop.run_forever, name="waha-async", daemon=True).start()
+            return cls._loop
+
+    @classmethod
+    def submit(cls, coroutine):
+        """Programa la corrutina en el bucle de fondo; devuelve un concurrent.futures.Future"""
+        loop = cls.get()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coroutine.close()
+            raise RuntimeError("Los métodos *_sync no se pueden llamar desde el propio bucle de WAHA")
+        return asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+    @classmethod
+    def run(cls, coroutine):
+        return cls.submit(coroutine).result()
+
+
+class AsyncWahaService:
+    """Servicio asíncrono para operaciones de WhatsApp vía WAHA"""
+
+    BASE_URL = settings.WAHA_BASE_URL
+    API_KEY = settings.WAHA_API_KEY
+    SESSION = settings.WAHA_SESSION
+
+    # Un cliente por bucle de eventos: las conexiones de httpx pertenecen al bucle que las abrió
+    _clients = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def client(cls):
+        """Cliente del bucle de eventos actual, creado en el primer uso"""
+        loop = asyncio.get_running_loop()
+        client = cls._clients.get(loop)
+        if client is None:
+            shared = WahaService.client()
+            client = cls._clients[loop] = AsyncWahaClient(breaker=shared.breaker, metrics=shared.stats)
+        return client
+
+    @classmethod
+    async def aclose(cls):
+        """Cierra el cliente del bucle de eventos actual"""
+        client = cls._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    @classmethod
+    def _get_headers(cls):
+        """Obtiene las cabeceras para la petición"""
+        headers = {
+            "Accept": "application/json",
+            "Content-Type": "application/json"
+        }
+        if cls.API_KEY:
+            headers["X-Api-Key"] = cls.API_KEY
+        return headers
+
+    @classmethod
+    async def send_text(cls, chat_id, text, session=None):
+        """
+        Envía un mensaje de texto
+        :param chat_id: ID del chat (ej. 123123@c.us)
+        :param text: Contenido del mensaje
+        :param session: Sesión de WAHA que envía (por defecto la configurada)
+        :return: Respuesta de la API
+        """
+        url = f"{cls.BASE_URL}/api/sendText"
+        data = {
+            "chatId": chat_id,
+            "text": text,
+            "session": session or cls.SESSION
+        }
+
+        try:
+            log_info(f"Enviando mensaje a {chat_id} vía WAHA")
+            response = await cls.client().request(
+                "POST", url, "sendText", idempotent=False, json=data, headers=cls._get_headers()
+            )
+            log_info(f"Mensaje enviado exitosamente a {chat_id}")
+            return response.json()
+        except Exception as e:
+            error_msg = handle_error(e, f"enviar mensaje a {chat_id}")
+            log_error(error_msg)
+            raise
+
+    @classmethod
+    async def get_status(cls):
+        """
+        Obtiene el estado de la sesión
+        :return: Información de la sesión
+        """
+        url = f"{cls.BASE_URL}/api/sessions/{cls.SESSION}"
+
+        try:
+            log_info(f"Obteniendo estado de sesión {cls.SESSION}")
+            response = await cls.client().request("GET", url, "sessions/{session}", headers=cls._get_headers())
+            return response.json()
+        except Exception as e:
+            error_msg = handle_error(e, f"obtener estado de sesión {cls.SESSION}")
+            log_error(error_msg)
+            raise
+
+    @classmethod
+    async def get_sessions(cls):
+        """
+        Lista todas las sesiones
+        :return: Lista de sesiones
+        """
+        url = f"{cls.BASE_URL}/api/sessions"
+
+        try:
+            log_info("Listando sesiones de WAHA")
+            response = await cls.client().request("GET", url, "sessions", headers=cls._get_headers())
+            return response.json()
+        except Exception as e:
+            error_msg = handle_error(e, "listar sesiones de WAHA")
+            log_error(error_msg)
+            raise
+
+    @classmethod
+    async def check_number_status(cls, phone: str) -> dict:
+        """
+        Verifica si un número tiene cuenta de WhatsApp.
+        Retorna: {'numberExists': bool, 'canReceiveMessage': bool, ...}
+        """
+        url = f"{cls.BASE_URL}/api/{cls.SESSION}/contacts/check-exists"
+        payload = {"phone": phone}
+
+        try:
+            response = await cls.client().request(
+                "POST", url, "contacts/check-exists", json=payload, headers=cls._get_headers()
+            )
+            return response.json()
+        except Exception as e:
+            error_msg = handle_error(e, f"verificar estado de número {phone}")
+            log_error(error_msg)
+            raise
+
+    @classmethod
+    async def check_numbers(cls, phones, rate=None, on_result=None):
+        """
+        Verifica varios números a la vez (con el máximo de peticiones simultáneas del cliente)
+        :param rate: Consultas por segundo como mucho (None = sin límite)
+        :param on_result: Función (teléfono, resultado) llamada según llega cada resultado
+        :return: {teléfono: resultado, o la excepción si falló}
+        """
+        phones = list(dict.fromkeys(phones))
+        log_info(f"Verificando {len(phones)} números vía WAHA")
+        bucket = TokenBucket(rate)
+
+        async def check(phone):
+            await asyncio.sleep(bucket.reserve())
+            try:
+                result = await cls.check_number_status(phone)
+            except Exception as e:
+                result = e
+            if on_result:
+                on_result(phone, result)
+            return result
+
+        results = await asyncio.gather(*(check(phone) for phone in phones))
+        return dict(zip(phones, results))
+
+    # Envoltorios síncronos: ejecutan la corrutina en el bucle de fondo y esperan el resultado
+
+    @classmethod
+    def send_text_sync(cls, chat_id, text, session=None):
+        return _BackgroundLoop.run(cls.send_text(chat_id, text, session))
+
+    @classmethod
+    def get_status_sync(cls):
+        return _BackgroundLoop.run(cls.get_status())
+
+    @classmethod
+    def get_sessions_sync(cls):
+        return _BackgroundLoop.run(cls.get_sessions())
+
+    @classmethod
+    def check_number_status_sync(cls, phone):
+        return _BackgroundLoop.run(cls.check_number_status(phone))
+
+    @classmethod
+    def check_numbers_sync(cls, phones, rate=None):
+        return _BackgroundLoop.run(cls.check_numbers(phones, rate))
+
+    @classmethod
+    def iter_check_numbers_sync(cls, phones, rate=None):
+        """
+        Como check_numbers_sync, pero devuelve cada resultado según llega
+        :yield: (teléfono, resultado o excepción)
+        """
+        phones = list(dict.fromkeys(phones))
+        results = queue.Queue()
+        future = _BackgroundLoop.submit(
+            cls.check_numbers(phones, rate, on_result=lambda phone, result: results.put((phone, result)))
+        )
+        try:
+            for _ in phones:
+                yield results.get()
+            future.result()
+        finally:
+            # Si quien consume deja de leer, no se siguen consultando números
+            future.cancel()
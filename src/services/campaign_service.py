@@ -2,178 +2,493 @@
 Servicio para gestión de campañas de mensajes masivos
 """
 import re
-import time
 import random
-from datetime import datetime
-from src.database.repositories import ContactRepository, RelationshipRepository
+from collections import deque, namedtuple, Counter
+from datetime import date
+from functools import lru_cache
+from src.database.repositories import (
+    ContactRepository, RelationshipRepository, CampaignRepository, TagRepository, WhatsAppStatusRepository
+)
+from src.database.outbox import DeliveryBuffer, DeliveryResult, now_timestamp
+from src.models.campaign import CampaignStatus, MessageStatus
+from src.database.segments import Segment
+from src.database.profile import RelatedContact
 from src.services.contact_service import ContactService
+from src.services.phone_service import PhoneNormalizationService
+from src.services.whatsapp_validation_service import WhatsAppValidationService
 from src.services.waha_service import WahaService
+from src.services.waha_client import WahaUnavailableError
+from src.services.send_scheduler import SendScheduler
+from src.config.settings import settings
 from src.config.logging_config import log_info, log_error
 
+# Variables de plantilla que se leen del contacto y las columnas que necesitan
+CONTACT_VARIABLES = {
+    "nombre": (lambda contact: contact.first_name, ("first_name",)),
+    "apellido": (lambda contact: contact.last_name, ("last_name",)),
+    "nombre_completo": (lambda contact: f"{contact.first_name} {contact.last_name}", ("first_name", "last_name")),
+    "tratamiento": (lambda contact: contact.title or "", ("title",)),
+}
+
+# Variables que se resuelven con los contactos relacionados; admiten tipo: [$familiar:Esposa]
+RELATIONSHIP_VARIABLES = ("familiar",)
+
+# Columnas que la campaña necesita además de las de la plantilla (envío y registro)
+CAMPAIGN_BASE_COLUMNS = ("first_name", "last_name", "phone_1", "phone_2")
+
+# Motivos por los que la comprobación previa omite a un destinatario (last_error del mensaje)
+SKIP_RESTRICTED = "Etiqueta restringida"
+SKIP_NO_PHONE = "Sin teléfono"
+SKIP_INVALID_PHONE = "Teléfono no válido"
+SKIP_NO_WHATSAPP = "Sin WhatsApp"
+SKIP_DUPLICATE = "Número repetido en otro destinatario"
+SKIP_EMPTY_MESSAGE = "Mensaje vacío"
+
+# Un bloque condicional {...} o una variable [$...], en el orden en que aparecen
+_TOKEN_PATTERN = re.compile(r'\{(.*?)\}|\[\$(.*?)\]')
+_VARIABLE_PATTERN = re.compile(r'\[\$(.*?)\]')
+
+
+class CompiledTemplate:
+    """
+    Plantilla analizada una sola vez. Se guarda como una lista de partes: texto
+    literal, funciones que resuelven una variable y tuplas para los bloques
+    condicionales, que se omiten enteros si alguna de sus variables no tiene
+    valor. render() recorre esa lista sin volver a usar expresiones regulares.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.variables = ()
+        self.contact_columns = frozenset()
+        self.needs_relationships = False
+        self._parts = self._parse(template or "")
+
+    def _parse(self, template):
+        parts = []
+        position = 0
+        for match in _TOKEN_PATTERN.finditer(template):
+            parts.append(template[position:match.start()])
+            block, variable = match.groups()
+            if block is not None:
+                parts.append(tuple(self._parse_block(block)))
+            else:
+                parts.append(self._resolver(variable))
+            position = match.end()
+        parts.append(template[position:])
+        return [part for part in parts if part != ""]
+
+    def _parse_block(self, block):
+        position = 0
+        for match in _VARIABLE_PATTERN.finditer(block):
+            if match.start() > position:
+                yield block[position:match.start()]
+            yield self._resolver(match.group(1))
+            position = match.end()
+        if position < len(block):
+            yield block[position:]
+
+    def _resolver(self, variable):
+        """Función (contacto, relacionados) -> valor para una variable, registrando lo que necesita"""
+        if variable not in self.variables:
+            self.variables += (variable,)
+        name, _, relationship_type = variable.partition(":")
+        name = name.lower()
+
+        if name in RELATIONSHIP_VARIABLES:
+            self.needs_relationships = True
+            return _related_first_name(relationship_type.strip().lower() or None)
+        if name in CONTACT_VARIABLES and not relationship_type:
+            getter, columns = CONTACT_VARIABLES[name]
+            self.contact_columns |= frozenset(columns)
+            return lambda contact, relationships: getter(contact)
+        return lambda contact, relationships: None
+
+    def render(self, contact, relationships=None):
+        """
+        Mensaje para un contacto
+        :param contact: Objeto con los atributos del contacto (al menos contact_columns)
+        :param relationships: Contactos relacionados (RelatedContact), si la plantilla los usa
+        """
+        pieces = []
+        for part in self._parts:
+            if part.__class__ is str:
+                pieces.append(part)
+            elif part.__class__ is tuple:
+                block = []
+                for item in part:
+                    if item.__class__ is str:
+                        block.append(item)
+                        continue
+                    value = item(contact, relationships)
+                    if not value:
+                        break
+                    block.append(str(value))
+                else:
+                    pieces.extend(block)
+            else:
+                value = part(contact, relationships)
+                if value:
+                    pieces.append(str(value))
+        # Limpiar espacios dobles generados
+        return " ".join("".join(pieces).split())
+
+    def __repr__(self):
+        return f"<CompiledTemplate(variables={list(self.variables)})>"
+
+
+# Terminación con género de los tipos de relación predeterminados ("Esposo/a", "Compañero/a de trabajo")
+_GENDERED_ENDING = re.compile(r'o/a\b')
+
+
+@lru_cache(maxsize=256)
+def relationship_type_names(relationship_type):
+    """
+    Formas en minúsculas con las que una plantilla puede nombrar un tipo de
+    relación: "Esposo/a" -> {"esposo/a", "esposo", "esposa"},
+    "Padre/Madre" -> {"padre/madre", "padre", "madre"}
+    """
+    name = (relationship_type or "").strip().lower()
+    names = {name}
+    if _GENDERED_ENDING.search(name):
+        names.update((_GENDERED_ENDING.sub("o", name), _GENDERED_ENDING.sub("a", name)))
+    elif "/" in name:
+        names.update(part.strip() for part in name.split("/"))
+    return frozenset(names)
+
+
+def _related_first_name(relationship_type):
+    """Nombre del primer contacto relacionado, del tipo indicado si lo hay"""
+    def resolve(contact, relationships):
+        for related in relationships or ():
+            if relationship_type is None or relationship_type in relationship_type_names(related.relationship_type):
+                return related.first_name
+        return None
+    return resolve
+
+
 class TemplateEngine:
     """Motor de plantillas para personalización de mensajes"""
-    
+
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def compile(template):
+        """Analiza una plantilla una sola vez (las compiladas se reutilizan)"""
+        return CompiledTemplate(template)
+
     @staticmethod
     def process_template(template, contact, relationships=None):
         """
         Procesa una plantilla sustituyendo variables y bloques condicionales
         :param template: Texto de la plantilla
         :param contact: Objeto Contact
-        :param relationships: Lista de relaciones del contacto (opcional)
+        :param relationships: Contactos relacionados (RelatedContact) o relaciones del contacto (opcional)
         :return: Mensaje procesado
         """
         if not template:
             return ""
-            
-        # 1. Procesar bloques condicionales { ... }
-        # Busca bloques como {y a tu [$familiar]}
-        def process_conditional_block(match):
-            block_content = match.group(1)
-            
-            # Buscar variables dentro del bloque
-            vars_in_block = re.findall(r'\[\$(.*?)\]', block_content)
-            
-            # Verificar si todas las variables en el bloque se pueden resolver
-            can_resolve = True
-            resolved_content = block_content
-            
-            for var_name in vars_in_block:
-                value = TemplateEngine._get_variable_value(var_name, contact, relationships)
-                if not value:
-                    can_resolve = False
-                    break
-                resolved_content = resolved_content.replace(f"[${var_name}]", str(value))
-            
-            return resolved_content if can_resolve else ""
-
-        # Procesar condicionales anidados (limitar a 1 nivel por ahora)
-        result = re.sub(r'\{(.*?)\}', process_conditional_block, template)
-        
-        # 2. Procesar variables restantes fuera de bloques condicionales
-        def process_variable(match):
-            var_name = match.group(1)
-            value = TemplateEngine._get_variable_value(var_name, contact, relationships)
-            return str(value) if value else ""
-            
-        result = re.sub(r'\[\$(.*?)\]', process_variable, result)
-        
-        # Limpiar espacios dobles generados
-        result = re.sub(r'\s+', ' ', result).strip()
-        
-        return result
-    
-    @staticmethod
-    def _get_variable_value(var_name, contact, relationships):
-        """Obtiene el valor de una variable"""
-        var_lower = var_name.lower()
-        
-        if var_lower == "nombre":
-            return contact.first_name
-        elif var_lower == "apellido":
-            return contact.last_name
-        elif var_lower == "nombre_completo":
-            return f"{contact.first_name} {contact.last_name}"
-        elif var_lower == "tratamiento":
-            return contact.title or ""
-        elif var_lower == "familiar":
-            # Buscar una relación de tipo familia (Esposa, Hijo, etc.)
-            if relationships:
-                for rel in relationships:
-                    # Determinar el contacto relacionado
-                    related = rel.related_contact if rel.contact_id == contact.rowid else rel.contact
-                    # Simplificación: devolver el primer relacionado. 
-                    # Idealmente buscaríamos por tipo específico si se especifica, ej [$familiar:Esposa]
-                    return related.first_name
-            return None
-            
-        return None
+        if relationships:
+            relationships = [
+                rel if isinstance(rel, RelatedContact) else RelatedContact.from_relationship(rel, contact.rowid)
+                for rel in relationships
+            ]
+        return TemplateEngine.compile(template).render(contact, relationships)
+
+class PreflightResult(namedtuple("PreflightResult", ["messages", "skipped"])):
+    """
+    Resultado de la comprobación previa de una campaña: los mensajes listos para
+    enviar y los destinatarios omitidos (status=Omitido, motivo en last_error)
+    """
+    __slots__ = ()
+
+    def skip_report(self):
+        """Omitidos por motivo: {motivo: n}, de más a menos frecuente"""
+        return dict(Counter(message["last_error"] for message in self.skipped).most_common())
+
 
 class CampaignService:
     """Servicio para ejecutar campañas"""
     
     @staticmethod
-    def get_recipients(tag_filter):
-        """Obtiene la lista de contactos que recibirían el mensaje"""
+    def get_recipients(tag_filter, columns=None):
+        """
+        Obtiene la lista de contactos que recibirían el mensaje
+        :param tag_filter: Nombre de la etiqueta, id de segmento guardado o Segment con los destinatarios
+        :param columns: Si se indica, solo se cargan esas columnas (sin etiquetas)
+        """
         if not tag_filter:
             return []
-        return ContactRepository.get_by_tag(tag_filter)
+        segment = CampaignService.recipients_segment(tag_filter)
+        if columns is not None:
+            return ContactRepository.get_filtered(segment=segment, columns=columns)
+        return ContactRepository.get_filtered(segment=segment, with_tags=True)
+
+    @staticmethod
+    def recipients_segment(tag_filter):
+        """
+        Segmento de destinatarios: el recibido, la pertenencia de un segmento
+        guardado (id entero) o los contactos con la etiqueta (nombre)
+        """
+        if isinstance(tag_filter, Segment):
+            return tag_filter
+        if isinstance(tag_filter, int):
+            return Segment(member_of=tag_filter)
+        return Segment(tags_any=[tag_filter])
+
+    @staticmethod
+    def preflight(tag_filter, template_a, template_b=None):
+        """
+        Comprobación previa de todos los destinatarios a la vez, antes de crear la
+        campaña: omite a quien tiene una etiqueta restringida, no tiene teléfono
+        válido o consta sin WhatsApp en la caché de verificación, y deja un solo
+        destinatario por número. Solo se renderizan los mensajes que se van a enviar.
+        :return: PreflightResult con los mensajes (contact_id, recipient_name, chat_id
+                 y text) y los omitidos
+        """
+        # Plantillas analizadas una vez; de los destinatarios solo se cargan las columnas que usan
+        compiled_a = TemplateEngine.compile(template_a)
+        compiled_b = TemplateEngine.compile(template_b) if template_b else None
+        templates = [t for t in (compiled_a, compiled_b) if t]
+        columns = set(CAMPAIGN_BASE_COLUMNS).union(*(t.contact_columns for t in templates))
+        target_contacts = CampaignService.get_recipients(tag_filter, columns=sorted(columns))
+
+        skipped = []
+
+        def skip(contact, reason, chat_id=None):
+            skipped.append({
+                "contact_id": contact.rowid,
+                "recipient_name": contact.full_name,
+                "chat_id": chat_id,
+                "text": None,
+                "status": MessageStatus.SKIPPED,
+                "last_error": reason,
+            })
+
+        # 1. Etiquetas restringidas ("No contactar") y teléfonos, normalizados (+58...)
+        restricted = TagRepository.get_restricted_contact_ids([contact.rowid for contact in target_contacts])
+        candidates = []
+        for contact in target_contacts:
+            if contact.rowid in restricted:
+                skip(contact, SKIP_RESTRICTED)
+                continue
+            raw_phones = [raw for raw in (contact.phone_1, contact.phone_2) if raw and raw.strip()]
+            if not raw_phones:
+                skip(contact, SKIP_NO_PHONE)
+                continue
+            phones = [PhoneNormalizationService.normalize(raw) for raw in raw_phones]
+            phones = list(dict.fromkeys(p for p in phones if PhoneNormalizationService.is_valid_format(p)))
+            if not phones:
+                skip(contact, SKIP_INVALID_PHONE)
+                continue
+            candidates.append((contact, phones))
+
+        # 2. Caché de WhatsApp: el primer teléfono que no consta sin WhatsApp
+        #    (los no verificados se intentan igualmente)
+        cached = WhatsAppStatusRepository.get_fresh(
+            [phone for _, phones in candidates for phone in phones],
+            WhatsAppValidationService.cache_cutoff()
+        )
+        ready = []
+        for contact, phones in candidates:
+            phone = next((p for p in phones if p not in cached or cached[p].exists), None)
+            if phone is None:
+                skip(contact, SKIP_NO_WHATSAPP)
+                continue
+            status = cached.get(phone)
+            chat_id = status.chat_id if status is not None and status.chat_id else f"{phone.lstrip('+')}@c.us"
+            ready.append((contact, chat_id))
+
+        # Relaciones de todos los destinatarios de una vez, no una consulta por envío,
+        # y solo si alguna plantilla usa variables de relación
+        relationships_by_contact = {}
+        if any(t.needs_relationships for t in templates):
+            relationships_by_contact = RelationshipRepository.get_related_by_contact_ids(
+                [contact.rowid for contact, _ in ready]
+            )
+
+        messages = []
+        seen_chats = set()
+        for contact, chat_id in ready:
+            # 3. Un solo mensaje por número, aunque lo compartan varios contactos
+            if chat_id in seen_chats:
+                skip(contact, SKIP_DUPLICATE, chat_id)
+                continue
+            # Selección aleatoria de plantilla para simulación humana / A/B simple
+            template = compiled_b if compiled_b and random.choice([True, False]) else compiled_a
+            message_text = template.render(contact, relationships_by_contact.get(contact.rowid, []))
+            if not message_text.strip():
+                # El número queda libre para otro contacto que lo comparta
+                skip(contact, SKIP_EMPTY_MESSAGE, chat_id)
+                continue
+            seen_chats.add(chat_id)
+            messages.append({
+                "contact_id": contact.rowid,
+                "recipient_name": contact.full_name,
+                "chat_id": chat_id,
+                "text": message_text,
+            })
+
+        result = PreflightResult(messages, skipped)
+        if skipped:
+            report = ", ".join(f"{reason}: {n}" for reason, n in result.skip_report().items())
+            log_info(f"Comprobación previa: {len(messages)} mensajes listos, {len(skipped)} omitidos ({report})")
+        return result
+
+    @staticmethod
+    def prepare_messages(tag_filter, template_a, template_b=None):
+        """
+        Renderiza el mensaje de cada destinatario, sin enviar nada (ver preflight)
+        :return: Lista de diccionarios con contact_id, recipient_name, chat_id y text;
+                 los que no se pueden enviar llevan además status=Omitido y last_error
+        """
+        result = CampaignService.preflight(tag_filter, template_a, template_b)
+        return result.messages + result.skipped
+
+    @staticmethod
+    def create_campaign(tag_filter, template_a, template_b=None, name=None):
+        """
+        Crea una campaña y encola (outbox) todos sus mensajes ya renderizados
+        :return: Campaign, o None si no hay destinatarios
+        """
+        messages = CampaignService.prepare_messages(tag_filter, template_a, template_b)
+        if not messages:
+            return None
+        segment = CampaignService.recipients_segment(tag_filter)
+        if not name:
+            if isinstance(tag_filter, str):
+                label = tag_filter
+            elif isinstance(tag_filter, int):
+                label = f"Segmento {tag_filter}"
+            else:
+                label = "Segmento personalizado"
+            name = f"{label} - {now_timestamp()}"
+        campaign = CampaignRepository.create(name, segment.to_json(), template_a, template_b, messages)
+        log_info(f"Campaña {campaign.id} creada con {len(messages)} mensajes en cola")
+        return campaign
+
+    @staticmethod
+    def get_unfinished():
+        """Campañas en curso o interrumpidas, que se pueden reanudar"""
+        return CampaignRepository.get_unfinished()
+
+    @staticmethod
+    def get_progress(campaign_id):
+        """Mensajes de la campaña por estado: {MessageStatus: n}"""
+        return CampaignRepository.get_progress(campaign_id)
+
+    @staticmethod
+    def create_scheduler(sessions=None):
+        """Planificador de envíos con las sesiones y el ritmo configurados"""
+        return SendScheduler(
+            sessions or settings.WAHA_SESSIONS,
+            lambda chat_id, text, waha_session: WahaService.send_text(chat_id, text, session=waha_session)
+        )
+
+    @staticmethod
+    def run_campaign(campaign_id, scheduler=None):
+        """
+        Envía los mensajes pendientes de una campaña, repartidos entre las sesiones
+        del planificador. Sirve también para reanudarla tras un cierre: continúa por
+        el primer mensaje no enviado.
+        :param scheduler: SendScheduler para pausar, detener o estimar el fin desde otro hilo
+        :yield: (mensajes terminados, total, estado)
+        """
+        scheduler = scheduler or CampaignService.create_scheduler()
+        interrupted = CampaignRepository.recover_interrupted(campaign_id)
+        if interrupted:
+            log_info(f"Campaña {campaign_id}: {interrupted} mensajes interrumpidos marcados como fallidos")
+        
+        progress = CampaignRepository.get_progress(campaign_id)
+        total = sum(progress.values())
+        pending = progress.get(MessageStatus.PENDING, 0)
+        done = total - pending
+        skipped = progress.get(MessageStatus.SKIPPED, 0)
+        verb = "Reanudando" if done > skipped else "Iniciando"
+        yield done, total, f"{verb} campaña para {total} contactos ({pending} pendientes, {skipped} omitidos)..."
+        
+        batch = deque()
+        
+        def next_message(waha_session):
+            """Siguiente mensaje pendiente, reservado para la sesión que tiene turno"""
+            while True:
+                if not batch:
+                    batch.extend(CampaignRepository.get_pending_batch(campaign_id))
+                    if not batch:
+                        return None
+                message = batch.popleft()
+                if CampaignRepository.mark_sending(message.id, waha_session):
+                    return message
+        
+        today = date.today().isoformat()
+        # Los resultados se guardan por lotes (write-behind); el bloque with escribe lo que
+        # quede al terminar, detenerse o fallar. Si la aplicación muere antes, los mensajes
+        # siguen "Enviando" y recover_interrupted los da por fallidos: nunca se reenvían.
+        with DeliveryBuffer(
+            CampaignRepository.save_results,
+            settings.CAMPAIGN_RESULTS_FLUSH_SIZE,
+            settings.CAMPAIGN_RESULTS_FLUSH_SECONDS
+        ) as results:
+            for waha_session, message, error in scheduler.run(
+                next_message,
+                remaining=pending,
+                daily_sent=lambda waha_session: CampaignRepository.count_sent_since(waha_session, today)
+            ):
+                if isinstance(error, WahaUnavailableError):
+                    # No se llegó a llamar a WAHA: el mensaje vuelve a la cola y el planificador queda en pausa
+                    CampaignRepository.release(message.id)
+                    yield done, total, f"WAHA no disponible; envío en pausa {error.retry_after:.0f} s"
+                    continue
+                done += 1
+                results.add(DeliveryResult(message.id, message.contact_id, now_timestamp(), error))
+                if error is None:
+                    yield done, total, f"Enviado a {message.recipient_name} ({waha_session})"
+                else:
+                    log_error(f"Fallo envío a {message.recipient_name}: {error}")
+                    yield done, total, f"Error: {message.recipient_name}"
+        
+        if scheduler.exhausted:
+            CampaignRepository.set_status(campaign_id, CampaignStatus.COMPLETED)
+            log_info(f"Campaña {campaign_id} completada")
+        elif scheduler.stopped:
+            yield done, total, "Campaña detenida; se puede reanudar más tarde"
+        elif scheduler.capped_sessions:
+            yield done, total, "Límite diario de envíos alcanzado; reanude la campaña mañana"
+        else:
+            yield done, total, "WAHA no disponible; reanude la campaña más tarde"
 
     @staticmethod
-    def send_campaign(tag_filter, template_a, template_b=None, dry_run=False):
+    def send_campaign(tag_filter, template_a, template_b=None, dry_run=False, scheduler=None):
         """
         Ejecuta una campaña de envío
-        :param tag_filter: Nombre de la etiqueta para filtrar (o None para todos - CUIDADO)
+        :param tag_filter: Nombre de la etiqueta, id de segmento guardado o Segment con los destinatarios
         :param template_a: Plantilla principal
         :param template_b: Plantilla alternativa (A/B testing)
-        :param dry_run: Si es True, no envía mensajes reales
+        :param dry_run: Si es True, no envía mensajes reales ni crea la campaña
+        :param scheduler: SendScheduler con el que se envía (ver run_campaign)
         :yield: Progreso y estado
         """
-        # Obtener contactos usando el nuevo método con eager loading
-        target_contacts = ContactRepository.get_by_tag(tag_filter) if tag_filter else []
+        if not tag_filter:
+            yield 0, 0, "Error: Se requiere una etiqueta para filtrar"
+            return
+        
+        if not dry_run:
+            campaign = CampaignService.create_campaign(tag_filter, template_a, template_b)
+            if not campaign:
+                yield 0, 0, f"No se encontraron contactos con la etiqueta '{tag_filter}'"
+                return
+            yield from CampaignService.run_campaign(campaign.id, scheduler)
+            return
         
-        if not target_contacts and tag_filter:
+        messages = CampaignService.prepare_messages(tag_filter, template_a, template_b)
+        if not messages:
             yield 0, 0, f"No se encontraron contactos con la etiqueta '{tag_filter}'"
             return
-        elif not tag_filter:
-             yield 0, 0, "Error: Se requiere una etiqueta para filtrar"
-             return
-
-        total = len(target_contacts)
-        yield 0, total, f"Iniciando campaña para {total} contactos..."
         
-        for i, contact in enumerate(target_contacts):
-            # 1. Seleccionar plantilla
-            template = template_a
-            if template_b:
-                # Selección aleatoria para simulación humana / A/B simple
-                if random.choice([True, False]):
-                    template = template_b
-            
-            # 2. Obtener relaciones para variables condicionales
-            relationships = rel_repo.get_by_contact_id(contact.rowid)
-            
-            # 3. Procesar mensaje
-            message_text = TemplateEngine.process_template(template, contact, relationships)
-            
-            if not message_text.strip():
-                log_info(f"Mensaje vacío para {contact.full_name}, saltando.")
-                continue
-            
-            # 4. Enviar (o simular)
-            phone = contact.phone_1
-            # Limpiar teléfono (simple)
-            if phone:
-                phone = "".join(filter(str.isdigit, phone))
-            
-            if not phone:
-                log_info(f"Contacto {contact.full_name} sin teléfono válido.")
-                yield i + 1, total, f"Saltado: {contact.full_name} (Sin teléfono)"
-                continue
-                
-            # Formato internacional simple (asumiendo local si no tiene CC)
-            # Esto es crítico para WAHA. Asumimos que el usuario guarda con código o ajustamos aquí.
-            chat_id = f"{phone}@c.us"
-            
-            if not dry_run:
-                try:
-                    # Simular comportamiento humano (delay aleatorio)
-                    # Entre 5 y 15 segundos para evitar ban
-                    delay = random.uniform(5.0, 15.0)
-                    time.sleep(delay)
-                    
-                    WahaService.send_text(chat_id, message_text)
-                    
-                    # 5. Actualizar historial
-                    contact_data = {
-                        "last_contact_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "last_contact_channel": "whatsapp"
-                    }
-                    ContactRepository.update(contact.rowid, contact_data)
-                    
-                    yield i + 1, total, f"Enviado a {contact.full_name}"
-                    
-                except Exception as e:
-                    log_error(f"Fallo envío a {contact.full_name}: {e}")
-                    yield i + 1, total, f"Error: {contact.full_name}"
+        total = len(messages)
+        yield 0, total, f"Iniciando campaña para {total} contactos..."
+        for i, message in enumerate(messages):
+            name = message["recipient_name"]
+            if message.get("status") == MessageStatus.SKIPPED:
+                yield i + 1, total, f"Saltado: {name} ({message['last_error']})"
             else:
-                yield i + 1, total, f"Simulado: {contact.full_name} -> {message_text[:30]}..."
+                yield i + 1, total, f"Simulado: {name} -> {message['text'][:30]}..."
@@ -1,7 +1,8 @@
 """
 Servicio de gestión de contactos para CRM Personal
 """
-from src.database.repositories import ContactRepository, RelationshipRepository, TagRepository, HobbyRepository, EventRepository
+from src.database.repositories import ContactRepository, RelationshipRepository, TagRepository, HobbyRepository, EventRepository, SegmentRepository
+from src.database.reports import REPORT_PAGE_SIZE
 from src.config.logging_config import log_info, log_error, handle_error
 
 class ContactService:
@@ -30,6 +31,30 @@ class ContactService:
             log_error(error_msg)
             raise
             
+    @staticmethod
+    def get_page(items_per_page=10, query=None, after=None, before=None):
+        """Obtiene una página de contactos por cursor, opcionalmente filtrados"""
+        try:
+            page = ContactRepository.get_page(limit=items_per_page, query=query, after=after, before=before)
+            log_info(f"Obtenida página por cursor con {len(page)} contactos (Filtro: {query})")
+            return page
+        except Exception as e:
+            error_msg = handle_error(e, "obtener página de contactos por cursor")
+            log_error(error_msg)
+            raise
+            
+    @staticmethod
+    def get_page_with_count(items_per_page=10, query=None, after=None, before=None):
+        """Obtiene una página por cursor junto con el total de coincidencias (page.total)"""
+        try:
+            page = ContactRepository.get_page_with_count(limit=items_per_page, query=query, after=after, before=before)
+            log_info(f"Obtenida página por cursor con {len(page)} de {page.total} contactos (Filtro: {query})")
+            return page
+        except Exception as e:
+            error_msg = handle_error(e, "obtener página de contactos con total")
+            log_error(error_msg)
+            raise
+            
     @staticmethod
     def search(query_term):
         """Busca contactos por término"""
@@ -54,16 +79,65 @@ class ContactService:
             raise
 
     @staticmethod
-    def get_filtered(tag_ids=None, missing_phone=False, missing_email=False, status=None):
-        """Obtiene contactos filtrados para reportes"""
+    def get_filtered(tag_ids=None, missing_phone=False, missing_email=False, status=None, with_tags=False,
+                     segment=None):
+        """Obtiene contactos filtrados o de un segmento (con sus etiquetas si with_tags=True)"""
         try:
-            contacts = ContactRepository.get_filtered(tag_ids, missing_phone, missing_email, status)
+            contacts = ContactRepository.get_filtered(
+                tag_ids, missing_phone, missing_email, status, with_tags, segment=segment
+            )
             log_info(f"Reporte: {len(contacts)} resultados encontrados")
             return contacts
         except Exception as e:
             error_msg = handle_error(e, "obtener contactos filtrados para reporte")
             log_error(error_msg)
             raise
+
+    @staticmethod
+    def count_filtered(**filters):
+        """Cuenta los contactos que cumplen los filtros del reporte"""
+        try:
+            total = ContactRepository.count_filtered(**filters)
+            log_info(f"Reporte: {total} resultados encontrados")
+            return total
+        except Exception as e:
+            error_msg = handle_error(e, "contar contactos filtrados para reporte")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def get_segment_ids(segment):
+        """Obtiene los ids de los contactos de un segmento"""
+        try:
+            contact_ids = ContactRepository.get_segment_ids(segment)
+            log_info(f"Segmento {segment}: {len(contact_ids)} contactos")
+            return contact_ids
+        except Exception as e:
+            error_msg = handle_error(e, f"obtener contactos del segmento {segment}")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def get_report_page(limit=REPORT_PAGE_SIZE, after=None, **filters):
+        """Obtiene una página del reporte (ContactPage de ReportRow)"""
+        try:
+            page = ContactRepository.get_report_page(limit, after, **filters)
+            log_info(f"Obtenida página de reporte con {len(page)} filas")
+            return page
+        except Exception as e:
+            error_msg = handle_error(e, "obtener página del reporte")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def iter_report_rows(**filters):
+        """Recorre por lotes todas las filas del reporte (ReportRow)"""
+        try:
+            yield from ContactRepository.iter_report_rows(**filters)
+        except Exception as e:
+            error_msg = handle_error(e, "recorrer filas del reporte")
+            log_error(error_msg)
+            raise
     
     @staticmethod
     def get_by_id(contact_id):
@@ -107,6 +181,57 @@ class ContactService:
             log_error(error_msg)
             raise
     
+    @staticmethod
+    def get_profile(contact_id):
+        """Obtiene el perfil completo de un contacto (datos, etiquetas, hobbies, eventos y relaciones)"""
+        try:
+            profile = ContactRepository.get_profile(contact_id)
+            if profile:
+                log_info(f"Perfil obtenido: {profile.full_name}")
+            else:
+                log_info(f"Contacto con ID {contact_id} no encontrado")
+            return profile
+        except Exception as e:
+            error_msg = handle_error(e, f"obtener perfil del contacto ID {contact_id}")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def get_by_ids(contact_ids):
+        """Obtiene varios contactos por id"""
+        try:
+            contacts = ContactRepository.get_by_ids(contact_ids)
+            log_info(f"Obtenidos {len(contacts)} contactos por id")
+            return contacts
+        except Exception as e:
+            error_msg = handle_error(e, "obtener contactos por id")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def bulk_update(contact_ids, values):
+        """Asigna los mismos valores a varios contactos"""
+        try:
+            updated = ContactRepository.bulk_update(contact_ids, values)
+            log_info(f"Actualización masiva de {list(values)}: {updated} contactos")
+            return updated
+        except Exception as e:
+            error_msg = handle_error(e, "actualizar contactos masivamente")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def bulk_update_mapping(mappings):
+        """Actualiza varios contactos, cada uno con sus propios valores"""
+        try:
+            updated = ContactRepository.bulk_update_mapping(mappings)
+            log_info(f"Actualización masiva por contacto: {updated} contactos")
+            return updated
+        except Exception as e:
+            error_msg = handle_error(e, "actualizar contactos masivamente")
+            log_error(error_msg)
+            raise
+
     @staticmethod
     def delete(contact_id):
         """Elimina un contacto"""
@@ -220,19 +345,55 @@ class TagService:
             error_msg = handle_error(e, f"obtener etiquetas para contacto ID {contact_id}")
             log_error(error_msg)
             raise
+
+    @staticmethod
+    def get_by_contact_ids(contact_ids):
+        """Obtiene las etiquetas de varios contactos como {contact_id: [TagType]}"""
+        try:
+            tags_by_contact = TagRepository.get_by_contact_ids(contact_ids)
+            log_info(f"Obtenidas etiquetas de {len(tags_by_contact)} contactos")
+            return tags_by_contact
+        except Exception as e:
+            error_msg = handle_error(e, "obtener etiquetas de varios contactos")
+            log_error(error_msg)
+            raise
             
     @staticmethod
     def bulk_add_tag(contact_ids, tag_type_id):
         """Añade una misma etiqueta a múltiples contactos"""
         try:
-            success = TagRepository.bulk_add_tag(contact_ids, tag_type_id)
-            log_info(f"Etiqueta {tag_type_id} añadida a {len(contact_ids)} contactos")
-            return success
+            result = TagRepository.bulk_add_tag(contact_ids, tag_type_id)
+            log_info(f"Etiqueta {tag_type_id} aplicada a {len(contact_ids)} contactos: {result}")
+            return result
         except Exception as e:
             error_msg = handle_error(e, "añadir etiqueta masiva")
             log_error(error_msg)
             raise
 
+    @staticmethod
+    def bulk_remove_tag(contact_ids, tag_type_id):
+        """Quita una misma etiqueta de múltiples contactos"""
+        try:
+            result = TagRepository.bulk_remove_tag(contact_ids, tag_type_id)
+            log_info(f"Etiqueta {tag_type_id} quitada de {len(contact_ids)} contactos: {result}")
+            return result
+        except Exception as e:
+            error_msg = handle_error(e, "quitar etiqueta masiva")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def bulk_replace_tags(contact_ids, tag_type_ids):
+        """Reemplaza las etiquetas de múltiples contactos por las indicadas"""
+        try:
+            result = TagRepository.bulk_replace_tags(contact_ids, tag_type_ids)
+            log_info(f"Etiquetas de {len(contact_ids)} contactos reemplazadas por {list(tag_type_ids)}: {result}")
+            return result
+        except Exception as e:
+            error_msg = handle_error(e, "reemplazar etiquetas masivamente")
+            log_error(error_msg)
+            raise
+
 class HobbyService:
     """Servicio para operaciones de hobbies"""
     
@@ -285,4 +446,87 @@ class EventService:
         except Exception as e:
             error_msg = handle_error(e, "obtener todos los eventos")
             log_error(error_msg)
-            raise
\ No newline at end of file
+            raise
+
+class SegmentService:
+    """Servicio para segmentos guardados"""
+
+    @staticmethod
+    def get_all():
+        """Obtiene los segmentos guardados"""
+        try:
+            segments = SegmentRepository.get_all()
+            log_info(f"Obtenidos {len(segments)} segmentos guardados")
+            return segments
+        except Exception as e:
+            error_msg = handle_error(e, "obtener segmentos guardados")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def get_by_id(segment_id):
+        """Obtiene un segmento guardado por id"""
+        try:
+            return SegmentRepository.get_by_id(segment_id)
+        except Exception as e:
+            error_msg = handle_error(e, f"obtener segmento ID {segment_id}")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def create(name, segment):
+        """Guarda un segmento con nombre"""
+        try:
+            saved = SegmentRepository.create(name, segment)
+            log_info(f"Segmento guardado: {saved.name} ({saved.member_count} contactos)")
+            return saved
+        except Exception as e:
+            error_msg = handle_error(e, f"guardar segmento {name}")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def update(segment_id, name=None, segment=None):
+        """Renombra un segmento guardado o cambia sus criterios"""
+        try:
+            saved = SegmentRepository.update(segment_id, name=name, segment=segment)
+            if saved:
+                log_info(f"Segmento actualizado: {saved.name} ({saved.member_count} contactos)")
+            return saved
+        except Exception as e:
+            error_msg = handle_error(e, f"actualizar segmento ID {segment_id}")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def delete(segment_id):
+        """Elimina un segmento guardado"""
+        try:
+            deleted = SegmentRepository.delete(segment_id)
+            if deleted:
+                log_info(f"Segmento eliminado: ID {segment_id}")
+            return deleted
+        except Exception as e:
+            error_msg = handle_error(e, f"eliminar segmento ID {segment_id}")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def count(segment_id):
+        """Número de contactos del segmento guardado (sin recorrer contacts)"""
+        try:
+            return SegmentRepository.count(segment_id)
+        except Exception as e:
+            error_msg = handle_error(e, f"contar segmento ID {segment_id}")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def get_member_ids(segment_id):
+        """Ids de los contactos del segmento guardado"""
+        try:
+            return SegmentRepository.get_member_ids(segment_id)
+        except Exception as e:
+            error_msg = handle_error(e, f"obtener contactos del segmento ID {segment_id}")
+            log_error(error_msg)
+            raise
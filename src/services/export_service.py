@@ -0,0 +1,149 @@
+"""
+Servicio de exportación de segmentos de contactos para CRM Personal
+"""
+import csv
+import os
+from pathlib import Path
+from sqlalchemy import Boolean, Integer
+from src.database.repositories import ContactRepository
+from src.config.logging_config import log_info, log_error, handle_error
+
+# Formatos admitidos; XLSX y Parquet necesitan openpyxl y pyarrow (extra "export")
+EXPORT_FORMATS = ("csv", "xlsx", "parquet")
+
+
+class ExportService:
+    """
+    Exporta contactos filtrados a CSV, XLSX o Parquet leyendo la base de datos
+    por lotes y escribiendo cada lote al archivo según llega, de modo que la
+    memoria no crece con el número de filas. El archivo se escribe primero
+    como <destino>.part y solo se renombra al terminar.
+    """
+
+    @staticmethod
+    def export(path, fmt=None, columns=None, progress_callback=None, **filters):
+        """
+        Exporta el segmento a un archivo.
+        :param path: Ruta del archivo de destino
+        :param fmt: "csv", "xlsx" o "parquet"; por defecto se deduce de la extensión
+        :param columns: Columnas a exportar (atributos de Contact y "tags")
+        :param progress_callback: Función opcional llamada con las filas escritas hasta el momento
+        :param filters: segment=Segment o los filtros clásicos de ContactRepository.get_filtered
+        :return: Número de filas exportadas
+        """
+        try:
+            fmt = ExportService.resolve_format(path, fmt)
+            expressions = ContactRepository.export_columns(columns)
+            batches = ContactRepository.iter_export_batches(list(expressions), **filters)
+            writer = _WRITERS[fmt]
+
+            partial_path = f"{path}.part"
+            try:
+                rows = writer(partial_path, expressions, _with_progress(batches, progress_callback))
+                os.replace(partial_path, path)
+            finally:
+                batches.close()
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+
+            log_info(f"Exportados {rows} contactos a {path} ({fmt})")
+            return rows
+        except Exception as e:
+            error_msg = handle_error(e, f"exportar contactos a {path}")
+            log_error(error_msg)
+            raise
+
+    @staticmethod
+    def available_columns():
+        """
+        Columnas que se pueden elegir para exportar
+        :return: Lista de (nombre, si se exporta por defecto)
+        """
+        defaults = ContactRepository.export_columns()
+        return [(name, name in defaults) for name in ContactRepository.exportable_columns()]
+
+    @staticmethod
+    def resolve_format(path, fmt=None):
+        """Devuelve el formato pedido o el de la extensión del archivo; rechaza los desconocidos"""
+        fmt = (fmt or Path(path).suffix.lstrip(".")).lower()
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportación no soportado: {fmt!r} (use {', '.join(EXPORT_FORMATS)})")
+        return fmt
+
+
+def _with_progress(batches, progress_callback):
+    """Reenvía los lotes informando del total de filas acumulado"""
+    written = 0
+    for batch in batches:
+        yield batch
+        written += len(batch)
+        if progress_callback:
+            progress_callback(written)
+
+
+def _write_csv(path, expressions, batches):
+    rows = 0
+    # utf-8-sig: Excel reconoce la codificación y muestra bien los acentos
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(expressions))
+        for batch in batches:
+            writer.writerows(batch)
+            rows += len(batch)
+    return rows
+
+
+def _write_xlsx(path, expressions, batches):
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise ImportError("La exportación a XLSX requiere openpyxl (pip install openpyxl)") from e
+
+    # En modo write_only las filas se vuelcan a disco en lugar de quedarse en memoria
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Contactos")
+    sheet.append(list(expressions))
+    rows = 0
+    for batch in batches:
+        for row in batch:
+            sheet.append(row)
+        rows += len(batch)
+    workbook.save(path)
+    return rows
+
+
+def _write_parquet(path, expressions, batches):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("La exportación a Parquet requiere pyarrow (pip install pyarrow)") from e
+
+    schema = pa.schema([(name, _arrow_type(pa, expression.type)) for name, expression in expressions.items()])
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            # Un row group por lote: nunca hay más de un lote en memoria
+            columns = list(zip(*batch)) if batch else [[] for _ in expressions]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            rows += len(batch)
+    return rows
+
+
+def _arrow_type(pa, sql_type):
+    """Tipo de Arrow para el tipo SQL de una columna exportada"""
+    if isinstance(sql_type, Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, Integer):
+        return pa.int64()
+    return pa.string()
+
+
+_WRITERS = {
+    "csv": _write_csv,
+    "xlsx": _write_xlsx,
+    "parquet": _write_parquet,
+}
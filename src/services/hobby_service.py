@@ -24,17 +24,11 @@ class HobbyService:
         """Obtiene hobbies de un contacto"""
         try:
             with Session(engine) as session:
-                contact_hobbies = session.query(ContactHobby).filter(
+                return session.query(Hobby).join(
+                    ContactHobby, ContactHobby.hobby_id == Hobby.id
+                ).filter(
                     ContactHobby.contact_id == contact_id
                 ).all()
-                
-                hobbies = []
-                for ch in contact_hobbies:
-                    hobby = session.query(Hobby).filter(Hobby.id == ch.hobby_id).first()
-                    if hobby:
-                        hobbies.append(hobby)
-                
-                return hobbies
         except Exception as e:
             log_error(f"Error obteniendo hobbies del contacto {contact_id}: {str(e)}")
             return []
@@ -43,6 +43,10 @@ class PhoneNormalizationService:
         if len(cleaned) == 10 and cleaned.startswith('2'):
             return '+58' + cleaned
             
+        # Con código de país pero sin + (ej 584141234567)
+        if len(cleaned) == 12 and cleaned.startswith('58'):
+            return '+' + cleaned
+            
         # Caso por defecto: Si no pudimos inteligentemente deducir, devolvemos limpio
         # o añadimos + si parece le falta
         return cleaned
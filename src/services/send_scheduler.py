@@ -0,0 +1,267 @@
+"""
+Planificador de envíos de campañas para CRM Personal
+
+Reparte los mensajes entre varias sesiones de WAHA que envían en paralelo,
+cada una a su propio ritmo (cubeta de tokens con retraso aleatorio) y con un
+máximo de mensajes al día. El planificador no accede a la base de datos: pide
+cada mensaje a quien lo usa (next_message) y le devuelve los resultados desde
+run(), en el hilo de quien consume el generador.
+"""
+import math
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from src.config.settings import settings
+from src.config.logging_config import log_info
+from src.services.waha_client import WahaUnavailableError
+
+# Eventos de los hilos de sesión hacia el coordinador
+_READY = "ready"      # La sesión tiene turno: espera un mensaje (o None para terminar)
+_RESULT = "result"    # Envío terminado: (mensaje, error o None)
+_EXITED = "exited"    # El hilo de la sesión terminó
+
+
+class TokenBucket:
+    """
+    Cubeta de tokens: se repone a razón de rate tokens por segundo hasta
+    capacity. reserve() toma un token y devuelve cuántos segundos hay que
+    esperar a que esté disponible; las reservas se encadenan, así que esperas
+    sucesivas mantienen el ritmo medio aunque cada espera se retrase un poco.
+    Con rate=None no hay límite.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Toma un token y devuelve la espera (segundos) hasta poder usarlo"""
+        if not self.rate:
+            return 0.0
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class SendScheduler:
+    """
+    Envía mensajes repartidos entre sesiones de WAHA. Cada sesión envía como
+    mucho un mensaje por intervalo (más un retraso aleatorio de hasta jitter
+    segundos) y daily_cap mensajes al día. Se puede pausar, reanudar y detener
+    desde otro hilo; al detenerse termina los envíos en curso y run() acaba.
+    Si WAHA deja de responder (cortocircuito abierto) se pausa sola hasta que
+    toque volver a probar.
+    """
+
+    def __init__(self, sessions, send, interval=None, jitter=None, daily_cap=None, clock=time.monotonic):
+        """
+        :param sessions: Nombres de las sesiones de WAHA
+        :param send: Función (chat_id, texto, sesión) que envía un mensaje
+        :param interval: Segundos entre mensajes de una misma sesión (0 = sin límite)
+        :param jitter: Retraso aleatorio máximo añadido a cada envío
+        :param daily_cap: Mensajes por sesión y día
+        """
+        if not sessions:
+            raise ValueError("Se necesita al menos una sesión de WAHA")
+        self.sessions = list(sessions)
+        self.send = send
+        self.interval = settings.CAMPAIGN_SEND_INTERVAL_SECONDS if interval is None else interval
+        self.jitter = settings.CAMPAIGN_SEND_JITTER_SECONDS if jitter is None else jitter
+        self.daily_cap = settings.CAMPAIGN_DAILY_CAP if daily_cap is None else daily_cap
+        self.clock = clock
+
+        self.remaining = 0
+        self.exhausted = False  # No quedan mensajes
+        self.capped_sessions = []  # Sesiones que alcanzaron el límite diario
+        self._workers = []
+        self._events = None
+        self._running = threading.Event()  # Sin pausa
+        self._running.set()
+        self._stopped = threading.Event()
+        self._stop_requested = False
+        self._resume_timer = None
+
+    # Control desde otro hilo
+
+    def pause(self, resume_after=None):
+        """
+        Pausa los envíos; los que están en curso terminan
+        :param resume_after: Si se indica, reanuda sola pasados esos segundos
+        """
+        self._cancel_resume()
+        self._running.clear()
+        if resume_after:
+            self._resume_timer = threading.Timer(resume_after, self.resume)
+            self._resume_timer.daemon = True
+            self._resume_timer.start()
+            log_info(f"Envío de campaña en pausa durante {resume_after:.0f} s")
+        else:
+            log_info("Envío de campaña en pausa")
+
+    def resume(self):
+        """Reanuda los envíos tras una pausa"""
+        self._cancel_resume()
+        self._running.set()
+        log_info("Envío de campaña reanudado")
+
+    def stop(self):
+        """Detiene los envíos; run() termina después de devolver los que están en curso"""
+        self._cancel_resume()
+        self._stop_requested = True
+        self._stopped.set()
+        self._running.set()
+
+    def _cancel_resume(self):
+        if self._resume_timer is not None:
+            self._resume_timer.cancel()
+            self._resume_timer = None
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    @property
+    def stopped(self):
+        """True si se llamó a stop() durante la última ejecución"""
+        return self._stop_requested
+
+    def projected_finish(self, now=None):
+        """
+        Fecha y hora estimadas de fin para los mensajes que quedan, según el ritmo
+        de las sesiones y lo que a cada una le queda de su límite diario.
+        """
+        now = now or datetime.now()
+        if not self.remaining:
+            return now
+        sent_today = {worker.session: worker.sent_today for worker in self._workers}
+        left_today = sum(max(0, self.daily_cap - sent_today.get(s, 0)) for s in self.sessions)
+        active = sum(1 for s in self.sessions if sent_today.get(s, 0) < self.daily_cap)
+        if self.remaining <= left_today:
+            return now + timedelta(seconds=self._seconds_for(self.remaining, active))
+
+        # Lo que no cabe hoy se envía en los días siguientes, desde medianoche
+        pending = self.remaining - left_today
+        per_day = self.daily_cap * len(self.sessions)
+        extra_days = math.ceil(pending / per_day)
+        last_day = pending - (extra_days - 1) * per_day
+        midnight = datetime.combine(now.date() + timedelta(days=extra_days), datetime.min.time())
+        return midnight + timedelta(seconds=self._seconds_for(last_day, len(self.sessions)))
+
+    def _seconds_for(self, messages, sessions):
+        if not sessions:
+            return 0.0
+        return math.ceil(messages / sessions) * self.interval
+
+    # Ejecución
+
+    def run(self, next_message, remaining=0, daily_sent=None):
+        """
+        Envía hasta que next_message no devuelva más mensajes, todas las sesiones
+        alcancen su límite diario o se llame a stop().
+        :param next_message: Función (sesión) -> mensaje con chat_id y text, o None si no quedan;
+                             se llama en el hilo que consume este generador
+        :param remaining: Mensajes por enviar (para la estimación de fin)
+        :param daily_sent: Función (sesión) -> mensajes que ya envió hoy
+        :yield: (sesión, mensaje, error o None) por cada envío terminado
+        """
+        self._stopped.clear()
+        self._stop_requested = False
+        self._running.set()
+        self.remaining = remaining
+        self.exhausted = False
+        self.capped_sessions = []
+        self._events = queue.Queue()
+        self._workers = [
+            _SessionWorker(self, session, daily_sent(session) if daily_sent else 0)
+            for session in self.sessions
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        alive = len(self._workers)
+        try:
+            while alive:
+                kind, worker, *payload = self._events.get()
+                if kind == _READY:
+                    worker.inbox.put(self._dispatch(worker, next_message))
+                elif kind == _RESULT:
+                    message, error = payload
+                    if isinstance(error, WahaUnavailableError):
+                        # No llegó a enviarse: vuelve a contar y se espera a que WAHA responda
+                        worker.sent_today -= 1
+                        self.remaining += 1
+                        self.exhausted = False
+                        if not self._stopped.is_set():
+                            self.pause(resume_after=error.retry_after)
+                    yield worker.session, message, error
+                else:
+                    alive -= 1
+        finally:
+            # También si quien consume cierra el generador: los hilos no deben quedar esperando
+            self._cancel_resume()
+            self._stopped.set()
+            self._running.set()
+            for worker in self._workers:
+                worker.inbox.put(None)
+
+    def _dispatch(self, worker, next_message):
+        """Mensaje para la sesión que tiene turno, o None si debe terminar"""
+        if self._stopped.is_set() or self.exhausted:
+            return None
+        if worker.sent_today >= self.daily_cap:
+            self.capped_sessions.append(worker.session)
+            log_info(f"Sesión {worker.session}: límite diario de {self.daily_cap} mensajes alcanzado")
+            return None
+        message = next_message(worker.session)
+        if message is None:
+            self.exhausted = True
+            return None
+        worker.sent_today += 1
+        self.remaining = max(0, self.remaining - 1)
+        return message
+
+
+class _SessionWorker(threading.Thread):
+    """Hilo de una sesión de WAHA: espera su turno, pide un mensaje y lo envía"""
+
+    def __init__(self, scheduler, session, sent_today):
+        super().__init__(name=f"waha-{session}", daemon=True)
+        self.scheduler = scheduler
+        self.session = session
+        self.sent_today = sent_today
+        self.inbox = queue.Queue()
+        rate = 1 / scheduler.interval if scheduler.interval > 0 else None
+        self.bucket = TokenBucket(rate, clock=scheduler.clock)
+
+    def run(self):
+        scheduler = self.scheduler
+        events = scheduler._events
+        try:
+            while not scheduler._stopped.is_set():
+                # En pausa no se reservan tokens: al reanudar no hay ráfaga acumulada
+                scheduler._running.wait()
+                delay = self.bucket.reserve() + random.uniform(0, scheduler.jitter)
+                if scheduler._stopped.wait(delay):
+                    break
+                if not scheduler._running.is_set():
+                    continue
+                events.put((_READY, self))
+                message = self.inbox.get()
+                if message is None:
+                    break
+                try:
+                    scheduler.send(message.chat_id, message.text, self.session)
+                    events.put((_RESULT, self, message, None))
+                except Exception as e:
+                    events.put((_RESULT, self, message, e))
+        finally:
+            events.put((_EXITED, self))
@@ -4,6 +4,7 @@ Servicio para gestión de etiquetas
 from sqlalchemy.orm import Session
 from ..database.connection import engine
 from ..models.tag import ContactTag, TagType
+from ..database.repositories import SegmentRepository
 from ..config.logging_config import log_info, log_error
 
 class TagService:
@@ -24,17 +25,11 @@ class TagService:
         """Obtiene etiquetas de un contacto"""
         try:
             with Session(engine) as session:
-                contact_tags = session.query(ContactTag).filter(
+                return session.query(TagType).join(
+                    ContactTag, ContactTag.tag_type_id == TagType.id
+                ).filter(
                     ContactTag.contact_id == contact_id
                 ).all()
-                
-                tags = []
-                for ct in contact_tags:
-                    tag_type = session.query(TagType).filter(TagType.id == ct.tag_type_id).first()
-                    if tag_type:
-                        tags.append(tag_type)
-                
-                return tags
         except Exception as e:
             log_error(f"Error obteniendo etiquetas del contacto {contact_id}: {str(e)}")
             return []
@@ -55,6 +50,8 @@ class TagService:
                         tag_type_id=tag_type_id
                     )
                     session.add(contact_tag)
+                    session.flush()
+                    SegmentRepository.refresh_contacts(session, [contact_id])
                     session.commit()
                     return True
                 return False
@@ -74,6 +71,8 @@ class TagService:
                 
                 if contact_tag:
                     session.delete(contact_tag)
+                    session.flush()
+                    SegmentRepository.refresh_contacts(session, [contact_id])
                     session.commit()
                     return True
                 return False
@@ -0,0 +1,281 @@
+"""
+Cliente HTTP de WAHA para CRM Personal
+
+Una sola sesión de requests con pool de conexiones (keep-alive) para todas las
+llamadas a WAHA, con tiempos máximos de conexión y de lectura, reintentos con
+espera exponencial y aleatoria ante 429/5xx, un cortocircuito (circuit breaker)
+que deja de llamar a WAHA mientras no responde y métricas de latencia por
+endpoint.
+"""
+import random
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from src.config.settings import settings
+from src.config.logging_config import log_info, log_error
+
+# Respuestas que indican un problema pasajero de WAHA
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Las únicas que garantizan que WAHA no procesó la petición: son las que se
+# reintentan en las que no son idempotentes (enviar un mensaje)
+UNPROCESSED_STATUSES = frozenset({429, 503})
+
+# Latencias recientes que se guardan por endpoint para los percentiles
+LATENCY_WINDOW = 500
+
+
+class WahaUnavailableError(Exception):
+    """WAHA no responde: el cortocircuito está abierto y no se hizo la petición"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"WAHA no disponible; se volverá a intentar en {retry_after:.0f} s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Cortocircuito: tras failure_threshold fallos seguidos se abre y rechaza las
+    peticiones durante reset_timeout segundos. Después deja pasar una de prueba
+    (semiabierto): si va bien se cierra, si falla vuelve a abrirse.
+    """
+
+    CLOSED = "cerrado"
+    OPEN = "abierto"
+    HALF_OPEN = "semiabierto"
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def retry_after(self):
+        """Segundos que faltan para que se permita la petición de prueba"""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+
+    def before_request(self):
+        """
+        Lanza WahaUnavailableError si no se debe llamar a WAHA ahora
+        :return: True si esta es la petición de prueba (hay que liberarla con release_trial)
+        """
+        with self.lock:
+            state = self.state
+            if state == self.CLOSED:
+                return False
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            raise WahaUnavailableError(self.retry_after() or self.reset_timeout)
+
+    def release_trial(self):
+        """
+        Libera la petición de prueba si terminó sin resultado (cancelada o con un
+        error ajeno a WAHA), para que la siguiente pueda volver a probar
+        """
+        with self.lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                log_info("WAHA vuelve a responder: cortocircuito cerrado")
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._trial_running:
+                    log_error(f"WAHA no responde tras {self.failures} fallos: cortocircuito abierto {self.reset_timeout} s")
+                self.opened_at = self.clock()
+                self._trial_running = False
+
+
+class EndpointMetrics:
+    """Latencias y resultados de las llamadas a un endpoint (cada intento cuenta)"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.lock = threading.Lock()
+
+    def record(self, seconds, error=False):
+        with self.lock:
+            self.requests += 1
+            self.errors += error
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.latencies.append(seconds)
+
+    def record_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def snapshot(self):
+        """Resumen en milisegundos"""
+        with self.lock:
+            ordered = sorted(self.latencies)
+
+        def percentile(p):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": self.total_seconds / self.requests * 1000 if self.requests else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "max_ms": self.max_seconds * 1000,
+        }
+
+
+class WahaMetrics:
+    """Métricas por endpoint, compartidas por los clientes de WAHA (síncrono y asíncrono)"""
+
+    def __init__(self):
+        self._endpoints = {}
+        self.lock = threading.Lock()
+
+    def endpoint(self, name):
+        with self.lock:
+            return self._endpoints.setdefault(name, EndpointMetrics())
+
+    def snapshot(self):
+        """{endpoint: {requests, errors, retries, avg_ms, p50_ms, p95_ms, max_ms}}"""
+        with self.lock:
+            endpoints = list(self._endpoints.items())
+        return {name: metrics.snapshot() for name, metrics in endpoints}
+
+
+class WahaClientBase:
+    """Configuración común de los clientes de WAHA: tiempos, reintentos, cortocircuito y métricas"""
+
+    def __init__(self, connect_timeout=None, read_timeout=None, max_retries=None,
+                 backoff_base=None, backoff_max=None, breaker=None, metrics=None):
+        """
+        :param connect_timeout: Segundos máximos para conectar
+        :param read_timeout: Segundos máximos esperando la respuesta
+        :param max_retries: Reintentos tras el primer intento
+        :param backoff_base: Espera base (s) del primer reintento; se duplica en cada uno
+        :param backoff_max: Espera máxima (s) entre reintentos
+        :param breaker: CircuitBreaker (por defecto, el configurado)
+        :param metrics: WahaMetrics donde se registran las llamadas
+        """
+        self.connect_timeout = settings.WAHA_CONNECT_TIMEOUT if connect_timeout is None else connect_timeout
+        self.read_timeout = settings.WAHA_READ_TIMEOUT if read_timeout is None else read_timeout
+        self.max_retries = settings.WAHA_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = settings.WAHA_BACKOFF_SECONDS if backoff_base is None else backoff_base
+        self.backoff_max = settings.WAHA_BACKOFF_MAX_SECONDS if backoff_max is None else backoff_max
+        self.breaker = breaker or CircuitBreaker(settings.WAHA_CIRCUIT_FAILURES, settings.WAHA_CIRCUIT_RESET_SECONDS)
+        self.stats = metrics or WahaMetrics()
+
+    def metrics(self):
+        """Métricas por endpoint: {endpoint: {requests, errors, retries, avg_ms, p50_ms, p95_ms, max_ms}}"""
+        return self.stats.snapshot()
+
+    def retry_delay(self, attempt, retry_after, endpoint, reason):
+        """Espera antes del reintento: la que pida WAHA (Retry-After) o exponencial con jitter"""
+        try:
+            delay = min(float(retry_after), self.backoff_max)
+        except (TypeError, ValueError):
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        log_info(f"WAHA {endpoint}: reintento {attempt}/{self.max_retries} en {delay:.2f} s ({reason})")
+        return delay
+
+
+class WahaClient(WahaClientBase):
+    """Cliente HTTP compartido por todas las llamadas a WAHA"""
+
+    def __init__(self, pool_size=None, **options):
+        """
+        :param pool_size: Conexiones que se mantienen abiertas con WAHA
+        :param options: Ver WahaClientBase
+        """
+        super().__init__(**options)
+        pool_size = pool_size or settings.WAHA_POOL_SIZE
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        """Cierra las conexiones del pool"""
+        self.session.close()
+
+    def request(self, method, url, endpoint, idempotent=True, **kwargs):
+        """
+        Hace una petición a WAHA con reintentos
+        :param endpoint: Nombre del endpoint para las métricas (ej. "sendText")
+        :param idempotent: Si es False (enviar un mensaje) solo se reintenta cuando
+                           WAHA seguro que no la procesó: 429, 503 o sin conexión
+        :return: Respuesta (ya comprobada con raise_for_status)
+        """
+        trial = self.breaker.before_request()
+        try:
+            return self._request(method, url, endpoint, idempotent, **kwargs)
+        finally:
+            if trial:
+                self.breaker.release_trial()
+
+    def _request(self, method, url, endpoint, idempotent, **kwargs):
+        metrics = self.stats.endpoint(endpoint)
+        retry_statuses = RETRYABLE_STATUSES if idempotent else UNPROCESSED_STATUSES
+        retry_errors = (requests.ConnectionError, requests.Timeout) if idempotent else (requests.ConnectTimeout,)
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.request(
+                    method, url, timeout=(self.connect_timeout, self.read_timeout), **kwargs
+                )
+            except requests.RequestException as e:
+                metrics.record(time.perf_counter() - started, error=True)
+                if isinstance(e, retry_errors) and attempt < self.max_retries:
+                    attempt += 1
+                    metrics.record_retry()
+                    time.sleep(self.retry_delay(attempt, None, endpoint, e))
+                    continue
+                # Conexión rechazada o sin respuesta tras los reintentos: WAHA está caído
+                self.breaker.record_failure()
+                raise
+
+            failed = response.status_code >= 400
+            metrics.record(time.perf_counter() - started, error=failed)
+            if response.status_code in retry_statuses and attempt < self.max_retries:
+                attempt += 1
+                metrics.record_retry()
+                time.sleep(self.retry_delay(attempt, response.headers.get("Retry-After"), endpoint, response.status_code))
+                continue
+
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            response.raise_for_status()
+            return response
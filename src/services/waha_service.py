@@ -1,9 +1,10 @@
 """
 Servicio para conectarse a WAHA (WhatsApp HTTP API)
 """
-import requests
+import threading
 from src.config.settings import settings
 from src.config.logging_config import log_info, log_error, handle_error
+from src.services.waha_client import WahaClient
 
 class WahaService:
     """Servicio para operaciones de WhatsApp vía WAHA"""
@@ -12,6 +13,24 @@ class WahaService:
     API_KEY = settings.WAHA_API_KEY
     SESSION = settings.WAHA_SESSION
     
+    # Cliente HTTP compartido (pool de conexiones, reintentos y cortocircuito)
+    _client = None
+    _client_lock = threading.Lock()
+    
+    @classmethod
+    def client(cls):
+        """Cliente HTTP compartido, creado en el primer uso"""
+        if cls._client is None:
+            with cls._client_lock:
+                if cls._client is None:
+                    cls._client = WahaClient()
+        return cls._client
+    
+    @classmethod
+    def metrics(cls):
+        """Latencias y errores por endpoint de WAHA desde que arrancó la aplicación"""
+        return cls.client().metrics()
+    
     @classmethod
     def _get_headers(cls):
         """Obtiene las cabeceras para la petición"""
@@ -24,24 +43,27 @@ class WahaService:
         return headers
 
     @classmethod
-    def send_text(cls, chat_id, text):
+    def send_text(cls, chat_id, text, session=None):
         """
         Envía un mensaje de texto
         :param chat_id: ID del chat (ej. 123123@c.us)
         :param text: Contenido del mensaje
+        :param session: Sesión de WAHA que envía (por defecto la configurada)
         :return: Respuesta de la API
         """
         url = f"{cls.BASE_URL}/api/sendText"
         data = {
             "chatId": chat_id,
             "text": text,
-            "session": cls.SESSION
+            "session": session or cls.SESSION
         }
         
         try:
             log_info(f"Enviando mensaje a {chat_id} vía WAHA")
-            response = requests.post(url, json=data, headers=cls._get_headers())
-            response.raise_for_status()
+            # No idempotente: solo se reintenta si WAHA seguro que no lo recibió
+            response = cls.client().request(
+                "POST", url, "sendText", idempotent=False, json=data, headers=cls._get_headers()
+            )
             result = response.json()
             log_info(f"Mensaje enviado exitosamente a {chat_id}")
             return result
@@ -60,8 +82,7 @@ class WahaService:
         
         try:
             log_info(f"Obteniendo estado de sesión {cls.SESSION}")
-            response = requests.get(url, headers=cls._get_headers())
-            response.raise_for_status()
+            response = cls.client().request("GET", url, "sessions/{session}", headers=cls._get_headers())
             return response.json()
         except Exception as e:
             error_msg = handle_error(e, f"obtener estado de sesión {cls.SESSION}")
@@ -78,8 +99,7 @@ class WahaService:
         
         try:
             log_info("Listando sesiones de WAHA")
-            response = requests.get(url, headers=cls._get_headers())
-            response.raise_for_status()
+            response = cls.client().request("GET", url, "sessions", headers=cls._get_headers())
             return response.json()
         except Exception as e:
             error_msg = handle_error(e, "listar sesiones de WAHA")
@@ -97,8 +117,10 @@ class WahaService:
         
         try:
             log_info(f"Verificando estado de número {phone} vía WAHA")
-            response = requests.post(url, json=payload, headers=cls._get_headers())
-            response.raise_for_status()
+            # Solo consulta: se puede reintentar aunque sea POST
+            response = cls.client().request(
+                "POST", url, "contacts/check-exists", json=payload, headers=cls._get_headers()
+            )
             result = response.json()
             log_info(f"Estado de número {phone} verificado exitosamente: {result}")
             return result
@@ -106,5 +128,3 @@ class WahaService:
             error_msg = handle_error(e, f"verificar estado de número {phone}")
             log_error(error_msg)
             raise
-            log_error(error_msg)
-            raise
@@ -0,0 +1,117 @@
+"""
+Servicio de verificación masiva de números de WhatsApp para CRM Personal
+"""
+from datetime import datetime, timedelta
+from src.database.repositories import ContactRepository, WhatsAppStatusRepository
+from src.database.outbox import now_timestamp
+from src.services.phone_service import PhoneNormalizationService
+from src.services.async_waha_service import AsyncWahaService
+from src.config.settings import settings
+from src.config.logging_config import log_info, log_error
+
+# Resultados que se acumulan antes de guardarlos en la caché
+VALIDATION_SAVE_BATCH = 50
+
+
+class WhatsAppValidationService:
+    """Verifica en WAHA los teléfonos de muchos contactos, con caché de resultados"""
+
+    @staticmethod
+    def contact_phones(contacts):
+        """
+        Teléfonos normalizados (+58...) de cada contacto
+        :return: ({contact_id: [teléfonos válidos sin repetir]}, teléfonos no válidos)
+        """
+        phones_by_contact = {}
+        invalid = 0
+        for contact in contacts:
+            phones = []
+            for raw in (contact.phone_1, contact.phone_2):
+                if not raw:
+                    continue
+                phone = PhoneNormalizationService.normalize(raw)
+                if PhoneNormalizationService.is_valid_format(phone):
+                    phones.append(phone)
+                else:
+                    invalid += 1
+            phones_by_contact[contact.rowid] = list(dict.fromkeys(phones))
+        return phones_by_contact, invalid
+
+    @staticmethod
+    def cache_cutoff(now=None):
+        """Fecha y hora desde la que un resultado guardado sigue siendo válido"""
+        now = now or datetime.now()
+        return (now - timedelta(days=settings.WHATSAPP_STATUS_TTL_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+
+    @staticmethod
+    def validate(contact_ids, force=False, rate=None):
+        """
+        Verifica los teléfonos de los contactos en WAHA, varios a la vez y sin
+        superar el ritmo configurado. Los números comprobados hace menos de
+        WHATSAPP_STATUS_TTL_DAYS días se toman de la caché. Al terminar marca
+        is_phone_verified en bloque: verdadero si algún teléfono tiene WhatsApp,
+        falso si ninguno lo tiene.
+        :param force: Si es True se vuelven a comprobar también los de la caché
+        :param rate: Consultas a WAHA por segundo (por defecto WHATSAPP_VALIDATION_RATE)
+        :yield: (números terminados, total, estado)
+        """
+        rate = settings.WHATSAPP_VALIDATION_RATE if rate is None else rate
+        phones_by_contact, invalid = WhatsAppValidationService.contact_phones(
+            ContactRepository.get_by_ids(contact_ids)
+        )
+        phones = list(dict.fromkeys(phone for phones in phones_by_contact.values() for phone in phones))
+        cached = {} if force else WhatsAppStatusRepository.get_fresh(
+            phones, WhatsAppValidationService.cache_cutoff()
+        )
+        exists = {phone: row.exists for phone, row in cached.items()}
+        to_check = [phone for phone in phones if phone not in exists]
+
+        total = len(phones)
+        done = len(cached)
+        yield done, total, (f"Verificando {len(to_check)} números ({len(cached)} verificados recientemente, "
+                            f"{invalid} no válidos)")
+
+        errors = 0
+        results = []
+        try:
+            # WAHA espera el número sin "+"
+            for digits, result in AsyncWahaService.iter_check_numbers_sync(
+                [phone.lstrip("+") for phone in to_check], rate
+            ):
+                phone = f"+{digits}"
+                done += 1
+                if isinstance(result, Exception):
+                    errors += 1
+                    yield done, total, f"Error: {phone} ({result})"
+                    continue
+                exists[phone] = bool(result.get("numberExists"))
+                results.append({
+                    "phone": phone,
+                    "exists": exists[phone],
+                    "chat_id": result.get("chatId"),
+                    "checked_at": now_timestamp(),
+                })
+                if len(results) >= VALIDATION_SAVE_BATCH:
+                    WhatsAppStatusRepository.save(results)
+                    results = []
+                yield done, total, f"{phone}: {'con' if exists[phone] else 'sin'} WhatsApp"
+        finally:
+            # También si se interrumpe: lo ya comprobado no se vuelve a consultar
+            WhatsAppStatusRepository.save(results)
+
+        verified = [cid for cid, phones in phones_by_contact.items() if any(exists.get(p) for p in phones)]
+        not_verified = [
+            cid for cid, phones in phones_by_contact.items()
+            if phones and all(exists.get(p) is False for p in phones)
+        ]
+        if verified:
+            ContactRepository.bulk_update(verified, {"is_phone_verified": True})
+        if not_verified:
+            ContactRepository.bulk_update(not_verified, {"is_phone_verified": False})
+
+        summary = (f"Verificación terminada: {len(verified)} contactos con WhatsApp, "
+                   f"{len(not_verified)} sin WhatsApp, {errors} errores")
+        if errors:
+            log_error(f"Verificación de WhatsApp: {errors} números no se pudieron comprobar")
+        log_info(summary)
+        yield done, total, summary
@@ -1,14 +1,24 @@
 """
 Aplicación UI para CRM Personal
 """
+import importlib
 import flet as ft
 from src.config.logging_config import log_info, log_error
-from src.ui.screens.main_screen import MainScreen
-from src.ui.screens.contact_form_screen import ContactFormScreen
-from src.ui.screens.contact_detail_screen import ContactDetailScreen
-from src.ui.screens.report_screen import ReportScreen
-from src.ui.screens.campaign_screen import CampaignScreen
-from src.ui.screens.bulk_tagging_screen import BulkTaggingScreen
+
+# Pantallas por nombre de clase -> módulo. Se importan en la primera navegación
+# a cada una, para no cargar todas (y sus dependencias) al arrancar.
+SCREEN_MODULES = {
+    "MainScreen": "src.ui.screens.main_screen",
+    "ContactFormScreen": "src.ui.screens.contact_form_screen",
+    "ContactDetailScreen": "src.ui.screens.contact_detail_screen",
+    "ReportScreen": "src.ui.screens.report_screen",
+    "CampaignScreen": "src.ui.screens.campaign_screen",
+    "BulkTaggingScreen": "src.ui.screens.bulk_tagging_screen",
+}
+
+def load_screen(name):
+    """Devuelve la clase de una pantalla, importando su módulo si hace falta"""
+    return getattr(importlib.import_module(SCREEN_MODULES[name]), name)
 
 def main(page: ft.Page):
     """Función principal de la UI"""
@@ -20,7 +30,7 @@ def main(page: ft.Page):
 
         if page.route == "/":
             # Pantalla principal
-            main_screen = MainScreen(page)
+            main_screen = load_screen("MainScreen")(page)
             page.views.append(
                 ft.View(
                     "/",
@@ -30,7 +40,7 @@ def main(page: ft.Page):
             )
         elif page.route.startswith("/add-contact"):
             # Formulario para agregar contacto
-            form_screen = ContactFormScreen(page, mode='add')
+            form_screen = load_screen("ContactFormScreen")(page, mode='add')
             page.views.append(
                 ft.View(
                     "/add-contact",
@@ -42,7 +52,7 @@ def main(page: ft.Page):
             # Extraer ID del contacto de la ruta
             contact_id = int(page.route.split("/")[-1]) if "/" in page.route else None
             if contact_id:
-                form_screen = ContactFormScreen(page, mode='edit', contact_id=contact_id)
+                form_screen = load_screen("ContactFormScreen")(page, mode='edit', contact_id=contact_id)
                 page.views.append(
                     ft.View(
                         "/edit-contact",
@@ -53,7 +63,7 @@ def main(page: ft.Page):
             # Detalle del contacto
             contact_id = int(page.route.split("/")[-1]) if "/" in page.route else None
             if contact_id:
-                detail_screen = ContactDetailScreen(page, contact_id=contact_id)
+                detail_screen = load_screen("ContactDetailScreen")(page, contact_id=contact_id)
                 page.views.append(
                     ft.View(
                         f"/contact-detail/{contact_id}",
@@ -63,7 +73,7 @@ def main(page: ft.Page):
                 )
         elif page.route == "/reports":
             # Pantalla de reportes
-            report_screen = ReportScreen(page)
+            report_screen = load_screen("ReportScreen")(page)
             page.views.append(
                 ft.View(
                     "/reports",
@@ -73,7 +83,7 @@ def main(page: ft.Page):
             )
         elif page.route == "/campaigns":
             # Pantalla de campañas
-            campaign_screen = CampaignScreen(page)
+            campaign_screen = load_screen("CampaignScreen")(page)
             page.views.append(
                 ft.View(
                     "/campaigns",
@@ -82,7 +92,7 @@ def main(page: ft.Page):
             )
         elif page.route == "/bulk-tagging":
             # Pantalla de etiquetado masivo
-            bulk_tag_screen = BulkTaggingScreen(page)
+            bulk_tag_screen = load_screen("BulkTaggingScreen")(page)
             page.views.append(
                 ft.View(
                     "/bulk-tagging",
@@ -92,7 +102,7 @@ def main(page: ft.Page):
 
         # Fallback if no view was added
         if not page.views:
-            main_screen = MainScreen(page)
+            main_screen = load_screen("MainScreen")(page)
             page.views.append(
                 ft.View(
                     "/",
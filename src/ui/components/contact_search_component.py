@@ -3,6 +3,8 @@ Componente de búsqueda de contactos para CRM Personal
 """
 import flet as ft
 from src.services.contact_service import ContactService, RelationshipService
+from src.database.profile import RelatedContact
+from src.config.logging_config import log_error
 
 class ContactSearchField:
     """Componente para buscar y seleccionar contactos"""
@@ -115,7 +117,7 @@ class ContactSearchField:
 class RelationshipManager:
     """Componente para gestionar relaciones con búsqueda de contactos"""
     
-    def __init__(self, page: ft.Page, contact_id=None):
+    def __init__(self, page: ft.Page, contact_id=None, relationships=None):
         self.page = page
         self.contact_id = contact_id
         self.contact_service = ContactService()
@@ -145,7 +147,10 @@ class RelationshipManager:
         
         # Inicializar
         self.load_relationship_types()
-        self.load_current_relationships()
+        if relationships is not None:
+            self.render_relationships(relationships)
+        else:
+            self.load_current_relationships()
         
         # Contenedor principal
         self.container = ft.Column([
@@ -175,27 +180,12 @@ class RelationshipManager:
             return
             
         try:
-            relationships = self.relationship_service.get_by_contact_id(self.contact_id)
-            self.current_relationships.controls = []
-            
             # Asegurar que contact_id es int para la comparación
-            current_id = int(self.contact_id) if self.contact_id else None
-            
-            for rel in relationships:
-                # Determinar cuál contacto es el relacionado (no el actual)
-                related_contact = rel.related_contact if rel.contact_id == current_id else rel.contact
-                rel_type = rel.relationship_type
-                
-                # Crear fila para mostrar la relación
-                rel_row = ft.Row([
-                    ft.Text(f"{related_contact.first_name} {related_contact.last_name} - {rel_type.name}"),
-                    ft.IconButton(
-                        ft.Icons.DELETE,
-                        tooltip="Eliminar relación",
-                        on_click=lambda e, rel_id=rel.id: self.remove_relationship(rel_id)
-                    )
-                ])
-                self.current_relationships.controls.append(rel_row)
+            current_id = int(self.contact_id)
+            relationships = self.relationship_service.get_by_contact_id(current_id)
+            self.render_relationships([
+                RelatedContact.from_relationship(rel, current_id) for rel in relationships
+            ])
             
             # Forzar actualización si el componente ya está en la página
             if self.page:
@@ -204,6 +194,20 @@ class RelationshipManager:
         except Exception as ex:
             log_error(f"Error cargando relaciones actuales: {ex}")
     
+    def render_relationships(self, relationships):
+        """Muestra las relaciones (RelatedContact) del contacto"""
+        self.current_relationships.controls = [
+            ft.Row([
+                ft.Text(f"{rel.full_name} - {rel.relationship_type}"),
+                ft.IconButton(
+                    ft.Icons.DELETE,
+                    tooltip="Eliminar relación",
+                    on_click=lambda e, rel_id=rel.relationship_id: self.remove_relationship(rel_id)
+                )
+            ])
+            for rel in relationships
+        ]
+    
     def on_contact_selected(self, contact):
         """Callback cuando se selecciona un contacto"""
         print(f"Contacto seleccionado: {contact.first_name} {contact.last_name}")
@@ -16,6 +16,7 @@ class EnhancedContactForm:
         # Componentes
         self.relationship_manager = None
         self.tag_manager = None
+        self.profile = None
         
         # Crear campos de formulario
         self.txt_first_name = ft.TextField(label="Nombre*", width=300)
@@ -57,7 +58,8 @@ class EnhancedContactForm:
     def load_contact_data(self):
         """Carga los datos del contacto en los campos"""
         try:
-            contact = self.contact_service.get_by_id(self.contact_id)
+            # Un solo perfil alimenta los campos, las relaciones y las etiquetas
+            contact = self.profile = self.contact_service.get_profile(self.contact_id)
             if contact:
                 self.txt_first_name.value = contact.first_name
                 self.txt_last_name.value = contact.last_name
@@ -88,10 +90,14 @@ class EnhancedContactForm:
         # Inicializar RelationshipManager si tenemos un contact_id
         relationship_content = ft.Text("Guarda el contacto primero para gestionar sus relaciones.")
         if self.contact_id:
-            self.relationship_manager = RelationshipManager(self.page, self.contact_id)
+            profile = self.profile
+            self.relationship_manager = RelationshipManager(
+                self.page, self.contact_id,
+                relationships=profile.relationships if profile else None
+            )
             relationship_content = self.relationship_manager.get_control()
             
-            self.tag_manager = TagManager(self.page, self.contact_id)
+            self.tag_manager = TagManager(self.page, self.contact_id, tags=profile.tags if profile else None)
             tag_content = self.tag_manager.get_control()
         else:
             tag_content = ft.Text("Guarda el contacto primero para gestionar sus etiquetas.")
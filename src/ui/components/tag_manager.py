@@ -6,10 +6,11 @@ class TagManager(ft.Column):
     """
     Componente para la gestión individual de etiquetas de un contacto.
     """
-    def __init__(self, page: ft.Page, contact_id):
+    def __init__(self, page: ft.Page, contact_id, tags=None):
         super().__init__()
         self.page = page
         self.contact_id = contact_id
+        self.initial_tags = tags  # Etiquetas ya cargadas (p. ej. del perfil del contacto)
         self.tag_service = TagService()
         
         # UI Components
@@ -31,9 +32,10 @@ class TagManager(ft.Column):
         ]
         
     def did_mount(self):
-        self.load_data()
+        self.load_data(current_tags=self.initial_tags)
+        self.initial_tags = None
 
-    def load_data(self):
+    def load_data(self, current_tags=None):
         try:
             # Cargar tipos de etiquetas disponibles
             types = self.tag_service.get_all_types()
@@ -42,7 +44,8 @@ class TagManager(ft.Column):
             ]
             
             # Cargar etiquetas actuales del contacto
-            current_tags = self.tag_service.get_by_contact_id(self.contact_id)
+            if current_tags is None:
+                current_tags = self.tag_service.get_by_contact_id(self.contact_id)
             self.tags_row.controls = [
                 ft.Chip(
                     label=ft.Text(t.name),
@@ -66,23 +69,8 @@ class TagManager(ft.Column):
             log_error(f"Error añadiendo etiqueta: {ex}")
 
     def remove_tag(self, tag_type_id):
-        # Nota: El TagRepository actual no tiene delete individual
-        # Tendremos que implementar este método en el servicio/repositorio
         try:
-            from src.database.repositories import TagRepository
-            from sqlalchemy.orm import Session
-            from src.database.connection import engine
-            from src.models.tag import ContactTag
-            
-            with Session(engine) as session:
-                tag = session.query(ContactTag).filter(
-                    ContactTag.contact_id == self.contact_id,
-                    ContactTag.tag_type_id == tag_type_id
-                ).first()
-                if tag:
-                    session.delete(tag)
-                    session.commit()
-            
+            self.tag_service.bulk_remove_tag([self.contact_id], tag_type_id)
             self.load_data()
         except Exception as e:
             log_error(f"Error eliminando etiqueta: {e}")
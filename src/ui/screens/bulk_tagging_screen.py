@@ -4,8 +4,10 @@ Pantalla de gestión masiva (Etiquetado y Verificación)
 import flet as ft
 from src.config.logging_config import log_info, log_error
 from src.services.contact_service import ContactService, TagService
+from src.database.segments import Segment
 from src.services.phone_service import PhoneNormalizationService
 from src.services.waha_service import WahaService
+from src.services.whatsapp_validation_service import WhatsAppValidationService
 from src.ui.components.contact_search import ContactSearchControl
 import threading
 
@@ -22,6 +24,8 @@ class BulkTaggingScreen:
         self.selected_contacts = set()
         self.items_per_page = 20
         self.current_page = 1
+        self.contact_page = None
+        self._page_anchor = {"after": None, "before": None}
         
         # UI
         self.contact_list = ft.Column(spacing=5)
@@ -30,6 +34,11 @@ class BulkTaggingScreen:
         self.page_info = ft.Text("Página 1")
         self.selection_text = ft.Text("Seleccionados: 0")
         
+        # Progreso de la verificación de WhatsApp (se ejecuta en segundo plano)
+        self.validation_running = False
+        self.validation_progress = ft.ProgressBar(width=400, visible=False)
+        self.validation_text = ft.Text("", size=12, visible=False)
+        
         # Search wrapper
         self.search_control = ContactSearchControl(
             on_select_contact=self.on_search_select,
@@ -57,8 +66,15 @@ class BulkTaggingScreen:
             ft.Row([
                 self.dd_tags,
                 ft.ElevatedButton("Aplicar Etiqueta", icon=ft.Icons.CHECK, on_click=self.apply_bulk_tag,
-                                 style=ft.ButtonStyle(color=ft.Colors.WHITE, bgcolor=ft.Colors.BLUE))
+                                 style=ft.ButtonStyle(color=ft.Colors.WHITE, bgcolor=ft.Colors.BLUE)),
+                ft.ElevatedButton("Quitar Etiqueta", icon=ft.Icons.LABEL_OFF, on_click=self.remove_bulk_tag)
             ]),
+            ft.Row([
+                ft.TextButton("Seleccionar quienes no la tienen", icon=ft.Icons.LABEL_OUTLINE,
+                              on_click=lambda e: self.select_segment(tags_none=True)),
+                ft.TextButton("Seleccionar quienes la tienen", icon=ft.Icons.LABEL,
+                              on_click=lambda e: self.select_segment(tags_none=False)),
+            ], wrap=True),
         ])
         
         # Contenido Tab Verificación
@@ -71,6 +87,8 @@ class BulkTaggingScreen:
                                  on_click=self.validate_whatsapp_status,
                                  style=ft.ButtonStyle(color=ft.Colors.WHITE, bgcolor=ft.Colors.GREEN)),
             ], wrap=True),
+            self.validation_progress,
+            self.validation_text,
             ft.Divider(),
             ft.Row([
                 ft.ElevatedButton("Marcar Tlf Verificado", on_click=lambda e: self.verify_field_bulk('is_phone_verified')),
@@ -127,10 +145,14 @@ class BulkTaggingScreen:
         except Exception as e:
             log_error(f"Error tags: {e}")
 
-    def refresh_list(self):
+    def refresh_list(self, after=None, before=None):
         try:
-            contacts = self.contact_service.get_paginated(self.current_page, self.items_per_page)
-            total_contacts = self.contact_service.count_all()
+            if after is None and before is None:
+                self.current_page = 1
+            self._page_anchor = {"after": after, "before": before}
+            self.contact_page = self.contact_service.get_page_with_count(self.items_per_page, after=after, before=before)
+            contacts = self.contact_page.items
+            total_contacts = self.contact_page.total
             total_pages = (total_contacts + self.items_per_page - 1) // self.items_per_page
             
             self.contact_list.controls.clear()
@@ -170,60 +192,113 @@ class BulkTaggingScreen:
         self.page.update()
 
     def prev_page(self, e):
-        if self.current_page > 1:
+        if self.contact_page and self.contact_page.has_prev:
             self.current_page -= 1
-            self.refresh_list()
+            self.refresh_list(before=self.contact_page.prev_cursor)
 
     def next_page(self, e):
-        self.current_page += 1
-        self.refresh_list()
+        if self.contact_page and self.contact_page.has_next:
+            self.current_page += 1
+            self.refresh_list(after=self.contact_page.next_cursor)
+
+    def select_segment(self, tags_none):
+        """Selecciona todos los contactos sin (o con) la etiqueta elegida, en una sola consulta"""
+        if not self.dd_tags.value:
+            self.show_snack("Seleccione una etiqueta")
+            return
+        try:
+            tag_id = int(self.dd_tags.value)
+            segment = Segment(tags_none=[tag_id]) if tags_none else Segment(tags_any=[tag_id])
+            self.selected_contacts = set(self.contact_service.get_segment_ids(segment))
+            self.selection_text.value = f"Seleccionados: {len(self.selected_contacts)}"
+            self.refresh_list(**self._page_anchor)
+        except Exception as ex:
+            self.show_snack(f"Error: {ex}")
 
     def apply_bulk_tag(self, e):
         if not self.selected_contacts or not self.dd_tags.value:
             self.show_snack("Seleccione contactos y etiqueta")
             return
         try:
-            self.tag_service.bulk_add_tag(list(self.selected_contacts), int(self.dd_tags.value))
-            self.show_snack("Etiquetas aplicadas")
+            result = self.tag_service.bulk_add_tag(list(self.selected_contacts), int(self.dd_tags.value))
+            self.show_snack(f"Etiqueta aplicada a {result.inserted} contactos ({result.skipped} ya la tenían)")
             self.selected_contacts.clear()
-            self.refresh_list()
+            self.refresh_list(**self._page_anchor)
         except Exception as ex: 
             self.show_snack(f"Error: {ex}")
 
+    def remove_bulk_tag(self, e):
+        if not self.selected_contacts or not self.dd_tags.value:
+            self.show_snack("Seleccione contactos y etiqueta")
+            return
+        try:
+            result = self.tag_service.bulk_remove_tag(list(self.selected_contacts), int(self.dd_tags.value))
+            self.show_snack(f"Etiqueta quitada de {result.removed} contactos")
+            self.selected_contacts.clear()
+            self.refresh_list(**self._page_anchor)
+        except Exception as ex:
+            self.show_snack(f"Error: {ex}")
+
     def normalize_phones(self, e):
         """Normaliza los teléfonos de los contactos seleccionados"""
         if not self.selected_contacts:
             self.show_snack("Seleccione contactos")
             return
             
-        count = 0
-        for cid in self.selected_contacts:
-            contact = self.contact_service.get_by_id(cid)
-            if contact and contact.phone_1:
+        changes = []
+        for contact in self.contact_service.get_by_ids(self.selected_contacts):
+            if contact.phone_1:
                 new_phone = PhoneNormalizationService.normalize(contact.phone_1)
                 if new_phone != contact.phone_1:
-                    self.contact_service.update(cid, {"phone_1": new_phone})
-                    count += 1
+                    changes.append({"rowid": contact.rowid, "phone_1": new_phone})
         
+        count = self.contact_service.bulk_update_mapping(changes) if changes else 0
         self.show_snack(f"Normalizados {count} números")
-        self.refresh_list()
+        self.refresh_list(**self._page_anchor)
 
     def validate_whatsapp_status(self, e):
-        """Valida estado en WAHA (simulado por ahora en segundo plano)"""
-        # Aquí iría la lógica de threading llamando a WahaService.check_number_status
-        # Por brevedad y seguridad en esta iteración, implementaremos la lógica básica
-        self.show_snack("Validación iniciada en segundo plano (Simulación)")
+        """Verifica en WAHA los teléfonos de los contactos seleccionados, en segundo plano"""
+        if self.validation_running:
+            return
+        if not self.selected_contacts:
+            self.show_snack("Seleccione contactos")
+            return
+        
+        self.validation_running = True
+        self.validation_progress.value = 0
+        self.validation_progress.visible = True
+        self.validation_text.visible = True
+        self.validation_text.value = "Preparando verificación..."
+        self.page.update()
+        threading.Thread(
+            target=self.run_validation_thread,
+            args=(list(self.selected_contacts),),
+            daemon=True
+        ).start()
+
+    def run_validation_thread(self, contact_ids):
+        """Consume el progreso de la verificación y lo muestra"""
+        try:
+            for current, total, msg in WhatsAppValidationService.validate(contact_ids):
+                self.validation_progress.value = current / total if total > 0 else 1
+                self.validation_text.value = f"[{current}/{total}] {msg}"
+                self.page.update()
+            self.refresh_list(**self._page_anchor)
+        except Exception as ex:
+            log_error(f"Error verificando WhatsApp: {ex}")
+            self.validation_text.value = f"Error en la verificación: {ex}"
+            self.page.update()
+        finally:
+            self.validation_running = False
         
     def verify_field_bulk(self, field_name):
         """Marca un campo como verificado para la selección"""
         if not self.selected_contacts:
             return
         
-        for cid in self.selected_contacts:
-            self.contact_service.update(cid, {field_name: True})
-            
-        self.show_snack("Verificación actualizada")
-        self.refresh_list()
+        count = self.contact_service.bulk_update(self.selected_contacts, {field_name: True})
+        self.show_snack(f"Verificación actualizada en {count} contactos")
+        self.refresh_list(**self._page_anchor)
 
     def show_snack(self, message):
         self.page.snack_bar = ft.SnackBar(ft.Text(message))
@@ -5,7 +5,11 @@ import flet as ft
 import threading
 from src.config.logging_config import log_info, log_error
 from src.services.campaign_service import CampaignService
-from src.services.contact_service import TagService
+from src.models.campaign import MessageStatus
+from src.services.contact_service import TagService, SegmentService
+
+# Prefijo de las opciones del desplegable que son segmentos guardados
+SEGMENT_PREFIX = "segment:"
 
 class CampaignScreen:
     """Pantalla para crear y ejecutar campañas"""
@@ -52,12 +56,28 @@ class CampaignScreen:
         
         self.progress_bar = ft.ProgressBar(width=400, color="amber", bgcolor="#eeeeee", visible=False)
         self.status_text = ft.Text("", visible=False)
+        self.finish_text = ft.Text("", size=12, color=ft.Colors.GREY, visible=False)
+        
+        # Control del envío en curso (planificador de la ejecución actual)
+        self.scheduler = None
+        self.btn_pause = ft.ElevatedButton("Pausar", icon=ft.Icons.PAUSE, on_click=self.toggle_pause, visible=False)
+        self.btn_stop = ft.ElevatedButton(
+            "Detener",
+            icon=ft.Icons.STOP,
+            on_click=self.stop_campaign,
+            style=ft.ButtonStyle(color=ft.Colors.WHITE, bgcolor=ft.Colors.RED),
+            visible=False
+        )
         
         self.log_view = ft.ListView(expand=True, spacing=10, padding=20, auto_scroll=True)
         
+        # Campañas interrumpidas (la cola de mensajes persiste entre ejecuciones)
+        self.unfinished_column = ft.Column([])
+        
     def show(self):
         """Muestra la pantalla"""
         self.load_tags()
+        self.load_unfinished()
         
         return ft.Column([
             ft.Text("Campañas de Mensajería", size=24, weight=ft.FontWeight.BOLD),
@@ -78,10 +98,12 @@ class CampaignScreen:
                 border=ft.border.all(1, ft.Colors.GREY_300),
                 border_radius=10
             ),
+            self.unfinished_column,
             
             ft.Divider(),
             self.status_text,
-            self.progress_bar,
+            ft.Row([self.progress_bar, self.btn_pause, self.btn_stop]),
+            self.finish_text,
             ft.Container(
                 content=self.log_view,
                 expand=True,
@@ -94,16 +116,54 @@ class CampaignScreen:
         ], expand=True)
 
     def load_tags(self):
-        """Carga las etiquetas disponibles"""
+        """Carga las etiquetas y los segmentos guardados disponibles"""
         try:
             tags = self.tag_service.get_all_types()
-            self.dd_tags.options = [ft.dropdown.Option(t.name) for t in tags]
+            segments = SegmentService.get_all()
+            self.dd_tags.options = [ft.dropdown.Option(t.name) for t in tags] + [
+                ft.dropdown.Option(key=f"{SEGMENT_PREFIX}{s.id}", text=f"Segmento: {s.name} ({s.member_count})")
+                for s in segments
+            ]
         except Exception as e:
             self.log_message(f"Error cargando etiquetas: {e}")
 
+    def selected_target(self):
+        """Etiqueta (nombre) o segmento guardado (id) elegido como destinatarios"""
+        value = self.dd_tags.value
+        if value and value.startswith(SEGMENT_PREFIX):
+            return int(value[len(SEGMENT_PREFIX):])
+        return value
+
+    def load_unfinished(self):
+        """Muestra las campañas que quedaron a medias, con un botón para reanudarlas"""
+        try:
+            self.unfinished_column.controls.clear()
+            for campaign in CampaignService.get_unfinished():
+                progress = CampaignService.get_progress(campaign.id)
+                pending = progress.get(MessageStatus.PENDING, 0)
+                self.unfinished_column.controls.append(ft.Row([
+                    ft.Icon(ft.Icons.PAUSE_CIRCLE, color=ft.Colors.ORANGE),
+                    ft.Text(f"{campaign.name}: {pending} de {sum(progress.values())} mensajes pendientes"),
+                    ft.TextButton("Reanudar", icon=ft.Icons.PLAY_ARROW,
+                                  on_click=lambda e, campaign_id=campaign.id: self.resume_campaign(campaign_id)),
+                ]))
+        except Exception as e:
+            log_error(f"Error cargando campañas pendientes: {e}")
+
+    def resume_campaign(self, campaign_id):
+        """Reanuda una campaña interrumpida desde el primer mensaje no enviado"""
+        if self.campaign_running:
+            return
+        self.begin_run(sending=True)
+        threading.Thread(
+            target=self.run_campaign_thread,
+            args=(f"Reanudando campaña {campaign_id}...", CampaignService.run_campaign(campaign_id, self.scheduler)),
+            daemon=True
+        ).start()
+
     def preview_recipients(self, e):
-        """Muestra una lista de los destinatarios que coinciden con la etiqueta"""
-        tag = self.dd_tags.value
+        """Comprueba los destinatarios de la etiqueta: a quién se enviará y a quién se omite y por qué"""
+        tag = self.selected_target()
         if not tag:
             self.page.snack_bar = ft.SnackBar(ft.Text("Selecciona una etiqueta primero"))
             self.page.snack_bar.open = True
@@ -111,14 +171,20 @@ class CampaignScreen:
             return
             
         try:
-            recipients = CampaignService.get_recipients(tag)
+            result = CampaignService.preflight(tag, self.txt_template_a.value, self.txt_template_b.value)
             self.log_view.controls.clear()
-            self.log_message(f"Destinatarios encontrados para '{tag}': {len(recipients)}")
+            self.log_message(f"Destinatarios para '{tag}': {len(result.messages)} listos para enviar, "
+                             f"{len(result.skipped)} omitidos")
             
-            for r in recipients:
-                self.log_message(f"- {r.first_name} {r.last_name} ({r.phone_1 or 'Sin Tlf'})")
+            for message in result.messages:
+                self.log_message(f"- {message['recipient_name']} ({message['chat_id']})")
+            
+            if result.skipped:
+                self.log_message("\nOmitidos:")
+                for reason, count in result.skip_report().items():
+                    self.log_message(f"- {reason}: {count}")
                 
-            if recipients:
+            if result.messages:
                 self.btn_start.visible = True
                 self.log_message("\nRevisa la lista arriba. Si es correcta, pulsa 'Iniciar Campaña'.")
             else:
@@ -140,40 +206,87 @@ class CampaignScreen:
         if self.campaign_running:
             return
             
-        tag = self.dd_tags.value
+        tag = self.selected_target()
         if not tag:
             self.page.snack_bar = ft.SnackBar(ft.Text("Selecciona una etiqueta"))
             self.page.snack_bar.open = True
             self.page.update()
             return
             
+        self.begin_run(sending=not self.chk_test_mode.value)
+        progress = CampaignService.send_campaign(
+            tag_filter=tag,
+            template_a=self.txt_template_a.value,
+            template_b=self.txt_template_b.value,
+            dry_run=self.chk_test_mode.value,
+            scheduler=self.scheduler
+        )
+        
+        # Ejecutar en hilo para no congelar la UI
+        threading.Thread(
+            target=self.run_campaign_thread,
+            args=(f"Iniciando campaña para etiqueta '{tag}'...", progress),
+            daemon=True
+        ).start()
+
+    def begin_run(self, sending=False):
+        """
+        Prepara la pantalla para una ejecución
+        :param sending: Si es True se envían mensajes reales y se muestran los controles de envío
+        """
         self.campaign_running = True
+        self.scheduler = CampaignService.create_scheduler() if sending else None
         self.btn_start.disabled = True
+        self.btn_pause.text = "Pausar"
+        self.btn_pause.icon = ft.Icons.PAUSE
+        self.btn_pause.visible = sending
+        self.btn_stop.visible = sending
+        self.btn_stop.disabled = False
+        self.finish_text.visible = sending
+        self.finish_text.value = ""
         self.progress_bar.visible = True
         self.status_text.visible = True
         self.log_view.controls.clear()
         self.page.update()
-        
-        # Ejecutar en hilo para no congelar la UI
-        threading.Thread(target=self.run_campaign_thread, args=(tag,), daemon=True).start()
 
-    def run_campaign_thread(self, tag):
-        """Lógica de ejecución en segundo plano"""
+    def toggle_pause(self, e):
+        """Pausa o reanuda el envío en curso"""
+        if not self.scheduler:
+            return
+        if self.scheduler.paused:
+            self.scheduler.resume()
+            self.btn_pause.text = "Pausar"
+            self.btn_pause.icon = ft.Icons.PAUSE
+        else:
+            self.scheduler.pause()
+            self.btn_pause.text = "Reanudar"
+            self.btn_pause.icon = ft.Icons.PLAY_ARROW
+        self.page.update()
+
+    def stop_campaign(self, e):
+        """Detiene el envío tras los mensajes en curso; la campaña se puede reanudar después"""
+        if not self.scheduler:
+            return
+        self.scheduler.stop()
+        self.btn_stop.disabled = True
+        self.btn_pause.visible = False
+        self.log_message("Deteniendo campaña tras los envíos en curso...")
+
+    def run_campaign_thread(self, description, progress):
+        """Lógica de ejecución en segundo plano: consume el progreso de la campaña"""
         try:
-            self.log_message(f"Iniciando campaña para etiqueta '{tag}'...")
+            self.log_message(description)
             
             count = 0
-            for current, total, msg in CampaignService.send_campaign(
-                tag_filter=tag,
-                template_a=self.txt_template_a.value,
-                template_b=self.txt_template_b.value,
-                dry_run=self.chk_test_mode.value
-            ):
+            for current, total, msg in progress:
                 count = current
                 # Actualizar UI
                 self.progress_bar.value = current / total if total > 0 else 0
                 self.status_text.value = f"Procesando {current}/{total}: {msg}"
                 self.log_message(f"[{current}/{total}] {msg}")
+                if self.scheduler and self.scheduler.remaining:
+                    finish = self.scheduler.projected_finish()
+                    self.finish_text.value = f"Fin estimado: {finish.strftime('%d/%m/%Y %H:%M')}"
                 self.page.update()
             
             self.log_message("Campaña finalizada.")
@@ -184,5 +297,9 @@ class CampaignScreen:
             log_error(f"Error campaña: {e}")
         finally:
             self.campaign_running = False
+            self.scheduler = None
             self.btn_start.disabled = False
+            self.btn_pause.visible = False
+            self.btn_stop.visible = False
+            self.load_unfinished()
             self.page.update()
@@ -3,7 +3,7 @@ Pantalla de detalle de contacto para CRM Personal
 """
 import flet as ft
 from src.config.logging_config import log_info, log_error
-from src.services.contact_service import ContactService, RelationshipService, TagService, HobbyService, EventService
+from src.services.contact_service import ContactService
 
 class ContactDetailScreen:
     """Pantalla para mostrar detalles de un contacto"""
@@ -12,26 +12,21 @@ class ContactDetailScreen:
         self.page = page
         self.contact_id = contact_id
         self.contact_service = ContactService()
-        self.relationship_service = RelationshipService()
-        self.tag_service = TagService()
-        self.hobby_service = HobbyService()
-        self.event_service = EventService()
     
     def show(self):
         """Devuelve el control de la pantalla de detalle del contacto"""
         log_info(f"Obteniendo detalle del contacto ID: {self.contact_id}")
         
         try:
-            # Obtener datos del contacto
-            contact = self.contact_service.get_by_id(self.contact_id)
+            # Obtener el contacto con todos sus datos relacionados
+            contact = self.contact_service.get_profile(self.contact_id)
             if not contact:
                 return ft.Text("Contacto no encontrado")
             
-            # Obtener datos relacionados
-            relationships = self.relationship_service.get_by_contact_id(self.contact_id)
-            tags = self.tag_service.get_by_contact_id(self.contact_id)
-            hobbies = self.hobby_service.get_by_contact_id(self.contact_id)
-            events = self.event_service.get_by_contact_id(self.contact_id)
+            relationships = contact.relationships
+            tags = contact.tags
+            hobbies = contact.hobbies
+            events = contact.events
             
             # Crear contenido de la pantalla
             content = ft.Column([
@@ -131,8 +126,8 @@ class ContactDetailScreen:
                 # Relaciones
                 ft.Text("Relaciones", size=18, weight=ft.FontWeight.BOLD),
                 *[ft.ListTile(
-                    title=ft.Text(f"{rel.contact.first_name} {rel.contact.last_name}" if rel.contact_id != self.contact_id else f"{rel.related_contact.first_name} {rel.related_contact.last_name}"),
-                    subtitle=ft.Text(rel.relationship_type.name)
+                    title=ft.Text(rel.full_name),
+                    subtitle=ft.Text(rel.relationship_type)
                 ) for rel in relationships],
                 
                 # Etiquetas
@@ -16,6 +16,8 @@ class MainScreen:
         self.items_per_page = 8
         self.paginator = None
         self.current_page = 1
+        self.contact_page = None
+        self._page_anchor = {"after": None, "before": None}
         
         # Elementos de la UI
         self.chk_missing_phone = ft.Checkbox(label="Sin Teléfono", value=False)
@@ -79,23 +81,27 @@ class MainScreen:
         )
         return layout
     
-    def refresh_contact_list(self, query=None):
-        """Actualiza la lista de contactos usando paginación de servidor y filtros"""
+    def refresh_contact_list(self, query=None, after=None, before=None):
+        """
+        Actualiza la lista de contactos usando paginación por cursor y filtros.
+        Sin cursor se carga la primera página.
+        """
         try:
-            # Si hay búsqueda, reseteamos a página 1 (opcional, pero recomendado para UX)
-            if query and query != getattr(self, '_last_query', None):
+            # Sin cursor (nueva búsqueda o recarga inicial) volvemos a la página 1
+            if after is None and before is None:
                 self.current_page = 1
             self._last_query = query
+            self._page_anchor = {"after": after, "before": before}
 
-            # Obtener solo los contactos filtrados/paginados
-            contacts = self.contact_service.get_paginated(
-                page=self.current_page, 
+            # Página y total de coincidencias en una sola consulta
+            self.contact_page = self.contact_service.get_page_with_count(
                 items_per_page=self.items_per_page,
-                query=query
+                query=query,
+                after=after,
+                before=before
             )
-            total_contacts = self.contact_service.count_all(query=query)
             
-            self.update_contact_list(contacts, total_contacts)
+            self.update_contact_list(self.contact_page.items, self.contact_page.total)
             log_info(f"Lista actualizada (Query: {query}) - Página {self.current_page}")
         except Exception as e:
             log_error(f"Error actualizando lista de contactos: {str(e)}")
@@ -145,20 +151,22 @@ class MainScreen:
             
         self.refresh_contact_list(query=query if len(query) >= 2 else None)
 
+    def current_query(self):
+        """Texto de búsqueda vigente (mínimo 2 caracteres)"""
+        value = self.search_field.value or ""
+        return value if len(value) >= 2 else None
+
     def previous_page(self, e):
         """Ir a la página anterior"""
-        if self.current_page > 1:
+        if self.contact_page and self.contact_page.has_prev:
             self.current_page -= 1
-            self.refresh_contact_list(query=self.search_field.value if len(self.search_field.value) >= 2 else None)
+            self.refresh_contact_list(query=self.current_query(), before=self.contact_page.prev_cursor)
     
     def next_page(self, e):
         """Ir a la página siguiente"""
-        query = self.search_field.value if len(self.search_field.value) >= 2 else None
-        total_contacts = self.contact_service.count_all(query=query)
-        total_pages = (total_contacts + self.items_per_page - 1) // self.items_per_page
-        if self.current_page < total_pages:
+        if self.contact_page and self.contact_page.has_next:
             self.current_page += 1
-            self.refresh_contact_list(query=query)
+            self.refresh_contact_list(query=self.current_query(), after=self.contact_page.next_cursor)
     
     def open_add_contact(self, e):
         """Abrir formulario para agregar contacto"""
@@ -185,9 +193,8 @@ class MainScreen:
                 if success:
                     log_info(f"Contacto {contact_id} eliminado exitosamente")
                     self.page.snack_bar = ft.SnackBar(ft.Text("Contacto eliminado exitosamente"), bgcolor=ft.Colors.GREEN)
-                    # Forzar refresco de la lista manteniendo la búsqueda actual
-                    query = self.search_field.value if len(self.search_field.value) >= 2 else None
-                    self.refresh_contact_list(query=query)
+                    # Forzar refresco de la lista manteniendo la búsqueda y la página actual
+                    self.refresh_contact_list(query=self.current_query(), **self._page_anchor)
                 else:
                     log_error(f"No se pudo eliminar el contacto {contact_id} (No encontrado o error DB)")
                     self.page.snack_bar = ft.SnackBar(ft.Text("No se pudo eliminar el contacto"), bgcolor=ft.Colors.RED)
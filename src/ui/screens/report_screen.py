@@ -1,9 +1,15 @@
 """
 Pantalla de reportes para CRM Personal
 """
+from datetime import datetime
+import threading
 import flet as ft
+from ...config.settings import settings
 from ...config.logging_config import log_info, log_error
-from ...services.contact_service import ContactService, TagService
+from ...services.contact_service import ContactService, TagService, SegmentService
+from ...database.reports import REPORT_PAGE_SIZE
+from ...database.segments import Segment
+from ...services.export_service import ExportService, EXPORT_FORMATS
 
 class ReportScreen:
     """Pantalla para mostrar reportes"""
@@ -16,101 +22,243 @@ class ReportScreen:
         # Controles del filtro
         self.chk_missing_phone = ft.Checkbox(label="Sin Teléfono", value=False)
         self.chk_missing_email = ft.Checkbox(label="Sin Correo", value=False)
-        self.report_text = ft.TextField(
-            multiline=True,
-            read_only=True,
-            min_lines=15,
-            max_lines=30,
-            width=800,
-            text_size=12
-        )
+        self.chk_birthday_soon = ft.Checkbox(label="Cumpleaños en 30 días", value=False)
         self.dd_tags = ft.Dropdown(
             label="Filtrar por Etiqueta (Opcional)",
             width=300,
             options=[]
         )
+        self.dd_exclude_tags = ft.Dropdown(
+            label="Excluir Etiqueta (Opcional)",
+            width=300,
+            options=[]
+        )
+        
+        self.txt_segment_name = ft.TextField(label="Nombre del segmento", width=250)
+        
+        self.dd_export_format = ft.Dropdown(
+            label="Formato",
+            width=120,
+            value=EXPORT_FORMATS[0],
+            options=[ft.dropdown.Option(key=fmt, text=fmt.upper()) for fmt in EXPORT_FORMATS]
+        )
+        # Columnas a exportar: marcadas por defecto las habituales
+        self.export_column_checks = [
+            ft.Checkbox(label=name, value=default, data=name)
+            for name, default in ExportService.available_columns()
+        ]
+        self.btn_export = ft.OutlinedButton("Exportar", on_click=self.export_report, icon=ft.Icons.DOWNLOAD)
+        self.export_progress = ft.ProgressBar(width=400, value=0, visible=False)
+        self.export_text = ft.Text("", size=12, visible=False)
+        self.export_running = False
+        
+        # Resultado: solo se construyen las filas de la página visible
+        self.summary_text = ft.Text("", weight=ft.FontWeight.BOLD)
+        self.report_list = ft.ListView(height=450, width=800, spacing=0, item_extent=86)
         
         # Controles de paginación
         self.current_page_text = ft.Text("1", text_align=ft.TextAlign.CENTER)
         self.total_pages_text = ft.Text("1", text_align=ft.TextAlign.CENTER)
-        self.btn_previous_page = ft.IconButton(ft.Icons.ARROW_BACK_IOS_ROUNDED)
-        self.btn_next_page = ft.IconButton(ft.Icons.ARROW_FORWARD_IOS_ROUNDED)
+        self.btn_previous_page = ft.IconButton(ft.Icons.ARROW_BACK_IOS_ROUNDED, on_click=self.previous_page)
+        self.btn_next_page = ft.IconButton(ft.Icons.ARROW_FORWARD_IOS_ROUNDED, on_click=self.next_page)
+        
+        # Estado del reporte: filtros, cursores de inicio de cada página visitada y página actual
+        self.report_filters = None
+        self.page_starts = [None]
+        self.report_page = None
+        self.total_results = 0
     
     def show(self):
-        """Devuelve el control de la pantalla de reportes"""
-        log_info("Obteniendo pantalla de reportes")
+        """Devuelve el control de la pantalla de reportes, cargando antes las etiquetas"""
+        self.load_tags()
+        log_info("Obteniendo pantalla de reportes avanzada")
         
-        # Botones
-        btn_generate = ft.ElevatedButton("Generar Reporte", on_click=self.generate_report)
-        btn_cancel = ft.TextButton("Cancelar", on_click=self.cancel_report)
+        btn_generate = ft.ElevatedButton("Generar Informe", on_click=self.generate_report, 
+                                         icon=ft.Icons.DESCRIPTION,
+                                         style=ft.ButtonStyle(color=ft.Colors.WHITE, bgcolor=ft.Colors.BLUE))
+        btn_save_segment = ft.OutlinedButton("Guardar Segmento", on_click=self.save_segment, icon=ft.Icons.SAVE)
+        btn_cancel = ft.TextButton("Volver", on_click=self.cancel_report)
         
-        # Layout
-        content = ft.Column([
-            ft.Text("Reporte de Contactos", size=24, weight=ft.FontWeight.BOLD),
-            ft.Divider(),
-            
-            # Filtros
-            ft.Text("Filtros:", size=16, weight=ft.FontWeight.BOLD),
-            ft.Row([self.dd_tags, self.chk_missing_phone, self.chk_missing_email], vertical_alignment=ft.CrossAxisAlignment.CENTER),
-            
-            # Botones
-            ft.Row([btn_generate, btn_cancel]),
-            
-            # Reporte
-            ft.Divider(),
-            self.report_text,
-            
-            # Paginación
-            ft.Row(
-                [
-                    self.btn_previous_page,
-                    ft.Text("Página"),
-                    self.current_page_text,
-                    ft.Text("de"),
-                    self.total_pages_text,
-                    self.btn_next_page,
-                ],
-                alignment=ft.MainAxisAlignment.CENTER,
-            ),
-        ])
-        return content
+        return ft.Container(
+            content=ft.Column([
+                ft.Text("Informes y Segmentación", size=24, weight=ft.FontWeight.BOLD),
+                ft.Divider(),
+                ft.Text("Filtros de Segmentación:", size=16, weight=ft.FontWeight.BOLD),
+                ft.Row([self.dd_tags, self.dd_exclude_tags], wrap=True),
+                ft.Row([self.chk_missing_phone, self.chk_missing_email, self.chk_birthday_soon], wrap=True),
+                ft.Row([btn_generate, self.dd_export_format, self.btn_export, btn_cancel]),
+                ft.Text("Columnas a exportar:", size=14),
+                ft.Row(self.export_column_checks, wrap=True),
+                ft.Row([self.export_progress, self.export_text]),
+                ft.Row([self.txt_segment_name, btn_save_segment]),
+                ft.Divider(),
+                self.summary_text,
+                self.report_list,
+                
+                # Paginación
+                ft.Row(
+                    [
+                        self.btn_previous_page,
+                        ft.Text("Página"),
+                        self.current_page_text,
+                        ft.Text("de"),
+                        self.total_pages_text,
+                        self.btn_next_page,
+                    ],
+                    alignment=ft.MainAxisAlignment.CENTER,
+                ),
+            ], scroll=ft.ScrollMode.AUTO),
+            padding=20
+        )
     
     def generate_report(self, e):
-        """Genera el reporte según los filtros seleccionados"""
+        """Genera el reporte según los filtros seleccionados y muestra su primera página"""
         try:
-            tag_ids = [int(self.dd_tags.value)] if self.dd_tags.value else None
-            
-            # Usar el nuevo método de filtrado avanzado
-            contacts = self.contact_service.get_filtered(
-                tag_ids=tag_ids,
-                missing_phone=self.chk_missing_phone.value,
-                missing_email=self.chk_missing_email.value
-            )
-            
-            # Generar texto del reporte enriquecido con etiquetas
-            report_lines = []
-            report_lines.append(f"TOTAL RESULTADOS: {len(contacts)}")
-            report_lines.append("=" * 40)
+            self.report_filters = self.current_filters()
+            self.total_results = self.contact_service.count_filtered(**self.report_filters)
+            self.page_starts = [None]
+            self.load_report_page()
             
-            for contact in contacts:
-                report_lines.append(f"CONTACTO: {contact.first_name} {contact.last_name}")
-                report_lines.append(f"  Tlf: {contact.phone_1 or '---'}")
-                report_lines.append(f"  Email: {contact.email_1 or '---'}")
-                
-                # Obtener etiquetas actuales del contacto para el reporte
-                contact_tags = self.tag_service.get_by_contact_id(contact.rowid)
-                tag_names = ", ".join([t.name for t in contact_tags])
-                report_lines.append(f"  Etiquetas: {tag_names if tag_names else 'Sin etiquetas'}")
-                report_lines.append("-" * 40)
-            
-            self.report_text.value = "\n".join(report_lines) if contacts else "No se encontraron contactos para estos filtros."
+        except Exception as ex:
+            self.show_error(ex)
+
+    def current_filters(self):
+        """Segmento con los filtros seleccionados en pantalla"""
+        return {"segment": Segment(
+            tags_any=[int(self.dd_tags.value)] if self.dd_tags.value else None,
+            tags_none=[int(self.dd_exclude_tags.value)] if self.dd_exclude_tags.value else None,
+            missing_phone=self.chk_missing_phone.value,
+            missing_email=self.chk_missing_email.value,
+            birthday_within=30 if self.chk_birthday_soon.value else None,
+        )}
+
+    def export_report(self, e):
+        """Exporta el segmento filtrado con las columnas elegidas, en segundo plano"""
+        if self.export_running:
+            return
+        columns = [check.data for check in self.export_column_checks if check.value]
+        if not columns:
+            self.page.snack_bar = ft.SnackBar(ft.Text("Selecciona al menos una columna para exportar"))
+            self.page.snack_bar.open = True
             self.page.update()
-            
+            return
+        try:
+            fmt = self.dd_export_format.value or EXPORT_FORMATS[0]
+            filters = self.current_filters()
+            total = self.contact_service.count_filtered(**filters)
+            settings.EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+            path = settings.EXPORT_DIR / f"contactos_{datetime.now():%Y%m%d_%H%M%S}.{fmt}"
         except Exception as ex:
-            log_error(f"Error reporte: {ex}")
-            self.page.snack_bar = ft.SnackBar(ft.Text(f"Error: {ex}"))
+            self.show_error(ex)
+            return
+
+        self.export_running = True
+        self.btn_export.disabled = True
+        self.export_progress.value = 0
+        self.export_progress.visible = True
+        self.export_text.value = f"Exportando {total} contactos..."
+        self.export_text.visible = True
+        self.page.update()
+        # Hilo aparte para no congelar la UI con exportaciones grandes
+        threading.Thread(
+            target=self.run_export_thread,
+            args=(str(path), fmt, columns, total, filters),
+            daemon=True
+        ).start()
+
+    def run_export_thread(self, path, fmt, columns, total, filters):
+        """Escribe el archivo mostrando las filas exportadas"""
+        def progress(written):
+            self.export_progress.value = written / total if total else 1
+            self.export_text.value = f"[{written}/{total}] Exportando..."
+            self.page.update()
+
+        try:
+            rows = ExportService.export(path, fmt, columns=columns, progress_callback=progress, **filters)
+            self.export_progress.value = 1
+            self.export_text.value = f"Exportados {rows} contactos a {path}"
+            self.page.update()
+        except Exception as ex:
+            self.export_text.value = f"Error en la exportación: {ex}"
+            self.show_error(ex)
+        finally:
+            self.export_running = False
+            self.btn_export.disabled = False
+            self.page.update()
+
+    def save_segment(self, e):
+        """Guarda los filtros actuales como segmento con nombre (utilizable en campañas)"""
+        name = (self.txt_segment_name.value or "").strip()
+        if not name:
+            self.page.snack_bar = ft.SnackBar(ft.Text("Indica un nombre para el segmento"))
             self.page.snack_bar.open = True
             self.page.update()
+            return
+        try:
+            saved = SegmentService.create(name, self.current_filters()["segment"])
+            self.txt_segment_name.value = ""
+            self.page.snack_bar = ft.SnackBar(ft.Text(f"Segmento '{saved.name}' guardado: {saved.member_count} contactos"))
+            self.page.snack_bar.open = True
+            self.page.update()
+        except Exception as ex:
+            self.show_error(ex)
+
+    def load_report_page(self):
+        """Carga y muestra la página que empieza en el último cursor de page_starts"""
+        try:
+            self.report_page = self.contact_service.get_report_page(
+                REPORT_PAGE_SIZE, self.page_starts[-1], **self.report_filters
+            )
+            self.render_report_page()
+        except Exception as ex:
+            self.show_error(ex)
+
+    def render_report_page(self):
+        """Sustituye las filas visibles por las de la página actual"""
+        total_pages = (self.total_results + REPORT_PAGE_SIZE - 1) // REPORT_PAGE_SIZE
+        self.current_page_text.value = str(len(self.page_starts))
+        self.total_pages_text.value = str(max(1, total_pages))
+        self.btn_previous_page.disabled = not self.report_page.has_prev
+        self.btn_next_page.disabled = not self.report_page.has_next
+        
+        if self.total_results:
+            self.summary_text.value = f"TOTAL RESULTADOS: {self.total_results}"
+        else:
+            self.summary_text.value = "No se encontraron contactos para estos filtros."
+        
+        self.report_list.controls = [
+            ft.Container(
+                content=ft.Column([
+                    ft.Text(f"CONTACTO: {row.full_name}", weight=ft.FontWeight.BOLD),
+                    ft.Text(f"Tlf: {row.phone_1 or '---'}    Email: {row.email_1 or '---'}", size=12),
+                    ft.Text(f"Etiquetas: {', '.join(row.tags) if row.tags else 'Sin etiquetas'}",
+                            size=12, color=ft.Colors.GREY_700),
+                ], spacing=2),
+                padding=10,
+                border=ft.border.only(bottom=ft.BorderSide(1, ft.Colors.BLACK12)),
+            )
+            for row in self.report_page
+        ]
+        self.page.update()
+
+    def previous_page(self, e):
+        """Ir a la página anterior del reporte"""
+        if self.report_page and self.report_page.has_prev:
+            self.page_starts.pop()
+            self.load_report_page()
+    
+    def next_page(self, e):
+        """Ir a la página siguiente del reporte"""
+        if self.report_page and self.report_page.has_next:
+            self.page_starts.append(self.report_page.next_cursor)
+            self.load_report_page()
+
+    def show_error(self, ex):
+        """Registra el error y lo muestra al usuario"""
+        log_error(f"Error reporte: {ex}")
+        self.page.snack_bar = ft.SnackBar(ft.Text(f"Error: {ex}"))
+        self.page.snack_bar.open = True
+        self.page.update()
 
     def load_tags(self):
         """Carga las etiquetas disponibles en el dropdown"""
@@ -118,33 +266,12 @@ class ReportScreen:
             tags = self.tag_service.get_all_types()
             self.dd_tags.options = [ft.dropdown.Option(key=str(t.id), text=t.name) for t in tags]
             self.dd_tags.options.insert(0, ft.dropdown.Option(key="", text="Sin filtro de etiqueta"))
+            self.dd_exclude_tags.options = [ft.dropdown.Option(key="", text="No excluir")] + [
+                ft.dropdown.Option(key=str(t.id), text=t.name) for t in tags
+            ]
         except Exception as e:
             log_error(f"Error cargando etiquetas para reporte: {e}")
-
-    def show(self):
-        """Sobreescribimos show para cargar tags al entrar"""
-        self.load_tags()
-        # Llamar al show original o reconstruir el layout
-        log_info("Obteniendo pantalla de reportes avanzada")
-        
-        btn_generate = ft.ElevatedButton("Generar Informe", on_click=self.generate_report, 
-                                         icon=ft.Icons.DESCRIPTION,
-                                         style=ft.ButtonStyle(color=ft.Colors.WHITE, bgcolor=ft.Colors.BLUE))
-        btn_cancel = ft.TextButton("Volver", on_click=self.cancel_report)
-        
-        return ft.Container(
-            content=ft.Column([
-                ft.Text("Informes y Segmentación", size=24, weight=ft.FontWeight.BOLD),
-                ft.Divider(),
-                ft.Text("Filtros de Segmentación:", size=16, weight=ft.FontWeight.BOLD),
-                ft.Row([self.dd_tags, self.chk_missing_phone, self.chk_missing_email], wrap=True),
-                ft.Row([btn_generate, btn_cancel]),
-                ft.Divider(),
-                self.report_text,
-            ], scroll=ft.ScrollMode.AUTO),
-            padding=20
-        )
     
     def cancel_report(self, e):
         """Cancela el reporte y vuelve a la pantalla principal"""
-        self.page.go("/")
\ No newline at end of file
+        self.page.go("/")
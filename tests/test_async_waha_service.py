@@ -0,0 +1,174 @@
+import unittest
+import sys
+import os
+import asyncio
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest.mock import patch
+import httpx
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.async_waha_service import AsyncWahaService, AsyncWahaClient
+from src.services.waha_client import CircuitBreaker, WahaMetrics
+
+
+class SlowWaha(ThreadingHTTPServer):
+    """Servidor WAHA en local que tarda delay segundos en cada respuesta y cuenta las simultáneas"""
+
+    def __init__(self, delay=0.1, failures=()):
+        super().__init__(("127.0.0.1", 0), SlowWahaHandler)
+        self.delay = delay
+        self.failures = list(failures)  # Códigos de error para las primeras respuestas
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []  # (ruta, cuerpo, puerto del cliente)
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class SlowWahaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, body, self.client_address[1]))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            status = server.failures.pop(0) if server.failures else 200
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        if self.path.endswith("check-exists"):
+            result = {"numberExists": not body["phone"].endswith("0"), "chatId": f"{body['phone']}@c.us"}
+        else:
+            result = {"path": self.path}
+        payload = json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = respond
+    do_POST = respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestAsyncWahaService(unittest.TestCase):
+
+    def setUp(self):
+        self.waha = SlowWaha()
+        patch.object(AsyncWahaService, 'BASE_URL', self.waha.url).start()
+
+    def tearDown(self):
+        patch.stopall()
+        self.waha.close()
+
+    async def with_client(self, coroutine_fn, **options):
+        """Ejecuta coroutine_fn con un cliente propio para este bucle"""
+        options = dict(dict(max_concurrency=4, max_retries=2, backoff_base=0.01,
+                            breaker=CircuitBreaker(5, 1), metrics=WahaMetrics()), **options)
+        client = AsyncWahaService._clients[asyncio.get_running_loop()] = AsyncWahaClient(**options)
+        try:
+            return await coroutine_fn()
+        finally:
+            await AsyncWahaService.aclose()
+            self.metrics = client.metrics()
+
+    def test_numbers_are_checked_concurrently_within_the_limit(self):
+        phones = [f"58414000{i:04d}" for i in range(12)]
+        started = time.monotonic()
+        results = asyncio.run(self.with_client(lambda: AsyncWahaService.check_numbers(phones + phones[:2])))
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(list(results), phones)  # Sin repetir números
+        self.assertFalse(results[phones[0]]["numberExists"])
+        self.assertTrue(results[phones[1]]["numberExists"])
+        self.assertEqual(self.waha.max_in_flight, 4)
+        self.assertLess(elapsed, 12 * 0.1 / 2)  # Secuencialmente tardaría 1.2 s
+        # Pool compartido: como mucho una conexión por petición simultánea
+        self.assertLessEqual(len({port for _, _, port in self.waha.requests}), 4)
+        self.assertEqual(self.metrics["contacts/check-exists"]["requests"], 12)
+
+    def test_same_surface_as_sync_service(self):
+        async def calls():
+            return await asyncio.gather(
+                AsyncWahaService.get_sessions(),
+                AsyncWahaService.get_status(),
+                AsyncWahaService.send_text("584141234567@c.us", "Hola", session="s2"),
+            )
+
+        sessions, status, sent = asyncio.run(self.with_client(calls))
+        self.assertEqual(sessions, {"path": "/api/sessions"})
+        self.assertEqual(status, {"path": f"/api/sessions/{AsyncWahaService.SESSION}"})
+        self.assertEqual(sent, {"path": "/api/sendText"})
+        body = next(body for path, body, _ in self.waha.requests if path == "/api/sendText")
+        self.assertEqual(body, {"chatId": "584141234567@c.us", "text": "Hola", "session": "s2"})
+
+    def test_errors_are_retried_and_reported_per_number(self):
+        self.waha.delay = 0
+        self.waha.failures = [503, 500, 200, 400]
+
+        async def calls():
+            first = await AsyncWahaService.check_number_status("584140000001")
+            second = await AsyncWahaService.check_numbers(["584140000002"])
+            return first, second
+
+        first, second = asyncio.run(self.with_client(calls))
+        self.assertTrue(first["numberExists"])
+        self.assertIsInstance(second["584140000002"], httpx.HTTPStatusError)
+        self.assertEqual(self.metrics["contacts/check-exists"]["retries"], 2)
+
+    def test_cancelled_trial_does_not_block_the_breaker(self):
+        self.waha.delay = 0.5
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.1)
+
+        async def calls():
+            # La petición de prueba se cancela antes de que WAHA responda
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(AsyncWahaService.get_sessions(), timeout=0.1)
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            self.waha.delay = 0
+            return await AsyncWahaService.get_sessions()
+
+        self.assertEqual(asyncio.run(self.with_client(calls, breaker=breaker)), {"path": "/api/sessions"})
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_sync_wrappers_from_a_worker_thread(self):
+        self.waha.delay = 0.05
+        results = {}
+
+        def worker():
+            results["numbers"] = AsyncWahaService.check_numbers_sync(["584140000001", "584140000002"])
+            results["sessions"] = AsyncWahaService.get_sessions_sync()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join(timeout=10)
+        self.assertEqual(set(results["numbers"]), {"584140000001", "584140000002"})
+        self.assertEqual(results["sessions"], {"path": "/api/sessions"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact
+from src.models.tag import TagType, ContactTag
+from src.database.bulk import BulkResult, BULK_CHUNK_SIZE
+from src.database.repositories import TagRepository, ContactCountCache
+
+class TestBulkTagging(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.patcher = patch('src.database.repositories.engine', self.engine)
+        self.patcher.start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            contacts = [Contact(first_name=f"C{i}", last_name="Bulk") for i in range(1200)]
+            self.tags = [TagType(name="Cliente"), TagType(name="Amigo"), TagType(name="Colega")]
+            session.add_all(contacts + self.tags)
+            session.commit()
+            self.contact_ids = [c.rowid for c in contacts]
+            self.tag_ids = [t.id for t in self.tags]
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def links(self):
+        with Session(self.engine) as session:
+            return set(session.query(ContactTag.contact_id, ContactTag.tag_type_id).all())
+
+    def test_add_skips_existing_links_and_unknown_contacts(self):
+        cliente = self.tag_ids[0]
+        first = TagRepository.bulk_add_tag(self.contact_ids[:10], cliente)
+        self.assertEqual(first, BulkResult(inserted=10, skipped=0))
+
+        # 5 ya etiquetados, 5 nuevos, un id repetido y uno inexistente
+        ids = self.contact_ids[5:15] + [self.contact_ids[5], 999999]
+        second = TagRepository.bulk_add_tag(ids, cliente)
+        self.assertEqual(second, BulkResult(inserted=5, skipped=6))
+        self.assertEqual(len(self.links()), 15)
+
+    def test_large_selection_is_chunked(self):
+        statements = []
+
+        def count_inserts(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT"):
+                statements.append(len(parameters))
+
+        event.listen(self.engine, "before_cursor_execute", count_inserts)
+        try:
+            result = TagRepository.bulk_add_tag(self.contact_ids, self.tag_ids[1])
+        finally:
+            event.remove(self.engine, "before_cursor_execute", count_inserts)
+
+        self.assertEqual(result.inserted, len(self.contact_ids))
+        self.assertEqual(len(statements), -(-len(self.contact_ids) // BULK_CHUNK_SIZE))
+        self.assertTrue(all(n <= BULK_CHUNK_SIZE + 1 for n in statements))
+
+    def test_remove_counts_only_existing_links(self):
+        amigo = self.tag_ids[1]
+        TagRepository.bulk_add_tag(self.contact_ids[:4], amigo)
+        result = TagRepository.bulk_remove_tag(self.contact_ids[:6], amigo)
+        self.assertEqual(result, BulkResult(removed=4, skipped=2))
+        self.assertEqual(self.links(), set())
+
+    def test_replace_sets_exact_tags(self):
+        cliente, amigo, colega = self.tag_ids
+        ids = self.contact_ids[:3]
+        TagRepository.bulk_add_tag(ids, cliente)
+        TagRepository.bulk_add_tag(ids[:1], amigo)
+
+        result = TagRepository.bulk_replace_tags(ids, [amigo, colega])
+        self.assertEqual(result, BulkResult(inserted=5, removed=3, skipped=1))
+        self.assertEqual(self.links(), {(cid, tag) for cid in ids for tag in (amigo, colega)})
+
+        # Reemplazar por ninguna etiqueta las quita todas
+        result = TagRepository.bulk_replace_tags(ids, [])
+        self.assertEqual(result.removed, 6)
+        self.assertEqual(self.links(), set())
+
+if __name__ == '__main__':
+    unittest.main()
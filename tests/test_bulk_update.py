@@ -0,0 +1,91 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact, ContactStatus
+from src.database.bulk import BULK_CHUNK_SIZE
+from src.database.repositories import ContactRepository, ContactCountCache
+
+class TestBulkUpdate(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.patcher = patch('src.database.repositories.engine', self.engine)
+        self.patcher.start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            contacts = [Contact(first_name=f"C{i}", last_name="Bulk", phone_1=f"0414{i:07d}")
+                        for i in range(1100)]
+            session.add_all(contacts)
+            session.commit()
+            self.contact_ids = [c.rowid for c in contacts]
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def count_updates(self, call):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("UPDATE"):
+                statements.append(statement)
+
+        event.listen(self.engine, "before_cursor_execute", capture)
+        try:
+            result = call()
+        finally:
+            event.remove(self.engine, "before_cursor_execute", capture)
+        return result, len(statements)
+
+    def test_bulk_update_is_chunked_and_counts_rows(self):
+        ids = self.contact_ids + [999999]
+        updated, statements = self.count_updates(
+            lambda: ContactRepository.bulk_update(ids, {"is_phone_verified": True})
+        )
+        self.assertEqual(updated, len(self.contact_ids))
+        self.assertEqual(statements, -(-len(ids) // BULK_CHUNK_SIZE))
+        with Session(self.engine) as session:
+            self.assertEqual(session.query(Contact).filter(Contact.is_phone_verified == True).count(),
+                             len(self.contact_ids))
+
+    def test_bulk_update_mapping_per_contact_values(self):
+        first, second = self.contact_ids[:2]
+        updated, _ = self.count_updates(lambda: ContactRepository.bulk_update_mapping([
+            {"rowid": first, "phone_1": "+584140000001"},
+            {"rowid": second, "phone_1": "+584140000002"},
+            {"rowid": first, "relationship_general": "Primo", "status": ContactStatus.BLOCKED},
+            {"rowid": 999999, "phone_1": "+580000000000"},
+        ]))
+        self.assertEqual(updated, 3)
+
+        contacts = {c.rowid: c for c in ContactRepository.get_by_ids([first, second])}
+        self.assertEqual(contacts[first].phone_1, "+584140000001")
+        self.assertEqual(contacts[first].relationship_general, "Primo")
+        self.assertEqual(contacts[first].status, ContactStatus.BLOCKED)
+        self.assertEqual(contacts[second].phone_1, "+584140000002")
+        # El índice de búsqueda sigue al teléfono nuevo
+        self.assertEqual([c.rowid for c in ContactRepository.search("584140000002")], [second])
+
+    def test_unknown_fields_are_rejected(self):
+        with self.assertRaises(ValueError):
+            ContactRepository.bulk_update(self.contact_ids[:1], {"no_existe": 1})
+        with self.assertRaises(ValueError):
+            ContactRepository.bulk_update_mapping([{"rowid": self.contact_ids[0], "rowid_2": 1}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,9 +6,17 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from unittest.mock import MagicMock, patch
-from src.services.campaign_service import TemplateEngine, CampaignService
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+from src.services.campaign_service import TemplateEngine, CampaignService, relationship_type_names
+from src.database.migrations import DEFAULT_RELATIONSHIP_TYPES
 from src.models.contact import Contact
 from src.models.relationship import ContactRelationship, RelationshipType
+from src.models.base import Base
+from src.models.tag import TagType, ContactTag
+from src.database.repositories import RelationshipRepository, ContactCountCache
+from src.database.profile import RelatedContact
 
 class TestTemplateEngine(unittest.TestCase):
     def setUp(self):
@@ -61,20 +69,82 @@ class TestTemplateEngine(unittest.TestCase):
         result = TemplateEngine.process_template(template, self.contact, relationships)
         self.assertEqual(result, "Hola Juan te saluda")
 
+    def test_typed_relationship_variable(self):
+        friend = RelatedContact(5, 3, "Pedro Ruiz", "Amigo", "Pedro")
+        spouse = RelatedContact(6, 2, "Maria Gomez", "Esposa", "Maria")
+        template = "Hola [$nombre] {y a [$familiar:esposa]} {y a [$familiar:Hijo]}"
+        result = TemplateEngine.process_template(template, self.contact, [friend, spouse])
+        self.assertEqual(result, "Hola Juan y a Maria")
+        self.assertEqual(TemplateEngine.process_template("[$familiar]", self.contact, [friend, spouse]), "Pedro")
+
+    def test_typed_relationship_variable_matches_default_types(self):
+        spouse = RelatedContact(6, 2, "Maria Gomez", "Esposo/a", "Maria")
+        mother = RelatedContact(7, 2, "Rosa Gomez", "Padre/Madre", "Rosa")
+        coworker = RelatedContact(8, 2, "Ines Mora", "Compañero/a de trabajo", "Ines")
+        related = [spouse, mother, coworker]
+        for template, expected in [
+            ("[$familiar:Esposa]", "Maria"),
+            ("[$familiar:esposo]", "Maria"),
+            ("[$familiar:Esposo/a]", "Maria"),
+            ("[$familiar:Madre]", "Rosa"),
+            ("[$familiar:Compañera de trabajo]", "Ines"),
+            ("{y a [$familiar:Hija]}", ""),
+        ]:
+            self.assertEqual(TemplateEngine.process_template(template, self.contact, related), expected, template)
+        # Cada tipo predeterminado se reconoce por su propio nombre
+        for name in DEFAULT_RELATIONSHIP_TYPES:
+            self.assertIn(name.lower(), relationship_type_names(name))
+        self.assertEqual(relationship_type_names("Hijo/a"), {"hijo/a", "hijo", "hija"})
+
+    def test_compiled_template_reports_what_it_needs(self):
+        compiled = TemplateEngine.compile("Hola [$tratamiento] [$nombre_completo] {y a [$familiar:Esposa]} [$otra]")
+        self.assertEqual(compiled.variables, ("tratamiento", "nombre_completo", "familiar:Esposa", "otra"))
+        self.assertEqual(compiled.contact_columns, {"title", "first_name", "last_name"})
+        self.assertTrue(compiled.needs_relationships)
+        self.assertIs(TemplateEngine.compile("Hola [$nombre]"), TemplateEngine.compile("Hola [$nombre]"))
+        self.assertFalse(TemplateEngine.compile("Hola [$nombre]").needs_relationships)
+
+    def test_unbalanced_braces_are_kept_as_text(self):
+        result = TemplateEngine.process_template("Hola } [$nombre] {sin cerrar [$apellido]", self.contact)
+        self.assertEqual(result, "Hola } Juan {sin cerrar Perez")
+
 class TestCampaignService(unittest.TestCase):
+    def setUp(self):
+        # Los mensajes se encolan en la base de datos (outbox) antes de enviarse
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.patcher = patch('src.database.repositories.engine', self.engine)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
     @patch('src.services.campaign_service.ContactRepository')
     @patch('src.services.campaign_service.RelationshipRepository')
     @patch('src.services.campaign_service.WahaService')
-    @patch('src.services.campaign_service.time')
-    def test_send_campaign(self, mock_time, mock_waha, mock_rel_repo, mock_contact_repo):
+    @patch('src.services.campaign_service.SendScheduler')
+    def test_send_campaign(self, mock_scheduler, mock_waha, mock_rel_repo, mock_contact_repo):
         # Setup mocks
-        contact = Contact(first_name="Test", phone_1="123", rowid=1)
+        contact = Contact(first_name="Test", phone_1="04141234567", rowid=1)
         tag_mock = MagicMock()
         tag_mock.name = "Amigo"
         contact.tags = [tag_mock]
         
-        mock_contact_repo.return_value.get_all.return_value = [contact]
-        mock_rel_repo.return_value.get_by_contact_id.return_value = []
+        mock_contact_repo.get_filtered.return_value = [contact]
+        mock_rel_repo.get_related_by_contact_ids.return_value = {}
+        
+        # El planificador marca el ritmo anti-ban; aquí envía de inmediato con su función de envío
+        def run(next_message, remaining=0, daily_sent=None):
+            send = mock_scheduler.call_args.args[1]
+            message = next_message("default")
+            send(message.chat_id, message.text, "default")
+            yield "default", message, None
+        mock_scheduler.return_value.run.side_effect = run
         
         # Run campaign
         generator = CampaignService.send_campaign("Amigo", "Hola [$nombre]")
@@ -82,8 +152,83 @@ class TestCampaignService(unittest.TestCase):
         
         # Verify
         self.assertTrue(mock_waha.send_text.called)
-        self.assertTrue(mock_time.sleep.called) # Anti-ban delay
+        self.assertTrue(mock_scheduler.return_value.run.called) # Anti-ban delay
         self.assertEqual(len(results), 2) # Start msg + 1 contact sent
+        # La plantilla no usa relaciones: ni se consultan
+        mock_rel_repo.get_related_by_contact_ids.assert_not_called()
+
+class TestCampaignRelationships(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.patcher = patch('src.database.repositories.engine', self.engine)
+        self.patcher.start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            juan = Contact(first_name="Juan", last_name="Perez", phone_1="04141111111")
+            maria = Contact(first_name="Maria", last_name="Gomez", phone_1="04142222222")
+            pedro = Contact(first_name="Pedro", last_name="Ruiz", phone_1="04143333333")
+            spouse = RelationshipType(name="Esposo/a")
+            tag = TagType(name="Amigo")
+            session.add_all([juan, maria, pedro, spouse, tag])
+            session.flush()
+            session.add_all([ContactTag(contact_id=c.rowid, tag_type_id=tag.id) for c in (juan, maria, pedro)])
+            session.add(ContactRelationship(contact_id=juan.rowid, related_contact_id=maria.rowid,
+                                            relationship_type_id=spouse.id))
+            session.commit()
+            self.juan_id, self.maria_id, self.pedro_id = juan.rowid, maria.rowid, pedro.rowid
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def test_related_contacts_are_loaded_in_one_query(self):
+        selects = []
+
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                selects.append(statement)
+
+        event.listen(self.engine, "before_cursor_execute", listener)
+        try:
+            related = RelationshipRepository.get_related_by_contact_ids([self.juan_id, self.maria_id, self.pedro_id])
+        finally:
+            event.remove(self.engine, "before_cursor_execute", listener)
+
+        self.assertEqual(len(selects), 1)
+        self.assertEqual([(r.contact_id, r.first_name, r.relationship_type) for r in related[self.juan_id]],
+                         [(self.maria_id, "Maria", "Esposo/a")])
+        # La relación también se ve desde el otro contacto
+        self.assertEqual(related[self.maria_id][0].full_name, "Juan Perez")
+        self.assertNotIn(self.pedro_id, related)
+
+    def test_recipients_load_only_template_columns(self):
+        selects = []
+
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            if "FROM contacts" in statement:
+                selects.append(statement)
+
+        event.listen(self.engine, "before_cursor_execute", listener)
+        try:
+            list(CampaignService.send_campaign("Amigo", "Hola [$tratamiento] [$nombre]", dry_run=True))
+        finally:
+            event.remove(self.engine, "before_cursor_execute", listener)
+
+        self.assertIn("contacts.title", selects[0])
+        self.assertIn("contacts.phone_1", selects[0])
+        self.assertNotIn("contacts.email_1", selects[0])
+
+    def test_campaign_uses_prefetched_relationships(self):
+        results = list(CampaignService.send_campaign("Amigo", "Hola [$nombre] {y a [$familiar]}", dry_run=True))
+        messages = [message for _, _, message in results[1:]]
+        self.assertIn("Simulado: Juan Perez -> Hola Juan y a Maria...", messages)
+        self.assertIn("Simulado: Pedro Ruiz -> Hola Pedro...", messages)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,237 @@
+import unittest
+import sys
+import os
+import time
+from unittest.mock import patch
+from sqlalchemy import create_engine, select, update, event, text
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact
+from src.models.tag import TagType, ContactTag
+from src.models.campaign import Campaign, CampaignMessage, CampaignStatus, MessageStatus
+from src.database.outbox import INTERRUPTED_ERROR, DeliveryBuffer, DeliveryResult
+from src.database.repositories import CampaignRepository, ContactRepository, ContactCountCache
+from src.services.campaign_service import CampaignService
+from src.config.settings import settings
+
+class TestCampaignOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        patch('src.database.repositories.engine', self.engine).start()
+        # Sin pausas entre envíos
+        patch.object(settings, 'CAMPAIGN_SEND_INTERVAL_SECONDS', 0).start()
+        patch.object(settings, 'CAMPAIGN_SEND_JITTER_SECONDS', 0).start()
+        self.waha = patch('src.services.campaign_service.WahaService').start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            tag = TagType(name="Cliente")
+            contacts = [Contact(first_name=f"C{i}", last_name="Outbox", phone_1=f"0414-000-{i:04d}") for i in range(6)]
+            contacts.append(Contact(first_name="Sin", last_name="Telefono", phone_1=""))
+            session.add_all(contacts + [tag])
+            session.flush()
+            session.add_all([ContactTag(contact_id=c.rowid, tag_type_id=tag.id) for c in contacts])
+            session.commit()
+            self.contact_ids = [c.rowid for c in contacts]
+
+    def tearDown(self):
+        patch.stopall()
+        self.engine.dispose()
+
+    def statuses(self, campaign_id):
+        with Session(self.engine) as session:
+            return dict(session.execute(
+                select(CampaignMessage.contact_id, CampaignMessage.status).where(
+                    CampaignMessage.campaign_id == campaign_id
+                )
+            ).all())
+
+    def test_campaign_is_queued_before_sending(self):
+        campaign = CampaignService.create_campaign("Cliente", "Hola [$nombre]")
+        statuses = self.statuses(campaign.id)
+        self.assertEqual(len(statuses), 7)
+        self.assertEqual(statuses[self.contact_ids[-1]], MessageStatus.SKIPPED)
+        self.assertEqual(sum(s == MessageStatus.PENDING for s in statuses.values()), 6)
+        self.waha.send_text.assert_not_called()
+        self.assertEqual([c.id for c in CampaignService.get_unfinished()], [campaign.id])
+
+    def test_run_sends_each_message_and_records_contact(self):
+        results = list(CampaignService.send_campaign("Cliente", "Hola [$nombre]"))
+        self.assertEqual(results[-1][:2], (7, 7))
+        self.assertEqual(self.waha.send_text.call_count, 6)
+        self.waha.send_text.assert_any_call("584140000000@c.us", "Hola C0", session=settings.WAHA_SESSIONS[0])
+
+        with Session(self.engine) as session:
+            campaign = session.scalars(select(Campaign)).one()
+            self.assertEqual(campaign.status, CampaignStatus.COMPLETED)
+            contact = session.get(Contact, self.contact_ids[0])
+            self.assertEqual(contact.last_contact_channel, "whatsapp")
+            self.assertTrue(contact.last_contact_date)
+        self.assertEqual(CampaignService.get_unfinished(), [])
+
+    def test_resume_after_stop_does_not_resend(self):
+        campaign = CampaignService.create_campaign("Cliente", "Hola [$nombre]")
+        run = CampaignService.run_campaign(campaign.id)
+        next(run)  # Inicio
+        next(run)
+        next(run)
+        run.close()  # La aplicación se cierra tras dos envíos
+        self.assertEqual(self.waha.send_text.call_count, 2)
+
+        # Tras reiniciar, la campaña sigue en curso y continúa donde se quedó
+        self.assertEqual([c.id for c in CampaignService.get_unfinished()], [campaign.id])
+        results = list(CampaignService.run_campaign(campaign.id))
+        self.assertTrue(results[0][2].startswith("Reanudando"))
+        self.assertEqual(results[0][:2], (3, 7))
+        self.assertEqual(self.waha.send_text.call_count, 6)
+        sent_to = [call.args[0] for call in self.waha.send_text.call_args_list]
+        self.assertEqual(len(sent_to), len(set(sent_to)))
+
+    def test_message_interrupted_while_sending_is_not_resent(self):
+        campaign = CampaignService.create_campaign("Cliente", "Hola [$nombre]")
+        first = CampaignRepository.get_pending_batch(campaign.id, limit=1)[0]
+        self.assertTrue(CampaignRepository.mark_sending(first.id))
+        # Otro worker no puede reservar el mismo mensaje
+        self.assertFalse(CampaignRepository.mark_sending(first.id))
+
+        list(CampaignService.run_campaign(campaign.id))
+        self.assertEqual(self.waha.send_text.call_count, 5)
+        with Session(self.engine) as session:
+            message = session.get(CampaignMessage, first.id)
+            self.assertEqual((message.status, message.last_error), (MessageStatus.FAILED, INTERRUPTED_ERROR))
+
+        # Reintentar los fallidos no incluye los interrumpidos: hay que pedirlo expresamente
+        self.assertEqual(CampaignRepository.retry_failed(campaign.id), 0)
+        self.assertEqual(CampaignRepository.retry_failed(campaign.id, include_interrupted=True), 1)
+        list(CampaignService.run_campaign(campaign.id))
+        self.assertEqual(self.waha.send_text.call_count, 6)
+        self.assertEqual(self.statuses(campaign.id)[first.contact_id], MessageStatus.SENT)
+
+    def test_unsaved_sends_count_towards_the_daily_cap(self):
+        waha_session = settings.WAHA_SESSIONS[0]
+        today = time.strftime("%Y-%m-%d")
+        campaign = CampaignService.create_campaign("Cliente", "Hola [$nombre]")
+        first, second, third = CampaignRepository.get_pending_batch(campaign.id, limit=3)
+        CampaignRepository.mark_sent(first.id, first.contact_id)
+        with Session(self.engine) as session:
+            session.execute(update(CampaignMessage).where(CampaignMessage.id == first.id).values(session=waha_session))
+            session.commit()
+        # Enviado por otra campaña cuyo resultado sigue en el búfer
+        self.assertTrue(CampaignRepository.mark_sending(second.id, waha_session))
+        self.assertEqual(CampaignRepository.count_sent_since(waha_session, today), 2)
+
+        # Interrumpido: pudo llegar, así que sigue contando
+        self.assertTrue(CampaignRepository.mark_sending(third.id, waha_session))
+        CampaignRepository.recover_interrupted(campaign.id)
+        self.assertEqual(CampaignRepository.count_sent_since(waha_session, today), 3)
+        self.assertEqual(CampaignRepository.count_sent_since("otra", today), 0)
+
+    def test_failed_send_is_recorded(self):
+        self.waha.send_text.side_effect = [RuntimeError("WAHA caído")] + [{}] * 5
+        list(CampaignService.send_campaign("Cliente", "Hola [$nombre]"))
+        with Session(self.engine) as session:
+            failed = session.scalars(select(CampaignMessage).where(
+                CampaignMessage.status == MessageStatus.FAILED
+            )).all()
+            self.assertEqual([(m.last_error, m.attempts) for m in failed], [("WAHA caído", 1)])
+
+    def test_results_are_written_in_batches(self):
+        patch.object(settings, 'CAMPAIGN_RESULTS_FLUSH_SIZE', 4).start()
+        patch.object(settings, 'CAMPAIGN_RESULTS_FLUSH_SECONDS', 60).start()
+        contact_updates = []
+
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("UPDATE CONTACTS"):
+                contact_updates.append(len(parameters) if executemany else 1)
+
+        event.listen(self.engine, "before_cursor_execute", listener)
+        try:
+            list(CampaignService.send_campaign("Cliente", "Hola [$nombre]"))
+        finally:
+            event.remove(self.engine, "before_cursor_execute", listener)
+
+        # 6 envíos: un lote de 4 y el resto al terminar
+        self.assertEqual(contact_updates, [4, 2])
+        with Session(self.engine) as session:
+            campaign_id = session.scalars(select(Campaign.id)).one()
+        self.assertEqual(sum(s == MessageStatus.SENT for s in self.statuses(campaign_id).values()), 6)
+
+    def test_buffered_results_are_written_when_stopped(self):
+        patch.object(settings, 'CAMPAIGN_RESULTS_FLUSH_SIZE', 100).start()
+        campaign = CampaignService.create_campaign("Cliente", "Hola [$nombre]")
+        run = CampaignService.run_campaign(campaign.id)
+        next(run)
+        next(run)
+        next(run)
+        self.assertEqual(sum(s == MessageStatus.SENT for s in self.statuses(campaign.id).values()), 0)
+        run.close()
+        self.assertEqual(sum(s == MessageStatus.SENT for s in self.statuses(campaign.id).values()), 2)
+
+    def test_buffer_writes_after_max_seconds(self):
+        written = []
+        buffer = DeliveryBuffer(written.append, max_size=10, max_seconds=0.05)
+        buffer.add(DeliveryResult(1, 1, "2024-01-01 00:00:00", None))
+        deadline = time.monotonic() + 2
+        while not written and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([len(batch) for batch in written], [1])
+        self.assertEqual(len(buffer), 0)
+
+    def test_contact_with_queued_messages_can_be_deleted(self):
+        with Session(self.engine) as session:
+            session.execute(text("PRAGMA foreign_keys = ON"))
+        campaign = CampaignService.create_campaign("Cliente", "Hola [$nombre]")
+        self.assertTrue(ContactRepository.delete(self.contact_ids[0]))
+        statuses = self.statuses(campaign.id)
+        self.assertNotIn(self.contact_ids[0], statuses)
+        self.assertEqual(len(statuses), 6)
+
+    def test_deleting_a_contact_keeps_its_sent_messages(self):
+        with Session(self.engine) as session:
+            session.execute(text("PRAGMA foreign_keys = ON"))
+        waha_session = settings.WAHA_SESSIONS[0]
+        today = time.strftime("%Y-%m-%d")
+        list(CampaignService.send_campaign("Cliente", "Hola [$nombre]"))
+        sent_before = CampaignRepository.count_sent_since(waha_session, today)
+        self.assertGreater(sent_before, 0)
+
+        self.assertTrue(ContactRepository.delete(self.contact_ids[0]))
+        # El historial y el límite diario no cambian; el mensaje queda sin contacto
+        self.assertEqual(CampaignRepository.count_sent_since(waha_session, today), sent_before)
+        with Session(self.engine) as session:
+            message = session.scalars(select(CampaignMessage).where(
+                CampaignMessage.chat_id == "584140000000@c.us"
+            )).one()
+        self.assertEqual((message.contact_id, message.status, message.recipient_name),
+                         (None, MessageStatus.SENT, "C0 Outbox"))
+        # El omitido (sin teléfono) sí se descarta
+        self.assertTrue(ContactRepository.delete(self.contact_ids[-1]))
+        with Session(self.engine) as session:
+            campaign_id = session.scalars(select(Campaign.id)).one()
+        self.assertEqual(len(self.statuses(campaign_id)), 6)
+
+    def test_enqueue_is_idempotent_per_contact(self):
+        message = {"contact_id": self.contact_ids[0], "recipient_name": "C0", "chat_id": "1@c.us", "text": "Hola"}
+        campaign = CampaignRepository.create("Duplicados", "{}", "Hola", None, [message, dict(message)])
+        self.assertEqual(sum(CampaignRepository.get_progress(campaign.id).values()), 1)
+
+    def test_dry_run_does_not_queue(self):
+        results = list(CampaignService.send_campaign("Cliente", "Hola [$nombre]", dry_run=True))
+        self.assertIn("Saltado: Sin Telefono (Sin teléfono)", [message for _, _, message in results])
+        with Session(self.engine) as session:
+            self.assertEqual(session.scalars(select(Campaign)).all(), [])
+        self.waha.send_text.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+from sqlalchemy import create_engine, select
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact
+from src.models.tag import TagType, ContactTag
+from src.models.campaign import CampaignMessage, MessageStatus
+from src.database.repositories import WhatsAppStatusRepository, ContactCountCache
+from src.database.outbox import now_timestamp
+from src.services.campaign_service import (
+    CampaignService, SKIP_RESTRICTED, SKIP_NO_PHONE, SKIP_INVALID_PHONE, SKIP_NO_WHATSAPP,
+    SKIP_DUPLICATE, SKIP_EMPTY_MESSAGE
+)
+
+
+class TestCampaignPreflight(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        patch('src.database.repositories.engine', self.engine).start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            tag = TagType(name="Cliente")
+            blocked = TagType(name="No contactar", is_restricted=True)
+            self.contacts = {
+                "ok": Contact(first_name="Ana", last_name="Lista", phone_1="0414-111-1111"),
+                # Mismo número escrito de otra forma: se envía una sola vez
+                "shared": Contact(first_name="Luis", last_name="Lista", phone_1="+58 414 111 1111"),
+                "restricted": Contact(first_name="Rosa", last_name="Bloqueada", phone_1="04142222222"),
+                "no_phone": Contact(first_name="Sin", last_name="Telefono", phone_1=""),
+                "invalid": Contact(first_name="Mal", last_name="Numero", phone_1="123"),
+                "no_whatsapp": Contact(first_name="Sin", last_name="WhatsApp", phone_1="04143333333"),
+                # El primero no tiene WhatsApp pero el segundo sí
+                "second": Contact(first_name="Segundo", last_name="Tlf", phone_1="04144444440",
+                                  phone_2="04144444441"),
+            }
+            session.add_all(list(self.contacts.values()) + [tag, blocked])
+            session.flush()
+            session.add_all([ContactTag(contact_id=c.rowid, tag_type_id=tag.id) for c in self.contacts.values()])
+            session.add(ContactTag(contact_id=self.contacts["restricted"].rowid, tag_type_id=blocked.id))
+            session.commit()
+            self.ids = {key: contact.rowid for key, contact in self.contacts.items()}
+
+        WhatsAppStatusRepository.save([
+            {"phone": "+584143333333", "exists": False, "chat_id": None, "checked_at": now_timestamp()},
+            {"phone": "+584144444440", "exists": False, "chat_id": None, "checked_at": now_timestamp()},
+            {"phone": "+584144444441", "exists": True, "chat_id": "584144444441@c.us", "checked_at": now_timestamp()},
+        ])
+
+    def tearDown(self):
+        patch.stopall()
+        self.engine.dispose()
+
+    def test_preflight_builds_clean_send_list_and_skip_report(self):
+        result = CampaignService.preflight("Cliente", "Hola [$nombre]")
+
+        self.assertEqual(
+            [(m["contact_id"], m["chat_id"], m["text"]) for m in result.messages],
+            [(self.ids["ok"], "584141111111@c.us", "Hola Ana"),
+             (self.ids["second"], "584144444441@c.us", "Hola Segundo")]
+        )
+        skipped = {m["contact_id"]: m["last_error"] for m in result.skipped}
+        self.assertEqual(skipped, {
+            self.ids["shared"]: SKIP_DUPLICATE,
+            self.ids["restricted"]: SKIP_RESTRICTED,
+            self.ids["no_phone"]: SKIP_NO_PHONE,
+            self.ids["invalid"]: SKIP_INVALID_PHONE,
+            self.ids["no_whatsapp"]: SKIP_NO_WHATSAPP,
+        })
+        self.assertTrue(all(m["status"] == MessageStatus.SKIPPED for m in result.skipped))
+        self.assertEqual(sum(result.skip_report().values()), 5)
+
+    def test_expired_cache_does_not_skip(self):
+        with patch('src.services.campaign_service.WhatsAppValidationService.cache_cutoff',
+                   return_value="9999-01-01 00:00:00"):
+            result = CampaignService.preflight("Cliente", "Hola [$nombre]")
+        # Sin resultados vigentes se intenta con el primer teléfono
+        chats = {m["contact_id"]: m["chat_id"] for m in result.messages}
+        self.assertEqual(chats[self.ids["no_whatsapp"]], "584143333333@c.us")
+        self.assertEqual(chats[self.ids["second"]], "584144444440@c.us")
+        self.assertNotIn(SKIP_NO_WHATSAPP, result.skip_report())
+
+    def test_empty_messages_are_skipped(self):
+        result = CampaignService.preflight("Cliente", "{[$tratamiento]}")
+        self.assertEqual(result.messages, [])
+        # También el que comparte número: el vacío del primero no lo ocupa
+        self.assertEqual(result.skip_report()[SKIP_EMPTY_MESSAGE], 3)
+        self.assertNotIn(SKIP_DUPLICATE, result.skip_report())
+
+    def test_empty_message_does_not_claim_a_shared_number(self):
+        # Solo el segundo contacto del número compartido tiene tratamiento
+        with Session(self.engine) as session:
+            session.get(Contact, self.ids["shared"]).title = "Sr."
+            session.commit()
+        result = CampaignService.preflight("Cliente", "{Hola [$tratamiento]}")
+        self.assertEqual([(m["contact_id"], m["chat_id"]) for m in result.messages],
+                         [(self.ids["shared"], "584141111111@c.us")])
+        skipped = {m["contact_id"]: m["last_error"] for m in result.skipped}
+        self.assertEqual(skipped[self.ids["ok"]], SKIP_EMPTY_MESSAGE)
+        self.assertNotIn(SKIP_DUPLICATE, result.skip_report())
+
+    def test_skipped_recipients_are_recorded_in_the_outbox(self):
+        campaign = CampaignService.create_campaign("Cliente", "Hola [$nombre]")
+        with Session(self.engine) as session:
+            rows = session.execute(
+                select(CampaignMessage.status, CampaignMessage.last_error).where(
+                    CampaignMessage.campaign_id == campaign.id
+                )
+            ).all()
+        self.assertEqual(sum(1 for status, _ in rows if status == MessageStatus.PENDING), 2)
+        self.assertIn((MessageStatus.SKIPPED, SKIP_RESTRICTED), rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
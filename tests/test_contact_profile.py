@@ -0,0 +1,117 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact
+from src.models.tag import TagType, ContactTag
+from src.models.hobby import Hobby, ContactHobby
+from src.models.event import ImportantEvent
+from src.models.relationship import RelationshipType, ContactRelationship
+from src.database.profile import ContactProfile
+from src.database.repositories import ContactRepository, ContactCountCache
+
+class TestContactProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.patcher = patch('src.database.repositories.engine', self.engine)
+        self.patcher.start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            ana = Contact(first_name="Ana", last_name="Pérez", phone_1="04140000001")
+            luis = Contact(first_name="Luis", last_name="Gómez", phone_1="04140000002")
+            eva = Contact(first_name="Eva", last_name="Ruiz", phone_1="04140000003")
+            session.add_all([ana, luis, eva])
+            session.flush()
+
+            tags = [TagType(name=f"Etiqueta {i}") for i in range(3)]
+            hobbies = [Hobby(name=f"Hobby {i}") for i in range(2)]
+            spouse = RelationshipType(name="Esposo/a")
+            friend = RelationshipType(name="Amigo/a")
+            session.add_all(tags + hobbies + [spouse, friend])
+            session.flush()
+
+            session.add_all([ContactTag(contact_id=ana.rowid, tag_type_id=t.id) for t in tags])
+            session.add_all([ContactHobby(contact_id=ana.rowid, hobby_id=h.id) for h in hobbies])
+            session.add(ImportantEvent(contact_id=ana.rowid, title="Cumpleaños", event_date="1990-05-01"))
+            session.add(ContactRelationship(contact_id=ana.rowid, related_contact_id=luis.rowid,
+                                            relationship_type_id=spouse.id))
+            session.add(ContactRelationship(contact_id=eva.rowid, related_contact_id=ana.rowid,
+                                            relationship_type_id=friend.id))
+            session.commit()
+            self.ana_id, self.luis_id, self.eva_id = ana.rowid, luis.rowid, eva.rowid
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def count_selects(self, call):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append(statement)
+
+        event.listen(self.engine, "before_cursor_execute", capture)
+        try:
+            result = call()
+        finally:
+            event.remove(self.engine, "before_cursor_execute", capture)
+        return result, len(statements)
+
+    def test_profile_loads_in_bounded_queries(self):
+        profile, selects = self.count_selects(lambda: ContactRepository.get_profile(self.ana_id))
+        self.assertIsInstance(profile, ContactProfile)
+        # Contacto + una consulta por colección, sin importar cuántos elementos tenga
+        self.assertLessEqual(selects, 6)
+
+    def test_profile_is_usable_after_session_closes(self):
+        profile = ContactRepository.get_profile(self.ana_id)
+        _, selects = self.count_selects(lambda: (
+            profile.full_name,
+            [t.name for t in profile.tags],
+            [h.name for h in profile.hobbies],
+            [e.title for e in profile.events],
+            [r.full_name for r in profile.relationships],
+        ))
+        self.assertEqual(selects, 0)
+        self.assertEqual(profile.full_name, "Ana Pérez")
+        self.assertEqual(profile.phone_1, "04140000001")
+        self.assertEqual(sorted(t.name for t in profile.tags), ["Etiqueta 0", "Etiqueta 1", "Etiqueta 2"])
+        self.assertEqual(len(profile.hobbies), 2)
+        self.assertEqual([e.title for e in profile.events], ["Cumpleaños"])
+
+    def test_profile_includes_both_relationship_directions(self):
+        profile = ContactRepository.get_profile(self.ana_id)
+        related = {(r.contact_id, r.full_name, r.relationship_type) for r in profile.relationships}
+        self.assertEqual(related, {
+            (self.luis_id, "Luis Gómez", "Esposo/a"),
+            (self.eva_id, "Eva Ruiz", "Amigo/a"),
+        })
+
+    def test_missing_contact_returns_none(self):
+        self.assertIsNone(ContactRepository.get_profile(999999))
+
+    def test_profile_is_read_only(self):
+        profile = ContactRepository.get_profile(self.ana_id)
+        with self.assertRaises(AttributeError):
+            profile.unknown_field
+        with self.assertRaises(TypeError):
+            profile._fields["first_name"] = "Otra"
+
+if __name__ == '__main__':
+    unittest.main()
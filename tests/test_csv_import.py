@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+import tempfile
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact, ContactStatus
+from src.database.migrations import migrate_from_csv
+
+class TestCsvImport(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmpdir.name, "contacts.csv")
+
+        # Formato de exportación de Google Contacts (columnas no usadas incluidas)
+        pd.DataFrame({
+            'First Name': ['Ana', 'Luis', 'Ana', 'Pedro', '', 'Carla', 'Marta'],
+            'Middle Name': ['Maria', '', '', '', '', '', ''],
+            'Last Name': ['García', 'Rodríguez', 'García', 'Pérez', 'Sin Nombre', 'Ruiz', 'Díaz'],
+            'Labels': ['* myContacts'] * 7,
+            'Phone 1 - Value': ['0414-1111111', '04242222222', '', '', '', '', ''],
+            'Phone 3 - Value': ['', '', '', '', '', '', '+58 412 3333333'],
+            'Phone 5 - Value': ['', '', '', '', '', '', '0416-5555555'],
+            'E-mail 3 - Value': ['', 'luis@test.com', '', '', '', '', ''],
+            'Address 1 - City': ['Valencia', '', '', '', '', '', ''],
+            'Address 1 - Region': ['Carabobo', '', '', '', '', '', ''],
+            'Address 2 - Country': ['', '', '', '', '', 'España', ''],
+        }).to_csv(self.csv_path, index=False)
+
+        self.session.add(Contact(first_name="Pedro", last_name="Pérez"))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.tmpdir.cleanup()
+
+    def test_import_maps_columns_and_skips_duplicates(self):
+        progress = []
+        added = migrate_from_csv(self.session, csv_path=self.csv_path, chunksize=2,
+                                 progress_callback=lambda done, new: progress.append((done, new)))
+
+        # Ana repetida en otro lote, Pedro ya existente y la fila sin nombre se omiten
+        self.assertEqual(added, 4)
+        self.assertEqual(progress, [(2, 2), (4, 2), (6, 3), (7, 4)])
+
+        contacts = {c.first_name: c for c in self.session.query(Contact).all()}
+        self.assertEqual(len(contacts), 5)
+        self.assertEqual(contacts["Ana"].middle_name, "Maria")
+        self.assertEqual(contacts["Ana"].phone_1, "0414-1111111")
+        self.assertEqual(contacts["Ana"].city, "Valencia")
+        self.assertEqual(contacts["Ana"].state, "Carabobo")
+        self.assertEqual(contacts["Luis"].phone_1, "04242222222")
+        self.assertEqual(contacts["Luis"].email_3, "luis@test.com")
+        self.assertEqual(contacts["Carla"].country_2, "España")
+        self.assertEqual(contacts["Marta"].phone_3, "+58 412 3333333")
+        self.assertEqual(contacts["Marta"].phone_5, "0416-5555555")
+        self.assertEqual(contacts["Luis"].status, ContactStatus.ACTIVE)
+        self.assertIs(contacts["Luis"].is_phone_verified, False)
+
+        # El índice de búsqueda se reconstruye y su trigger de inserción vuelve a existir
+        matches = self.session.execute(
+            text("SELECT COUNT(*) FROM contacts_fts WHERE contacts_fts MATCH '\"0416\"*'")
+        ).scalar()
+        self.assertEqual(matches, 1)
+        self.session.add(Contact(first_name="Nueva", last_name="Persona"))
+        self.session.commit()
+        matches = self.session.execute(
+            text("SELECT COUNT(*) FROM contacts_fts WHERE contacts_fts MATCH 'nueva'")
+        ).scalar()
+        self.assertEqual(matches, 1)
+
+    def test_failed_import_restores_search_index(self):
+        def fail_after_first_chunk(done, new):
+            raise RuntimeError("fallo a mitad de la importación")
+
+        with self.assertRaises(RuntimeError):
+            migrate_from_csv(self.session, csv_path=self.csv_path, chunksize=2,
+                             progress_callback=fail_after_first_chunk)
+
+        # Nada se importó y los contactos creados después siguen llegando al índice
+        self.assertEqual(self.session.query(Contact).count(), 1)
+        self.session.add(Contact(first_name="Nueva", last_name="Persona"))
+        self.session.commit()
+        matches = self.session.execute(
+            text("SELECT COUNT(*) FROM contacts_fts WHERE contacts_fts MATCH 'nueva'")
+        ).scalar()
+        self.assertEqual(matches, 1)
+        triggers = self.session.execute(
+            text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_ai'")
+        ).scalar()
+        self.assertEqual(triggers, 2)
+
+    def test_missing_file_is_skipped(self):
+        self.assertEqual(migrate_from_csv(self.session, csv_path=os.path.join(self.tmpdir.name, "no.csv")), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config.settings import settings
+from src.database.connection import get_engine, get_pragma_report, _pragma_statements
+from src.database.repositories import ContactRepository, ContactCountCache
+from src.models.base import Base
+from src.models.contact import Contact
+from src.models.relationship import ContactRelationship, RelationshipType
+from src.models.hobby import Hobby, ContactHobby
+from src.models.event import ImportantEvent
+
+class TestEngineProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = get_engine(os.path.join(self.tmpdir.name, "profile.db"))
+        Base.metadata.create_all(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_pragmas_are_applied_on_connect(self):
+        report = get_pragma_report(self.engine)
+        self.assertEqual(report["journal_mode"].upper(), "WAL")
+        self.assertEqual(report["synchronous"], 1)  # NORMAL
+        self.assertEqual(report["foreign_keys"], 1)
+        self.assertEqual(report["busy_timeout"], settings.SQLITE_BUSY_TIMEOUT_MS)
+        self.assertEqual(report["cache_size"], settings.SQLITE_CACHE_SIZE)
+        self.assertEqual(report["temp_store"], 2)  # MEMORY
+
+    def test_invalid_profile_values_are_rejected(self):
+        with self.assertRaises(ValueError):
+            _pragma_statements([("journal_mode", "WAL; DROP TABLE contacts")])
+        with self.assertRaises(ValueError):
+            _pragma_statements([("cache_size", "1; DROP TABLE contacts")])
+
+    def test_concurrent_reader_and_writer(self):
+        # En WAL un lector no bloquea al hilo que escribe
+        errors = []
+
+        def writer():
+            try:
+                for i in range(50):
+                    with Session(self.engine) as session:
+                        session.add(Contact(first_name=f"W{i}", last_name="Hilo"))
+                        session.commit()
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        for _ in range(50):
+            with Session(self.engine) as session:
+                session.query(Contact).count()
+        thread.join()
+        self.assertEqual(errors, [])
+
+    def test_delete_contact_with_dependents_under_foreign_keys(self):
+        with Session(self.engine) as session:
+            juan = Contact(first_name="Juan", last_name="Perez")
+            maria = Contact(first_name="Maria", last_name="Gomez")
+            hobby = Hobby(name="Ajedrez")
+            rel_type = RelationshipType(name="Esposa")
+            session.add_all([juan, maria, hobby, rel_type])
+            session.flush()
+            session.add_all([
+                ContactHobby(contact_id=maria.rowid, hobby_id=hobby.id),
+                ImportantEvent(contact_id=maria.rowid, title="Cumpleaños"),
+                ContactRelationship(contact_id=juan.rowid, related_contact_id=maria.rowid,
+                                    relationship_type_id=rel_type.id),
+            ])
+            session.commit()
+            maria_id = maria.rowid
+
+        with patch('src.database.repositories.engine', self.engine):
+            ContactCountCache.invalidate()
+            self.assertTrue(ContactRepository.delete(maria_id))
+
+        with Session(self.engine) as session:
+            self.assertEqual(session.query(ContactRelationship).count(), 0)
+            self.assertEqual(session.query(ContactHobby).count(), 0)
+            self.assertEqual(session.query(ImportantEvent).count(), 0)
+            self.assertEqual(session.query(Contact).count(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
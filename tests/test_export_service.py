@@ -0,0 +1,130 @@
+import unittest
+import sys
+import os
+import csv
+import shutil
+import tempfile
+import importlib.util
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact, ContactStatus
+from src.models.tag import TagType, ContactTag
+from src.database.repositories import ContactRepository, ContactCountCache
+from src.services.export_service import ExportService
+
+HAS_OPENPYXL = importlib.util.find_spec("openpyxl") is not None
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+class TestExportService(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.patcher = patch('src.database.repositories.engine', self.engine)
+        self.patcher.start()
+        ContactCountCache.invalidate()
+        self.tmpdir = tempfile.mkdtemp()
+
+        with Session(self.engine) as session:
+            contacts = [Contact(first_name=f"Nombre{i:03d}", last_name="Pérez",
+                                phone_1=f"0414{i:07d}" if i % 2 else None,
+                                status=ContactStatus.ACTIVE)
+                        for i in range(250)]
+            tags = [TagType(name="Zeta"), TagType(name="Alfa")]
+            session.add_all(contacts + tags)
+            session.flush()
+            for contact in contacts[:10]:
+                session.add_all([ContactTag(contact_id=contact.rowid, tag_type_id=t.id) for t in tags])
+            session.commit()
+            self.alfa_id = tags[1].id
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def read_csv(self, path):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return list(csv.reader(f))
+
+    def test_csv_export_with_selected_columns_and_tags(self):
+        path = self.path("segmento.csv")
+        rows = ExportService.export(path, columns=["first_name", "phone_1", "status", "tags"])
+        self.assertEqual(rows, 250)
+        lines = self.read_csv(path)
+        self.assertEqual(lines[0], ["first_name", "phone_1", "status", "tags"])
+        self.assertEqual(len(lines), 251)
+        # Etiquetas agregadas y ordenadas en SQL; estado con su valor guardado
+        self.assertEqual(lines[1], ["Nombre000", "", "Activo", "Alfa, Zeta"])
+        self.assertEqual(lines[-1][3], "")
+        self.assertFalse(os.path.exists(path + ".part"))
+
+    def test_export_applies_filters(self):
+        path = self.path("filtrado.csv")
+        rows = ExportService.export(path, columns=["first_name"], tag_ids=[self.alfa_id], missing_phone=True)
+        self.assertEqual(rows, 5)
+        self.assertEqual([line[0] for line in self.read_csv(path)[1:]],
+                         [f"Nombre{i:03d}" for i in range(0, 10, 2)])
+
+    def test_batches_are_streamed(self):
+        progress = []
+        ExportService.export(self.path("lotes.csv"), progress_callback=progress.append)
+        batches = list(ContactRepository.iter_export_batches(["first_name"], batch_size=100))
+        self.assertEqual([len(batch) for batch in batches], [100, 100, 50])
+        self.assertEqual(progress[-1], 250)
+
+    def test_available_columns_can_all_be_exported(self):
+        available = ExportService.available_columns()
+        names = [name for name, _ in available]
+        self.assertEqual([name for name, default in available if default],
+                         [name for name in names if name in ContactRepository.export_columns()])
+        self.assertIn("tags", names)
+        self.assertNotIn("rowid", names)
+        rows = ExportService.export(self.path("todas.csv"), columns=names)
+        self.assertEqual(rows, 250)
+        self.assertEqual(self.read_csv(self.path("todas.csv"))[0], names)
+
+    def test_invalid_columns_and_formats_are_rejected(self):
+        with self.assertRaises(ValueError):
+            ExportService.export(self.path("x.csv"), columns=["first_name", "password"])
+        with self.assertRaises(ValueError):
+            ExportService.export(self.path("x.json"))
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    @unittest.skipUnless(HAS_OPENPYXL, "openpyxl no instalado")
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+        path = self.path("segmento.xlsx")
+        self.assertEqual(ExportService.export(path, columns=["first_name", "tags"]), 250)
+        sheet = load_workbook(path, read_only=True).active
+        values = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(values[0], ("first_name", "tags"))
+        self.assertEqual(values[1], ("Nombre000", "Alfa, Zeta"))
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow no instalado")
+    def test_parquet_export(self):
+        import pyarrow.parquet as pq
+        path = self.path("segmento.parquet")
+        ExportService.export(path, columns=["rowid", "first_name", "is_phone_verified", "tags"])
+        table = pq.read_table(path)
+        self.assertEqual(table.num_rows, 250)
+        self.assertEqual(str(table.schema.field("rowid").type), "int64")
+        self.assertEqual(str(table.schema.field("is_phone_verified").type), "bool")
+        self.assertEqual(table.column("tags")[0].as_py(), "Alfa, Zeta")
+
+if __name__ == '__main__':
+    unittest.main()
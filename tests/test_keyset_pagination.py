@@ -0,0 +1,143 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact
+from src.database.repositories import ContactRepository, ContactCountCache
+from src.database.pagination import InvalidCursorError
+
+class TestKeysetPagination(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.patcher = patch('src.database.repositories.engine', self.engine)
+        self.patcher.start()
+        ContactCountCache.invalidate()
+
+        # Nombres repetidos para forzar el desempate por apellido y rowid
+        with Session(self.engine) as session:
+            for i in range(23):
+                session.add(Contact(first_name=f"Nombre{i % 5}", last_name=f"Apellido{i % 2}",
+                                    notes="cliente" if i % 3 == 0 else ""))
+            session.commit()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def walk_forward(self, query=None, limit=5):
+        pages = []
+        page = ContactRepository.get_page(limit=limit, query=query)
+        pages.append(page)
+        while page.has_next:
+            page = ContactRepository.get_page(limit=limit, query=query, after=page.next_cursor)
+            pages.append(page)
+        return pages
+
+    def test_forward_walk_matches_full_order(self):
+        pages = self.walk_forward()
+        ids = [c.rowid for p in pages for c in p]
+        with Session(self.engine) as session:
+            expected = [c.rowid for c in session.query(Contact).order_by(
+                Contact.first_name, Contact.last_name, Contact.rowid)]
+        self.assertEqual(ids, expected)
+        self.assertFalse(pages[0].has_prev)
+        self.assertTrue(pages[-1].has_prev)
+        self.assertEqual(len(pages), 5)
+
+    def test_backward_navigation_returns_previous_pages(self):
+        pages = self.walk_forward()
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = ContactRepository.get_page(limit=5, before=page.prev_cursor)
+            self.assertEqual([c.rowid for c in page], [c.rowid for c in expected])
+            self.assertTrue(page.has_next)
+        self.assertFalse(page.has_prev)
+
+    def test_search_pages_cover_all_matches(self):
+        pages = self.walk_forward(query="cliente", limit=3)
+        ids = [c.rowid for p in pages for c in p]
+        self.assertEqual(len(ids), 8)
+        self.assertEqual(len(set(ids)), 8)
+
+        back = ContactRepository.get_page(limit=3, query="cliente", before=pages[-1].prev_cursor)
+        self.assertEqual([c.rowid for c in back], [c.rowid for c in pages[-2]])
+
+    def test_deep_page_does_not_use_offset(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, stmt, params, *args: statements.append((stmt, params)))
+        page = self.walk_forward()[-2]
+        ContactRepository.get_page(limit=5, after=page.next_cursor)
+        # SQLite siempre emite "LIMIT ? OFFSET ?"; el desplazamiento debe ser 0
+        offsets = [params[-1] for stmt, params in statements if "OFFSET" in stmt.upper()]
+        self.assertTrue(offsets)
+        self.assertEqual(set(offsets), {0})
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursorError):
+            ContactRepository.get_page(limit=5, after="no-es-un-cursor")
+        # Un cursor de búsqueda no sirve para el listado sin filtro
+        search_page = ContactRepository.get_page(limit=3, query="cliente")
+        with self.assertRaises(InvalidCursorError):
+            ContactRepository.get_page(limit=3, after=search_page.next_cursor)
+
+class TestPageWithCount(TestKeysetPagination):
+    """Página + total en una sola sentencia, con caché de conteos"""
+
+    def setUp(self):
+        super().setUp()
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, stmt, *args: self.statements.append(stmt))
+
+    def test_first_page_and_total_in_one_statement(self):
+        page = ContactRepository.get_page_with_count(limit=5)
+        self.assertEqual(page.total, 23)
+        self.assertEqual(len(page), 5)
+        self.assertEqual(len(self.statements), 1)
+
+        page = ContactRepository.get_page_with_count(limit=3, query="Cliente")
+        self.assertEqual(page.total, 8)
+        self.assertEqual(len(self.statements), 2)
+
+    def test_cached_total_is_reused_and_invalidated_on_write(self):
+        first = ContactRepository.get_page_with_count(limit=5, query="cliente")
+        self.statements.clear()
+        second = ContactRepository.get_page_with_count(limit=5, query="  CLIENTE ", after=first.next_cursor)
+        self.assertEqual(second.total, 8)
+        self.assertEqual(len(self.statements), 1)
+        self.assertNotIn("count(", self.statements[0].lower())
+        self.assertEqual(ContactRepository.count_all(query="cliente"), 8)
+        self.assertEqual(len(self.statements), 1)
+
+        ContactRepository.create({"first_name": "Nuevo", "last_name": "Cliente"})
+        page = ContactRepository.get_page_with_count(limit=5, query="cliente", after=first.next_cursor)
+        self.assertEqual(page.total, 9)
+
+    def test_total_for_empty_results(self):
+        self.assertEqual(ContactRepository.get_page_with_count(limit=5, query="zzz").total, 0)
+        self.assertEqual(ContactRepository.get_page_with_count(limit=5, query="%%").total, 0)
+        self.assertEqual(ContactRepository.count_all(query="%%"), 0)
+        self.assertEqual(ContactRepository.count_all(query="  "), 23)
+
+        last = ContactRepository.get_page(limit=30)
+        page = ContactRepository.get_page_with_count(limit=5, after=last.next_cursor)
+        self.assertEqual(len(page), 0)
+        self.assertEqual(page.total, 23)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -35,6 +35,10 @@ class TestPhoneNormalization(unittest.TestCase):
         # Caso: +580414... -> +58414...
         self.assertEqual(PhoneNormalizationService.normalize("+5804143416986"), "+584143416986")
 
+    def test_country_code_without_plus(self):
+        # Caso: 584143416986 -> +584143416986
+        self.assertEqual(PhoneNormalizationService.normalize("584143416986"), "+584143416986")
+
     def test_landline(self):
         # Caso: 02121234567 -> +582121234567
         self.assertEqual(PhoneNormalizationService.normalize("02121234567"), "+582121234567")
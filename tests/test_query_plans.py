@@ -0,0 +1,127 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact
+from src.models.tag import TagType, ContactTag
+from src.models.hobby import Hobby, ContactHobby
+from src.models.relationship import RelationshipType, ContactRelationship
+from src.models.event import ImportantEvent
+from src.database.repositories import (
+    ContactRepository, TagRepository, HobbyRepository, EventRepository,
+    RelationshipRepository, ContactCountCache
+)
+
+ASSOCIATION_TABLES = ("contact_tags", "contact_hobbies", "contact_relationships", "important_events")
+
+class TestQueryPlans(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.patcher = patch('src.database.repositories.engine', self.engine)
+        self.patcher.start()
+        ContactCountCache.invalidate()
+
+        # Volumen suficiente para que ANALYZE refleje tablas de asociación reales
+        with Session(self.engine) as session:
+            contacts = [Contact(first_name=f"C{i}", last_name="Plan") for i in range(200)]
+            tags = [TagType(name=f"Etiqueta {i}") for i in range(10)]
+            hobbies = [Hobby(name=f"Hobby {i}") for i in range(10)]
+            rel_type = RelationshipType(name="Esposa")
+            session.add_all(contacts + tags + hobbies + [rel_type])
+            session.flush()
+            for i, contact in enumerate(contacts):
+                session.add_all([
+                    ContactTag(contact_id=contact.rowid, tag_type_id=tags[i % 10].id),
+                    ContactTag(contact_id=contact.rowid, tag_type_id=tags[(i + 1) % 10].id),
+                    ContactHobby(contact_id=contact.rowid, hobby_id=hobbies[i % 10].id),
+                    ImportantEvent(contact_id=contact.rowid, title="Cumpleaños"),
+                    ContactRelationship(contact_id=contact.rowid,
+                                        related_contact_id=contacts[(i + 1) % 200].rowid,
+                                        relationship_type_id=rel_type.id),
+                ])
+            session.commit()
+            self.contact_id = contacts[1].rowid
+            self.tag_id = tags[1].id
+        with self.engine.begin() as connection:
+            connection.execute(text("ANALYZE"))
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def capture_plans(self, call):
+        """Ejecuta la llamada y devuelve el plan de cada SELECT emitido"""
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append((statement, parameters))
+
+        event.listen(self.engine, "before_cursor_execute", capture)
+        try:
+            call()
+        finally:
+            event.remove(self.engine, "before_cursor_execute", capture)
+
+        plans = []
+        with self.engine.connect() as connection:
+            raw = connection.connection.dbapi_connection
+            for statement, parameters in statements:
+                rows = raw.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                plans.append(" | ".join(row[-1] for row in rows))
+        self.assertTrue(plans)
+        return " || ".join(plans)
+
+    def assert_no_full_scan(self, plan):
+        for table_name in ASSOCIATION_TABLES:
+            self.assertNotRegex(plan, rf"SCAN {table_name}(?! USING)")
+
+    def test_tags_by_contact_uses_index(self):
+        plan = self.capture_plans(lambda: TagRepository.get_by_contact_id(self.contact_id))
+        self.assertIn("uq_contact_tags_contact_tag", plan)
+        self.assert_no_full_scan(plan)
+
+    def test_contacts_by_tag_uses_index(self):
+        plan = self.capture_plans(lambda: ContactRepository.get_by_tag("Etiqueta 3"))
+        self.assertIn("ix_contact_tags_tag_contact", plan)
+        self.assert_no_full_scan(plan)
+
+    def test_hobbies_by_contact_uses_index(self):
+        plan = self.capture_plans(lambda: HobbyRepository.get_by_contact_id(self.contact_id))
+        self.assertIn("uq_contact_hobbies_contact_hobby", plan)
+        self.assert_no_full_scan(plan)
+
+    def test_events_by_contact_uses_index(self):
+        plan = self.capture_plans(lambda: EventRepository.get_by_contact_id(self.contact_id))
+        self.assertIn("ix_important_events_contact", plan)
+        self.assert_no_full_scan(plan)
+
+    def test_relationships_by_contact_use_both_directions(self):
+        plan = self.capture_plans(lambda: RelationshipRepository.get_by_contact_id(self.contact_id))
+        self.assertIn("ix_contact_relationships_contact", plan)
+        self.assertIn("ix_contact_relationships_related", plan)
+        self.assert_no_full_scan(plan)
+
+    def test_duplicate_tag_link_is_rejected(self):
+        with Session(self.engine) as session:
+            session.add(ContactTag(contact_id=self.contact_id, tag_type_id=self.tag_id))
+            with self.assertRaises(IntegrityError):
+                session.commit()
+
+if __name__ == '__main__':
+    unittest.main()
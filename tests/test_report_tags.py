@@ -0,0 +1,140 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact
+from src.models.tag import TagType, ContactTag
+from src.database.bulk import BULK_CHUNK_SIZE
+from src.database.reports import ReportRow
+from src.database.repositories import ContactRepository, TagRepository, ContactCountCache
+
+class TestReportTags(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.patcher = patch('src.database.repositories.engine', self.engine)
+        self.patcher.start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            contacts = [Contact(first_name=f"C{i}", last_name="Reporte",
+                                phone_1=f"0414{i:07d}" if i % 3 else "")
+                        for i in range(1200)]
+            self.tags = [TagType(name="Cliente"), TagType(name="Amigo")]
+            session.add_all(contacts + self.tags)
+            session.flush()
+            # Pares: Cliente; múltiplos de 4: también Amigo; impares: sin etiquetas
+            for contact in contacts[::2]:
+                session.add(ContactTag(contact_id=contact.rowid, tag_type_id=self.tags[0].id))
+            for contact in contacts[::4]:
+                session.add(ContactTag(contact_id=contact.rowid, tag_type_id=self.tags[1].id))
+            session.commit()
+            self.contact_ids = [c.rowid for c in contacts]
+            self.cliente_id, self.amigo_id = self.tags[0].id, self.tags[1].id
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def count_selects(self, call):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append(statement)
+
+        event.listen(self.engine, "before_cursor_execute", capture)
+        try:
+            result = call()
+        finally:
+            event.remove(self.engine, "before_cursor_execute", capture)
+        return result, len(statements)
+
+    def test_get_by_contact_ids_groups_tags(self):
+        ids = self.contact_ids[:8] + [999999]
+        tags_by_contact, selects = self.count_selects(lambda: TagRepository.get_by_contact_ids(ids))
+        self.assertEqual(selects, 1)
+        self.assertEqual([t.name for t in tags_by_contact[self.contact_ids[0]]], ["Amigo", "Cliente"])
+        self.assertEqual([t.name for t in tags_by_contact[self.contact_ids[2]]], ["Cliente"])
+        self.assertNotIn(self.contact_ids[1], tags_by_contact)
+        self.assertNotIn(999999, tags_by_contact)
+
+    def test_get_by_contact_ids_is_chunked(self):
+        tags_by_contact, selects = self.count_selects(
+            lambda: TagRepository.get_by_contact_ids(self.contact_ids)
+        )
+        self.assertEqual(selects, -(-len(self.contact_ids) // BULK_CHUNK_SIZE))
+        self.assertEqual(len(tags_by_contact), len(self.contact_ids) // 2)
+
+    def test_get_filtered_with_tags_uses_two_queries(self):
+        contacts, selects = self.count_selects(
+            lambda: ContactRepository.get_filtered(with_tags=True)
+        )
+        self.assertEqual(len(contacts), len(self.contact_ids))
+        self.assertEqual(selects, 2)
+
+        # Las etiquetas quedan cargadas y se pueden leer sin sesión
+        tags = {c.rowid: [t.name for t in c.tags] for c in contacts}
+        self.assertEqual(tags[self.contact_ids[0]], ["Amigo", "Cliente"])
+        self.assertEqual(tags[self.contact_ids[1]], [])
+
+    def test_get_filtered_with_tags_respects_filters(self):
+        contacts = ContactRepository.get_filtered(tag_ids=[self.amigo_id], missing_phone=True, with_tags=True)
+        # Múltiplos de 4 que además son múltiplos de 3
+        expected = {self.contact_ids[i] for i in range(0, len(self.contact_ids), 12)}
+        self.assertEqual({c.rowid for c in contacts}, expected)
+        for contact in contacts:
+            # Se cargan todas sus etiquetas, no solo la del filtro
+            self.assertEqual([t.name for t in contact.tags], ["Amigo", "Cliente"])
+
+    def test_iter_report_rows_streams_sorted_batches(self):
+        rows = ContactRepository.iter_report_rows(batch_size=100)
+        first = next(rows)
+        self.assertIsInstance(first, ReportRow)
+        rows.close()
+
+        rows, selects = self.count_selects(lambda: list(ContactRepository.iter_report_rows(batch_size=100)))
+        self.assertEqual(len(rows), len(self.contact_ids))
+        self.assertEqual(rows, sorted(rows, key=lambda r: r.sort_key))
+        # Una consulta de contactos más una de etiquetas por lote
+        self.assertEqual(selects, 1 + len(self.contact_ids) // 100)
+        by_id = {r.rowid: r for r in rows}
+        self.assertEqual(by_id[self.contact_ids[0]].tags, ("Amigo", "Cliente"))
+        self.assertEqual(by_id[self.contact_ids[1]].tags, ())
+
+    def test_report_pages_walk_all_rows_once(self):
+        filters = {"tag_ids": [self.cliente_id]}
+        total = ContactRepository.count_filtered(**filters)
+        self.assertEqual(total, len(self.contact_ids) // 2)
+
+        seen, starts = [], [None]
+        while True:
+            page = ContactRepository.get_report_page(50, starts[-1], **filters)
+            self.assertLessEqual(len(page), 50)
+            self.assertEqual(page.has_prev, starts[-1] is not None)
+            seen.extend(row.rowid for row in page)
+            if not page.has_next:
+                break
+            starts.append(page.next_cursor)
+        self.assertEqual(len(seen), total)
+        self.assertEqual(len(set(seen)), total)
+
+        # Volver a una página anterior con su cursor de inicio da las mismas filas
+        second = ContactRepository.get_report_page(50, starts[1], **filters)
+        self.assertEqual([row.rowid for row in second], seen[50:100])
+
+if __name__ == '__main__':
+    unittest.main()
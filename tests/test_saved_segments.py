@@ -0,0 +1,156 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+from sqlalchemy import create_engine, event, select, func
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact
+from src.models.tag import TagType
+from src.models.segment import SavedSegment, SegmentMember
+from src.database.segments import Segment
+from src.database.repositories import ContactRepository, TagRepository, SegmentRepository, ContactCountCache
+from src.services.campaign_service import CampaignService
+
+class TestSavedSegments(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.patcher = patch('src.database.repositories.engine', self.engine)
+        self.patcher.start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            self.cliente = TagType(name="Cliente")
+            self.amigo = TagType(name="Amigo")
+            session.add_all([self.cliente, self.amigo])
+            session.add_all([Contact(first_name=f"C{i}", last_name="Seg", phone_1=f"04{i}") for i in range(10)])
+            session.commit()
+            self.cliente_id, self.amigo_id = self.cliente.id, self.amigo.id
+            self.ids = list(session.scalars(select(Contact.rowid).order_by(Contact.rowid)))
+
+        TagRepository.bulk_add_tag(self.ids[:4], self.cliente_id)
+        self.saved = SegmentRepository.create("Clientes con teléfono", Segment(tags_any=["Cliente"], missing_phone=False))
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def assertMembersMatchCriteria(self, segment_id):
+        """La pertenencia materializada coincide con evaluar los criterios desde cero"""
+        saved = SegmentRepository.get_by_id(segment_id)
+        expected = ContactRepository.get_segment_ids(Segment.from_json(saved.criteria))
+        self.assertEqual(SegmentRepository.get_member_ids(segment_id), expected)
+        self.assertEqual(saved.member_count, len(expected))
+
+    def test_create_materializes_membership(self):
+        self.assertEqual(self.saved.member_count, 4)
+        self.assertEqual(SegmentRepository.get_member_ids(self.saved.id), self.ids[:4])
+        self.assertMembersMatchCriteria(self.saved.id)
+
+    def test_tag_writes_update_membership(self):
+        TagRepository.bulk_add_tag(self.ids[4:7], self.cliente_id)
+        self.assertEqual(SegmentRepository.count(self.saved.id), 7)
+        TagRepository.bulk_remove_tag(self.ids[:2], self.cliente_id)
+        self.assertEqual(SegmentRepository.count(self.saved.id), 5)
+        TagRepository.bulk_replace_tags(self.ids[2:4], [self.amigo_id])
+        self.assertEqual(SegmentRepository.count(self.saved.id), 3)
+        self.assertMembersMatchCriteria(self.saved.id)
+
+    def test_contact_writes_update_membership(self):
+        segment = SegmentRepository.create("Sin teléfono", Segment(missing_phone=True))
+        self.assertEqual(segment.member_count, 0)
+
+        ContactRepository.update(self.ids[0], {"phone_1": ""})
+        ContactRepository.bulk_update(self.ids[1:3], {"phone_1": None})
+        ContactRepository.bulk_update_mapping([{"rowid": self.ids[3], "phone_1": ""}])
+        new = ContactRepository.create({"first_name": "Nuevo", "last_name": "Seg"})
+        self.assertEqual(SegmentRepository.count(segment.id), 5)
+
+        ContactRepository.delete(new.rowid)
+        ContactRepository.update(self.ids[0], {"phone_1": "0414"})
+        self.assertEqual(SegmentRepository.count(segment.id), 3)
+        for saved in SegmentRepository.get_all():
+            self.assertMembersMatchCriteria(saved.id)
+
+    def test_incremental_update_only_touches_changed_contacts(self):
+        statements = []
+
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            if "segment_members" in statement:
+                statements.append(parameters)
+
+        event.listen(self.engine, "before_cursor_execute", listener)
+        try:
+            TagRepository.bulk_add_tag([self.ids[5]], self.cliente_id)
+        finally:
+            event.remove(self.engine, "before_cursor_execute", listener)
+        # Un DELETE y un INSERT acotados al contacto modificado, sin reconstruir el segmento
+        self.assertEqual(len(statements), 2)
+        self.assertTrue(all(self.ids[5] in parameters for parameters in statements))
+        self.assertEqual(SegmentRepository.count(self.saved.id), 5)
+
+    def test_refresh_stays_under_sqlite_parameter_limit(self):
+        with Session(self.engine) as session:
+            session.add_all([Contact(first_name=f"M{i}", last_name="Seg", phone_1="0414") for i in range(1200)])
+            session.commit()
+            many = list(session.scalars(select(Contact.rowid)))
+        TagRepository.bulk_add_tag(many[:700], self.cliente_id)
+
+        parameters = []
+
+        def listener(conn, cursor, statement, params, context, executemany):
+            if "segment_members" in statement and not executemany:
+                parameters.append(len(params))
+
+        event.listen(self.engine, "before_cursor_execute", listener)
+        try:
+            with Session(self.engine) as session:
+                SegmentRepository.refresh_contacts(session, many)
+                session.commit()
+        finally:
+            event.remove(self.engine, "before_cursor_execute", listener)
+
+        self.assertLessEqual(max(parameters), 999)
+        self.assertMembersMatchCriteria(self.saved.id)
+
+    def test_date_relative_segments_are_rebuilt_daily(self):
+        segment = SegmentRepository.create("Sin contacto reciente", Segment(last_contact_older_than=30))
+        self.assertEqual(segment.member_count, 10)
+        with Session(self.engine) as session:
+            session.execute(SavedSegment.__table__.update().values(refreshed_on="2000-01-01"))
+            session.execute(Contact.__table__.update().where(Contact.rowid == self.ids[0]).values(
+                last_contact_date="2999-01-01"
+            ))
+            session.commit()
+        self.assertEqual(SegmentRepository.count(segment.id), 9)
+        # Los segmentos que no dependen de la fecha no se recalculan al leerlos
+        self.assertEqual(SegmentRepository.get_by_id(self.saved.id).refreshed_on, "2000-01-01")
+
+    def test_update_and_delete(self):
+        SegmentRepository.update(self.saved.id, name="Clientes", segment=Segment(tags_any=["Amigo"]))
+        saved = SegmentRepository.get_by_id(self.saved.id)
+        self.assertEqual((saved.name, saved.member_count), ("Clientes", 0))
+        self.assertTrue(SegmentRepository.delete(self.saved.id))
+        with Session(self.engine) as session:
+            self.assertEqual(session.scalar(select(func.count()).select_from(SegmentMember)), 0)
+        with self.assertRaises(ValueError):
+            SegmentRepository.create("Anidado", Segment(member_of=1))
+
+    def test_campaign_targets_saved_segment_by_id(self):
+        recipients = CampaignService.get_recipients(self.saved.id)
+        self.assertEqual(sorted(c.rowid for c in recipients), self.ids[:4])
+        self.assertEqual(CampaignService.recipients_segment(self.saved.id), Segment(member_of=self.saved.id))
+
+if __name__ == '__main__':
+    unittest.main()
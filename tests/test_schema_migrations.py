@@ -0,0 +1,149 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import patch
+import pandas as pd
+from sqlalchemy import event, inspect, text
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config.settings import settings
+from src.database.connection import get_engine, REPORTED_PRAGMAS
+from src.database.migrations import (
+    initialize_database_and_migrate, apply_schema_migrations, get_schema_version, _run_migration,
+    SCHEMA_MIGRATIONS, LATEST_SCHEMA_VERSION, DEFAULT_HOBBIES
+)
+
+class TestSchemaMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = get_engine(os.path.join(self.tmpdir.name, "migrations.db"))
+        self.csv_path = os.path.join(self.tmpdir.name, "contacts.csv")
+        pd.DataFrame({
+            'First Name': ['Ana', 'Luis'],
+            'Last Name': ['García', 'Rodríguez'],
+            'Phone 1 - Value': ['0414-1111111', '0424-2222222'],
+        }).to_csv(self.csv_path, index=False)
+
+        self.patchers = [
+            patch('src.database.migrations.engine', self.engine),
+            patch.object(settings, 'CSV_IMPORT_PATH', self.csv_path),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def scalar(self, sql):
+        with self.engine.connect() as connection:
+            return connection.execute(text(sql)).scalar()
+
+    def test_new_database_is_created_at_latest_version(self):
+        applied = initialize_database_and_migrate()
+        self.assertEqual(applied, [version for version, _, _ in SCHEMA_MIGRATIONS])
+
+        with self.engine.connect() as connection:
+            self.assertEqual(get_schema_version(connection), LATEST_SCHEMA_VERSION)
+        self.assertEqual(self.scalar("SELECT COUNT(*) FROM contacts"), 2)
+        self.assertEqual(self.scalar("SELECT COUNT(*) FROM hobbies"), len(DEFAULT_HOBBIES))
+        self.assertEqual(self.scalar("SELECT COUNT(*) FROM contacts_fts WHERE contacts_fts MATCH 'ana'"), 1)
+
+    def test_up_to_date_startup_reads_only_version_and_profile(self):
+        initialize_database_and_migrate()
+
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        with patch('src.database.migrations.log_debug') as log_debug:
+            self.assertEqual(initialize_database_and_migrate(), [])
+        # El perfil SQLite se informa en cada arranque, aunque no haya migraciones
+        self.assertEqual(statements, ["PRAGMA user_version"] + [f"PRAGMA {name}" for name in REPORTED_PRAGMAS])
+        self.assertIn("Perfil SQLite en vigor", log_debug.call_args.args[0])
+
+    def test_failed_step_leaves_no_partial_schema(self):
+        initialize_database_and_migrate()
+
+        def broken_step(connection):
+            connection.execute(text("CREATE TABLE half_done (id INTEGER PRIMARY KEY)"))
+            connection.execute(text("ALTER TABLE contacts ADD COLUMN half_done VARCHAR"))
+            raise RuntimeError("fallo en la migración")
+
+        with self.assertRaises(RuntimeError):
+            _run_migration(self.engine, LATEST_SCHEMA_VERSION + 1, "Rota", broken_step)
+        self.assertNotIn("half_done", inspect(self.engine).get_table_names())
+        columns = {column["name"] for column in inspect(self.engine).get_columns("contacts")}
+        self.assertNotIn("half_done", columns)
+        with self.engine.connect() as connection:
+            self.assertEqual(get_schema_version(connection), LATEST_SCHEMA_VERSION)
+
+    def test_legacy_database_is_upgraded(self):
+        # Base de datos anterior al versionado: columnas e índices ausentes y vínculos repetidos
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE contacts (rowid INTEGER PRIMARY KEY, first_name VARCHAR NOT NULL, "
+                "last_name VARCHAR NOT NULL, phone_1 VARCHAR, phone_2 VARCHAR, email_1 VARCHAR, "
+                "email_2 VARCHAR, address VARCHAR, birth_date VARCHAR, relationship VARCHAR, notes VARCHAR)"))
+            connection.execute(text(
+                "CREATE TABLE tag_types (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE, "
+                "description TEXT, is_restricted BOOLEAN)"))
+            connection.execute(text(
+                "CREATE TABLE contact_tags (id INTEGER PRIMARY KEY, contact_id INTEGER, tag_type_id INTEGER)"))
+            connection.execute(text("INSERT INTO contacts (first_name, last_name) VALUES ('Pedro', 'Pérez')"))
+            connection.execute(text("INSERT INTO tag_types (name) VALUES ('Colega')"))
+            connection.execute(text(
+                "INSERT INTO contact_tags (contact_id, tag_type_id) VALUES (1, 1), (1, 1)"))
+
+        initialize_database_and_migrate()
+
+        columns = {column["name"] for column in inspect(self.engine).get_columns("contacts")}
+        self.assertIn("phone_5", columns)
+        self.assertIn("is_phone_verified", columns)
+        self.assertEqual(self.scalar("SELECT COUNT(*) FROM contact_tags"), 1)
+        self.assertEqual(self.scalar("SELECT COUNT(*) FROM tag_types WHERE name = 'Colega'"), 1)
+        # Con contactos previos no se importa el CSV, pero sí se indexan para la búsqueda
+        self.assertEqual(self.scalar("SELECT COUNT(*) FROM contacts"), 1)
+        self.assertEqual(self.scalar("SELECT COUNT(*) FROM contacts_fts WHERE contacts_fts MATCH 'perez'"), 1)
+        self.assertEqual(apply_schema_migrations(self.engine), [])
+
+    def test_campaign_messages_keep_their_rows_when_contact_becomes_nullable(self):
+        # Cola de mensajes creada cuando contact_id era obligatorio
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE contacts (rowid INTEGER PRIMARY KEY, first_name VARCHAR NOT NULL, "
+                "last_name VARCHAR NOT NULL, phone_1 VARCHAR, phone_2 VARCHAR, email_1 VARCHAR, "
+                "email_2 VARCHAR, address VARCHAR, birth_date VARCHAR, relationship VARCHAR, notes VARCHAR)"))
+            connection.execute(text(
+                "CREATE TABLE campaigns (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, tag_filter VARCHAR, "
+                "template_a TEXT, template_b TEXT, status VARCHAR NOT NULL, created_at VARCHAR NOT NULL, "
+                "finished_at VARCHAR)"))
+            connection.execute(text(
+                "CREATE TABLE campaign_messages (id INTEGER PRIMARY KEY, "
+                "campaign_id INTEGER NOT NULL REFERENCES campaigns (id), "
+                "contact_id INTEGER NOT NULL REFERENCES contacts (rowid), recipient_name VARCHAR, "
+                "chat_id VARCHAR, session VARCHAR, text TEXT, status VARCHAR NOT NULL, attempts INTEGER NOT NULL, "
+                "last_error TEXT, created_at VARCHAR NOT NULL, updated_at VARCHAR, sent_at VARCHAR)"))
+            connection.execute(text("INSERT INTO contacts (first_name, last_name) VALUES ('Pedro', 'Pérez')"))
+            connection.execute(text(
+                "INSERT INTO campaigns (name, status, created_at) VALUES ('C', 'COMPLETED', '2024-01-01')"))
+            connection.execute(text(
+                "INSERT INTO campaign_messages (campaign_id, contact_id, recipient_name, status, attempts, "
+                "created_at, sent_at) VALUES (1, 1, 'Pedro Pérez', 'SENT', 1, '2024-01-01', '2024-01-01')"))
+
+        initialize_database_and_migrate()
+
+        columns = {column["name"]: column for column in inspect(self.engine).get_columns("campaign_messages")}
+        self.assertTrue(columns["contact_id"]["nullable"])
+        self.assertEqual(self.scalar("SELECT recipient_name FROM campaign_messages WHERE contact_id = 1"), "Pedro Pérez")
+        indexes = {index["name"] for index in inspect(self.engine).get_indexes("campaign_messages")}
+        self.assertIn("uq_campaign_messages_campaign_contact", indexes)
+        self.assertNotIn("campaign_messages_old", inspect(self.engine).get_table_names())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact
+from src.database.repositories import ContactRepository, ContactCountCache
+from src.database.search_index import build_match_expression, build_search, normalize_query, rebuild_search_index, PHONE_FTS_TABLE
+
+class TestFullTextSearch(unittest.TestCase):
+
+    def setUp(self):
+        # In-memory DB compartida entre sesiones (los repositorios abren su propia Session)
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.patcher = patch('src.database.repositories.engine', self.engine)
+        self.patcher.start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            session.add_all([
+                Contact(first_name="Alpidio", last_name="User", phone_1="04120000000"),
+                Contact(first_name="Piter", last_name="Pan", phone_1="04140000000"),
+                Contact(first_name="Carlos", last_name="Malpica", phone_1="04240000000",
+                        email_1="carlos@pintores.com"),
+                Contact(first_name="José", last_name="Pérez", phone_3="0416-555-1234"),
+                Contact(first_name="Patricia", last_name="Diaz", notes="Conocida de Piter"),
+                # Formatos del CSV importado
+                Contact(first_name="Marta", last_name="Rojas", phone_1="04241234567"),
+                Contact(first_name="Luis", last_name="Vera", phone_2="+58 414-4202222"),
+            ])
+            session.commit()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def names(self, contacts):
+        return [c.first_name for c in contacts]
+
+    def test_match_expression(self):
+        self.assertEqual(build_match_expression("ana 0414"), '"ana"* "0414"*')
+        self.assertEqual(build_match_expression('pe"rez'), '"pe"* "rez"*')
+        self.assertIsNone(build_match_expression("  -- "))
+        self.assertIsNone(build_match_expression(None))
+
+    def test_prefix_search_ranks_names_first(self):
+        results = ContactRepository.search("Pi")
+        names = self.names(results)
+        # Piter coincide en el nombre; Carlos solo en el correo y Patricia solo en notas
+        self.assertEqual(names[0], "Piter")
+        self.assertIn("Carlos", names)
+        self.assertIn("Patricia", names)
+        self.assertNotIn("Alpidio", names)
+
+    def test_search_ignores_accents_and_other_phones(self):
+        self.assertEqual(self.names(ContactRepository.search("perez")), ["José"])
+        self.assertEqual(self.names(ContactRepository.search("0416")), ["José"])
+
+    def test_phone_search_matches_any_run_of_digits(self):
+        # Tramo en medio del número
+        self.assertEqual(self.names(ContactRepository.search("1234567")), ["Marta"])
+        self.assertEqual(self.names(ContactRepository.search("555-12")), ["José"])
+        # Número con formato, buscado con o sin él
+        self.assertEqual(self.names(ContactRepository.search("4144202222")), ["Luis"])
+        self.assertEqual(self.names(ContactRepository.search("+58414")), ["Luis"])
+        self.assertEqual(self.names(ContactRepository.search("(0414) 420-2222")), ["Luis"])
+        self.assertEqual(self.names(ContactRepository.search("414 420 2222")), ["Luis"])
+        self.assertEqual(ContactRepository.count_all(query="+58 414"), 1)
+        self.assertEqual(build_search("+58 414").table, PHONE_FTS_TABLE)
+        self.assertEqual(normalize_query("+58 414"), normalize_query("58414"))
+
+    def test_phone_index_follows_updates(self):
+        contact = ContactRepository.search("1234567")[0]
+        ContactRepository.update(contact.rowid, {"phone_1": "0412-765-4321"})
+        self.assertEqual(ContactRepository.search("1234567"), [])
+        self.assertEqual(self.names(ContactRepository.search("7654321")), ["Marta"])
+        ContactRepository.delete(contact.rowid)
+        self.assertEqual(ContactRepository.search("7654321"), [])
+
+    def test_multiple_words_must_all_match(self):
+        self.assertEqual(self.names(ContactRepository.search("piter pan")), ["Piter"])
+
+    def test_paginated_and_count_use_same_filter(self):
+        self.assertEqual(ContactRepository.count_all(query="pi"), 3)
+        page = ContactRepository.get_paginated(offset=0, limit=2, query="pi")
+        self.assertEqual(len(page), 2)
+        self.assertEqual(page[0].first_name, "Piter")
+        self.assertEqual(ContactRepository.count_all(), 7)
+        self.assertEqual(ContactRepository.count_all(query="%%"), 0)
+        self.assertEqual(ContactRepository.get_paginated(query="%%"), [])
+        self.assertEqual(ContactRepository.search("%%"), [])
+
+    def test_triggers_keep_index_in_sync(self):
+        contact = ContactRepository.search("Alpidio")[0]
+        ContactRepository.update(contact.rowid, {"first_name": "Eleazar"})
+        self.assertEqual(ContactRepository.search("Alpidio"), [])
+        self.assertEqual(self.names(ContactRepository.search("Elea")), ["Eleazar"])
+
+        ContactRepository.delete(contact.rowid)
+        self.assertEqual(ContactRepository.search("Elea"), [])
+
+        # Una reconstrucción completa debe dejar el índice igual
+        with self.engine.begin() as connection:
+            rebuild_search_index(connection)
+        self.assertEqual(ContactRepository.count_all(query="pi"), 3)
+
+if __name__ == '__main__':
+    unittest.main()
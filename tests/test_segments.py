@@ -0,0 +1,214 @@
+import unittest
+import sys
+import os
+import json
+from datetime import date
+from unittest.mock import patch
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact, ContactStatus
+from src.models.tag import TagType, ContactTag
+from src.database.segments import Segment
+from src.database.repositories import ContactRepository, ContactCountCache
+
+TODAY = date(2026, 12, 28)
+
+class TestSegments(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.patcher = patch('src.database.repositories.engine', self.engine)
+        self.patcher.start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            self.tags = {name: TagType(name=name, is_restricted=(name == "No contactar"))
+                         for name in ("Cliente", "Amigo", "Proveedor", "No contactar")}
+            session.add_all(self.tags.values())
+            people = {
+                "ana": Contact(first_name="Ana", last_name="A", phone_1="0414", email_1="ana@x.com",
+                               city="Caracas", country="Venezuela", birth_date="1990-12-30",
+                               last_contact_date="2026-12-20 10:00:00", is_phone_verified=True),
+                "beto": Contact(first_name="Beto", last_name="B", phone_1="", email_1=None,
+                                city="caracas", birth_date="--01-02", last_contact_date="2026-01-15",
+                                status=ContactStatus.INACTIVE),
+                "carla": Contact(first_name="Carla", last_name="C", phone_1="0412", email_1="",
+                                 city="Madrid", country="España", birth_date="1985-06-01",
+                                 is_phone_verified=False),
+                "dani": Contact(first_name="Dani", last_name="D", phone_1="0416", email_1="d@x.com",
+                                birth_date="", last_contact_date="2026-12-01"),
+            }
+            session.add_all(people.values())
+            session.flush()
+            links = {
+                "ana": ["Cliente", "Amigo"],
+                "beto": ["Cliente", "No contactar"],
+                "carla": ["Amigo", "Proveedor"],
+                "dani": [],
+            }
+            for person, tag_names in links.items():
+                session.add_all([ContactTag(contact_id=people[person].rowid, tag_type_id=self.tags[name].id)
+                                 for name in tag_names])
+            session.commit()
+            self.ids = {person: contact.rowid for person, contact in people.items()}
+            self.tag_ids = {name: tag.id for name, tag in self.tags.items()}
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def members(self, segment):
+        with Session(self.engine) as session:
+            rowids = session.scalars(select(Contact.rowid).where(*segment.conditions(today=TODAY)))
+            names = {rowid: person for person, rowid in self.ids.items()}
+            return {names[rowid] for rowid in rowids}
+
+    def test_tag_criteria(self):
+        self.assertEqual(self.members(Segment(tags_any=["Cliente", "Proveedor"])), {"ana", "beto", "carla"})
+        self.assertEqual(self.members(Segment(tags_all=["Cliente", "Amigo"])), {"ana"})
+        self.assertEqual(self.members(Segment(tags_none=["Amigo"])), {"beto", "dani"})
+        self.assertEqual(self.members(Segment(tags_any=[self.tag_ids["Amigo"]], tags_none=["Proveedor"])), {"ana"})
+        self.assertEqual(self.members(Segment(exclude_restricted=True)), {"ana", "carla", "dani"})
+
+    def test_contact_field_criteria(self):
+        self.assertEqual(self.members(Segment(status="Inactivo")), {"beto"})
+        self.assertEqual(self.members(Segment(is_phone_verified=True)), {"ana"})
+        # No verificado incluye los valores nulos heredados
+        self.assertEqual(self.members(Segment(is_phone_verified=False)), {"beto", "carla", "dani"})
+        self.assertEqual(self.members(Segment(missing_phone=True)), {"beto"})
+        self.assertEqual(self.members(Segment(missing_email=True)), {"beto", "carla"})
+        self.assertEqual(self.members(Segment(missing_birthdate=True)), {"dani"})
+        self.assertEqual(self.members(Segment(city="CARACAS")), {"ana", "beto"})
+        self.assertEqual(self.members(Segment(country="españa")), {"carla"})
+
+    def test_date_criteria(self):
+        self.assertEqual(self.members(Segment(last_contact_within=10)), {"ana"})
+        # Sin contacto en 30 días incluye a quien nunca fue contactado
+        self.assertEqual(self.members(Segment(last_contact_older_than=30)), {"beto", "carla"})
+        # La ventana cruza el año: 30-dic y 02-ene (formato sin año)
+        self.assertEqual(self.members(Segment(birthday_within=7)), {"ana", "beto"})
+        self.assertEqual(self.members(Segment(birthday_within=1)), set())
+        self.assertEqual(self.members(Segment(birthday_within=365)), {"ana", "beto", "carla"})
+
+    def test_criteria_are_combined(self):
+        segment = Segment(tags_any=["Cliente"], exclude_restricted=True, city="caracas")
+        self.assertEqual(self.members(segment), {"ana"})
+        self.assertEqual(self.members(Segment()), set(self.ids))
+
+    def test_round_trip_through_json(self):
+        segment = Segment(tags_all=["Cliente", 3], missing_email=True, birthday_within=15,
+                          status=ContactStatus.ACTIVE)
+        data = json.loads(json.dumps(segment.to_dict()))
+        self.assertEqual(data, {"tags_all": ["Cliente", 3], "status": "Activo",
+                                "missing_email": True, "birthday_within": 15})
+        self.assertEqual(Segment.from_dict(data), segment)
+        self.assertTrue(Segment().is_empty())
+
+    def test_invalid_criteria_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Segment(tags=["Cliente"])
+        with self.assertRaises(ValueError):
+            Segment.coerce(Segment(), tag_ids=[1])
+
+    def test_repository_methods_accept_segments(self):
+        segment = Segment(tags_any=["Amigo"])
+        self.assertEqual(ContactRepository.count_filtered(segment=segment), 2)
+        self.assertEqual(ContactRepository.get_segment_ids(segment), sorted([self.ids["ana"], self.ids["carla"]]))
+        contacts = ContactRepository.get_filtered(segment=segment, with_tags=True)
+        self.assertEqual({c.first_name for c in contacts}, {"Ana", "Carla"})
+        rows = list(ContactRepository.iter_report_rows(segment=segment))
+        self.assertEqual([r.first_name for r in rows], ["Ana", "Carla"])
+        # Los filtros clásicos siguen funcionando
+        self.assertEqual(ContactRepository.count_filtered(tag_ids=[self.tag_ids["Cliente"]], missing_phone=True), 1)
+
+
+class TestSegmentQueryPlans(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.patcher = patch('src.database.repositories.engine', self.engine)
+        self.patcher.start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            contacts = [Contact(first_name=f"C{i}", last_name="Plan") for i in range(300)]
+            tags = [TagType(name=f"Etiqueta {i}", is_restricted=(i == 0)) for i in range(10)]
+            session.add_all(contacts + tags)
+            session.flush()
+            for i, contact in enumerate(contacts):
+                session.add_all([
+                    ContactTag(contact_id=contact.rowid, tag_type_id=tags[i % 10].id),
+                    ContactTag(contact_id=contact.rowid, tag_type_id=tags[(i + 3) % 10].id),
+                ])
+            session.commit()
+            self.tag_ids = [t.id for t in tags]
+        with self.engine.begin() as connection:
+            connection.execute(text("ANALYZE"))
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def capture(self, call):
+        statements = []
+
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append((statement, parameters))
+
+        event.listen(self.engine, "before_cursor_execute", listener)
+        try:
+            call()
+        finally:
+            event.remove(self.engine, "before_cursor_execute", listener)
+        self.assertTrue(statements)
+        plans = []
+        with self.engine.connect() as connection:
+            raw = connection.connection.dbapi_connection
+            for statement, parameters in statements:
+                rows = raw.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                plans.append(" | ".join(row[-1] for row in rows))
+        return [statement for statement, _ in statements], " || ".join(plans)
+
+    def test_tag_criteria_use_semi_joins_on_the_link_index(self):
+        segment = Segment(
+            tags_all=[self.tag_ids[1], self.tag_ids[4]],
+            tags_any=[self.tag_ids[1], "Etiqueta 2"],
+            tags_none=[self.tag_ids[5]],
+            exclude_restricted=True,
+        )
+        statements, plan = self.capture(lambda: ContactRepository.count_filtered(segment=segment))
+        self.assertIn("EXISTS", statements[0])
+        self.assertNotIn("DISTINCT", statements[0])
+        self.assertIn("uq_contact_tags_contact_tag", plan)
+        self.assertNotRegex(plan, r"SCAN contact_tags(?! USING)")
+
+    def test_report_and_export_queries_do_not_use_distinct(self):
+        segment = Segment(tags_any=[self.tag_ids[2]], missing_email=True)
+        for call in (
+            lambda: ContactRepository.get_filtered(segment=segment, with_tags=True),
+            lambda: list(ContactRepository.iter_report_rows(segment=segment)),
+            lambda: list(ContactRepository.iter_export_batches(["first_name", "tags"], segment=segment)),
+        ):
+            statements, plan = self.capture(call)
+            self.assertFalse(any("DISTINCT" in statement for statement in statements))
+            self.assertNotRegex(plan, r"SCAN contact_tags(?! USING)")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import unittest
+import sys
+import os
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact
+from src.models.tag import TagType, ContactTag
+from src.models.campaign import CampaignStatus, MessageStatus
+from src.database.repositories import CampaignRepository, ContactCountCache
+from src.services.campaign_service import CampaignService
+from src.services.send_scheduler import SendScheduler, TokenBucket
+from src.services.waha_service import WahaService
+
+
+class StubWaha(ThreadingHTTPServer):
+    """Servidor WAHA mínimo en local que registra los mensajes recibidos"""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubWahaHandler)
+        self.sent = []  # (instante, sesión, chatId)
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StubWahaHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.sent.append((time.monotonic(), body["session"], body["chatId"]))
+        payload = json.dumps({"id": f"msg-{len(self.server.sent)}"}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSendScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.waha = StubWaha()
+        patch('src.database.repositories.engine', self.engine).start()
+        patch.object(WahaService, 'BASE_URL', self.waha.url).start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            tag = TagType(name="Cliente")
+            contacts = [Contact(first_name=f"C{i}", last_name="Plan", phone_1=f"58414{i:07d}") for i in range(10)]
+            session.add_all(contacts + [tag])
+            session.flush()
+            session.add_all([ContactTag(contact_id=c.rowid, tag_type_id=tag.id) for c in contacts])
+            session.commit()
+        self.campaign = CampaignService.create_campaign("Cliente", "Hola [$nombre]")
+
+    def tearDown(self):
+        patch.stopall()
+        self.waha.close()
+        self.engine.dispose()
+
+    def scheduler(self, sessions=("s1", "s2"), interval=0.05, daily_cap=100):
+        return SendScheduler(
+            sessions,
+            lambda chat_id, text, waha_session: WahaService.send_text(chat_id, text, session=waha_session),
+            interval=interval, jitter=0, daily_cap=daily_cap
+        )
+
+    def test_messages_are_spread_across_sessions_at_their_rate(self):
+        results = list(CampaignService.run_campaign(self.campaign.id, self.scheduler()))
+        self.assertEqual(results[-1][:2], (10, 10))
+        self.assertEqual(len({chat_id for _, _, chat_id in self.waha.sent}), 10)
+
+        by_session = {}
+        for instant, waha_session, _ in self.waha.sent:
+            by_session.setdefault(waha_session, []).append(instant)
+        self.assertEqual(set(by_session), {"s1", "s2"})
+        for instants in by_session.values():
+            self.assertGreaterEqual(len(instants), 3)
+            # Ritmo medio de la sesión: un mensaje cada 0.05 s como mucho
+            self.assertGreaterEqual(instants[-1] - instants[0], (len(instants) - 1) * 0.05 - 0.02)
+        self.assertEqual(CampaignRepository.get_by_id(self.campaign.id).status, CampaignStatus.COMPLETED)
+
+    def test_daily_cap_leaves_the_campaign_resumable(self):
+        results = list(CampaignService.run_campaign(self.campaign.id, self.scheduler(interval=0, daily_cap=2)))
+        self.assertEqual(len(self.waha.sent), 4)
+        self.assertIn("Límite diario", results[-1][2])
+        self.assertEqual(CampaignRepository.get_progress(self.campaign.id)[MessageStatus.PENDING], 6)
+
+        # El límite cuenta lo ya enviado hoy por cada sesión, también en otra ejecución
+        list(CampaignService.run_campaign(self.campaign.id, self.scheduler(interval=0, daily_cap=2)))
+        self.assertEqual(len(self.waha.sent), 4)
+
+        list(CampaignService.run_campaign(self.campaign.id, self.scheduler(sessions=("s3",), interval=0)))
+        self.assertEqual(len(self.waha.sent), 10)
+        self.assertEqual(CampaignRepository.get_by_id(self.campaign.id).status, CampaignStatus.COMPLETED)
+
+    def test_pause_and_resume(self):
+        scheduler = self.scheduler(sessions=("s1",), interval=0.02)
+        run = CampaignService.run_campaign(self.campaign.id, scheduler)
+        next(run)
+        next(run)
+        scheduler.pause()
+        time.sleep(0.15)
+        sent_while_paused = len(self.waha.sent)
+        time.sleep(0.15)
+        self.assertTrue(scheduler.paused)
+        self.assertEqual(len(self.waha.sent), sent_while_paused)
+        self.assertLessEqual(sent_while_paused, 2)
+
+        threading.Timer(0.05, scheduler.resume).start()
+        list(run)
+        self.assertEqual(len(self.waha.sent), 10)
+
+    def test_stop_keeps_pending_messages(self):
+        scheduler = self.scheduler(sessions=("s1",), interval=0.02)
+        run = CampaignService.run_campaign(self.campaign.id, scheduler)
+        next(run)
+        next(run)
+        scheduler.stop()
+        results = list(run)
+        self.assertEqual(results[-1][2], "Campaña detenida; se puede reanudar más tarde")
+        progress = CampaignRepository.get_progress(self.campaign.id)
+        self.assertEqual(progress[MessageStatus.SENT], len(self.waha.sent))
+        self.assertNotIn(MessageStatus.SENDING, progress)
+        self.assertEqual(CampaignRepository.get_by_id(self.campaign.id).status, CampaignStatus.RUNNING)
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_reservations_keep_the_rate(self):
+        now = [100.0]
+        bucket = TokenBucket(rate=0.5, capacity=1, clock=lambda: now[0])
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 2.0)
+        self.assertEqual(bucket.reserve(), 4.0)
+        now[0] += 10  # Tras una pausa larga no se acumula más de capacity
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 2.0)
+        self.assertEqual(TokenBucket(rate=None).reserve(), 0.0)
+
+    def test_projected_finish(self):
+        scheduler = SendScheduler(["s1", "s2"], send=None, interval=10, jitter=0, daily_cap=100)
+        now = datetime(2026, 10, 18, 20, 0, 0)
+        scheduler.remaining = 60
+        self.assertEqual(scheduler.projected_finish(now), datetime(2026, 10, 18, 20, 5, 0))
+        # 200 caben hoy; los 50 restantes, mañana desde medianoche
+        scheduler.remaining = 250
+        self.assertEqual(scheduler.projected_finish(now), datetime(2026, 10, 19, 0, 4, 10))
+
+if __name__ == '__main__':
+    unittest.main()
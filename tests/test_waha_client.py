@@ -0,0 +1,242 @@
+import unittest
+import sys
+import os
+import json
+import socket
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest.mock import patch
+import requests
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact
+from src.models.tag import TagType, ContactTag
+from src.models.campaign import CampaignStatus, MessageStatus
+from src.database.repositories import CampaignRepository, ContactCountCache
+from src.services.campaign_service import CampaignService
+from src.services.send_scheduler import SendScheduler
+from src.services.waha_client import WahaClient, CircuitBreaker, WahaUnavailableError
+from src.services.waha_service import WahaService
+
+
+class StubWaha(ThreadingHTTPServer):
+    """
+    Servidor WAHA en local. responses es la lista de respuestas a dar en orden
+    (código HTTP, o ("sleep", segundos) para tardar en contestar); agotada, responde 200.
+    """
+
+    def __init__(self, responses=()):
+        super().__init__(("127.0.0.1", 0), StubWahaHandler)
+        self.responses = list(responses)
+        self.requests = []  # (método, ruta, puerto del cliente)
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def next_response(self, method, path, client_port):
+        with self.lock:
+            self.requests.append((method, path, client_port))
+            return self.responses.pop(0) if self.responses else 200
+
+    def handle_error(self, request, client_address):
+        pass  # El cliente cerró la conexión por tiempo agotado
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StubWahaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        response = self.server.next_response(self.command, self.path, self.client_address[1])
+        if isinstance(response, tuple):
+            time.sleep(response[1])
+            response = 200
+        payload = json.dumps({"status": response}).encode()
+        self.send_response(response)
+        if response == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = respond
+    do_POST = respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+def closed_port_url():
+    """URL de un puerto local en el que no escucha nadie"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+class TestWahaClient(unittest.TestCase):
+
+    def setUp(self):
+        self.waha = StubWaha()
+
+    def tearDown(self):
+        self.waha.close()
+
+    def client(self, **kwargs):
+        options = dict(connect_timeout=1, read_timeout=1, max_retries=2, backoff_base=0.01, backoff_max=0.05)
+        options.update(kwargs)
+        return WahaClient(**options)
+
+    def test_connections_are_reused(self):
+        client = self.client()
+        for _ in range(5):
+            client.request("GET", f"{self.waha.url}/api/sessions", "sessions")
+        self.assertEqual(len({port for _, _, port in self.waha.requests}), 1)
+        client.close()
+
+    def test_retryable_statuses_are_retried_with_backoff(self):
+        self.waha.responses = [503, 502, 200]
+        client = self.client()
+        response = client.request("GET", f"{self.waha.url}/api/sessions", "sessions")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.waha.requests), 3)
+        metrics = client.metrics()["sessions"]
+        self.assertEqual((metrics["requests"], metrics["errors"], metrics["retries"]), (3, 2, 2))
+
+        # Sin reintentos disponibles se propaga el error
+        self.waha.responses = [500, 500, 500]
+        with self.assertRaises(requests.HTTPError):
+            client.request("GET", f"{self.waha.url}/api/sessions", "sessions")
+
+    def test_send_is_only_retried_when_not_processed(self):
+        client = self.client()
+        self.waha.responses = [429, 200]
+        client.request("POST", f"{self.waha.url}/api/sendText", "sendText", idempotent=False, json={})
+        self.assertEqual(len(self.waha.requests), 2)
+
+        # Un 500 pudo haber enviado el mensaje: no se repite
+        self.waha.responses = [500]
+        with self.assertRaises(requests.HTTPError):
+            client.request("POST", f"{self.waha.url}/api/sendText", "sendText", idempotent=False, json={})
+        self.assertEqual(len(self.waha.requests), 3)
+
+    def test_read_timeout(self):
+        self.waha.responses = [("sleep", 0.5), 200]
+        client = self.client(read_timeout=0.2)
+        self.assertEqual(client.request("GET", f"{self.waha.url}/api/sessions", "sessions").status_code, 200)
+
+        self.waha.responses = [("sleep", 0.5)]
+        with self.assertRaises(requests.Timeout):
+            client.request("POST", f"{self.waha.url}/api/sendText", "sendText", idempotent=False, json={})
+
+    def test_circuit_breaker_opens_and_recovers(self):
+        client = self.client(max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.2))
+        down = closed_port_url()
+        for _ in range(2):
+            with self.assertRaises(requests.ConnectionError):
+                client.request("GET", f"{down}/api/sessions", "sessions")
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+        # Abierto: ni siquiera se intenta
+        with self.assertRaises(WahaUnavailableError) as raised:
+            client.request("GET", f"{self.waha.url}/api/sessions", "sessions")
+        self.assertLessEqual(raised.exception.retry_after, 0.2)
+        self.assertEqual(self.waha.requests, [])
+
+        time.sleep(0.25)
+        client.request("GET", f"{self.waha.url}/api/sessions", "sessions")
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_trial_ending_without_result_is_released(self):
+        client = self.client(max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+        client.breaker.record_failure()
+        time.sleep(0.1)
+
+        # La prueba falla por algo ajeno a WAHA: no cuenta, pero tampoco la deja ocupada
+        with patch.object(client.session, 'request', side_effect=RuntimeError("fallo local")):
+            with self.assertRaises(RuntimeError):
+                client.request("GET", f"{self.waha.url}/api/sessions", "sessions")
+        self.assertEqual(client.breaker.state, CircuitBreaker.HALF_OPEN)
+        client.request("GET", f"{self.waha.url}/api/sessions", "sessions")
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_service_metrics_per_endpoint(self):
+        with patch.object(WahaService, 'BASE_URL', self.waha.url), \
+             patch.object(WahaService, '_client', self.client()):
+            WahaService.get_sessions()
+            WahaService.get_status()
+            WahaService.check_number_status("584141234567")
+            WahaService.send_text("584141234567@c.us", "Hola")
+            metrics = WahaService.metrics()
+        self.assertEqual(set(metrics), {"sessions", "sessions/{session}", "contacts/check-exists", "sendText"})
+        self.assertTrue(all(m["requests"] == 1 and m["max_ms"] > 0 for m in metrics.values()))
+
+
+class TestCampaignPausesWhenWahaIsDown(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        # El primer envío falla y abre el cortocircuito durante 0.3 s
+        self.waha = StubWaha([500])
+        client = WahaClient(max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.3))
+        patch('src.database.repositories.engine', self.engine).start()
+        patch.object(WahaService, 'BASE_URL', self.waha.url).start()
+        patch.object(WahaService, '_client', client).start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            tag = TagType(name="Cliente")
+            contacts = [Contact(first_name=f"C{i}", last_name="Caida", phone_1=f"58414{i:07d}") for i in range(4)]
+            session.add_all(contacts + [tag])
+            session.flush()
+            session.add_all([ContactTag(contact_id=c.rowid, tag_type_id=tag.id) for c in contacts])
+            session.commit()
+
+    def tearDown(self):
+        patch.stopall()
+        self.waha.close()
+        self.engine.dispose()
+
+    def test_campaign_waits_for_waha_and_resumes(self):
+        campaign = CampaignService.create_campaign("Cliente", "Hola [$nombre]")
+        scheduler = SendScheduler(
+            ["s1"],
+            lambda chat_id, text, waha_session: WahaService.send_text(chat_id, text, session=waha_session),
+            interval=0, jitter=0, daily_cap=100
+        )
+        started = time.monotonic()
+        results = [message for _, _, message in CampaignService.run_campaign(campaign.id, scheduler)]
+        self.assertGreaterEqual(time.monotonic() - started, 0.25)
+        self.assertTrue(any(message.startswith("WAHA no disponible") for message in results))
+
+        # Solo falla el mensaje que recibió el 500; los rechazados por el cortocircuito se envían después
+        progress = CampaignRepository.get_progress(campaign.id)
+        self.assertEqual(progress, {MessageStatus.FAILED: 1, MessageStatus.SENT: 3})
+        self.assertEqual(len(self.waha.requests), 4)
+        self.assertEqual(CampaignRepository.get_by_id(campaign.id).status, CampaignStatus.COMPLETED)
+
+
+if __name__ == '__main__':
+    unittest.main()
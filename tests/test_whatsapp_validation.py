@@ -0,0 +1,155 @@
+import unittest
+import sys
+import os
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest.mock import patch
+from sqlalchemy import create_engine, select
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.base import Base
+from src.models.contact import Contact
+from src.models.whatsapp_status import WhatsAppStatus
+from src.database.repositories import WhatsAppStatusRepository, ContactCountCache
+from src.services.async_waha_service import AsyncWahaService
+from src.services.whatsapp_validation_service import WhatsAppValidationService
+
+
+class CheckExistsWaha(ThreadingHTTPServer):
+    """
+    Servidor WAHA en local para contacts/check-exists: los números que terminan
+    en 0 no tienen WhatsApp y los que terminan en 9 devuelven error.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), CheckExistsHandler)
+        self.checked = []  # (instante, número)
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class CheckExistsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        phone = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["phone"]
+        with self.server.lock:
+            self.server.checked.append((time.monotonic(), phone))
+        status = 400 if phone.endswith("9") else 200
+        payload = json.dumps({"numberExists": not phone.endswith("0"), "chatId": f"{phone}@c.us"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestWhatsAppValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.waha = CheckExistsWaha()
+        patch('src.database.repositories.engine', self.engine).start()
+        patch.object(AsyncWahaService, 'BASE_URL', self.waha.url).start()
+        ContactCountCache.invalidate()
+
+        with Session(self.engine) as session:
+            self.contacts = {
+                "whatsapp": Contact(first_name="Con", last_name="WhatsApp", phone_1="0414-111-1111"),
+                "none": Contact(first_name="Sin", last_name="WhatsApp", phone_1="0414-222-2220"),
+                # El segundo teléfono tiene WhatsApp aunque el primero no
+                "second": Contact(first_name="Segundo", last_name="Tlf", phone_1="4143333330", phone_2="+584143333331"),
+                # Mismo número que "whatsapp": se consulta una vez
+                "shared": Contact(first_name="Mismo", last_name="Numero", phone_1="+58 414 111 1111"),
+                "invalid": Contact(first_name="Numero", last_name="Invalido", phone_1="123", is_phone_verified=True),
+                "error": Contact(first_name="Con", last_name="Error", phone_1="04144444449", is_phone_verified=True),
+            }
+            session.add_all(self.contacts.values())
+            session.commit()
+            self.ids = {key: contact.rowid for key, contact in self.contacts.items()}
+
+    def tearDown(self):
+        patch.stopall()
+        self.waha.close()
+        self.engine.dispose()
+
+    def verified(self):
+        with Session(self.engine) as session:
+            rows = session.execute(select(Contact.rowid, Contact.is_phone_verified)).all()
+        by_id = dict(rows)
+        return {key: by_id[contact_id] for key, contact_id in self.ids.items()}
+
+    def test_validation_checks_normalized_numbers_and_marks_contacts(self):
+        progress = list(WhatsAppValidationService.validate(self.ids.values(), rate=0))
+        self.assertEqual(progress[-1][:2], (5, 5))
+        self.assertIn("3 contactos con WhatsApp, 1 sin WhatsApp, 1 errores", progress[-1][2])
+        self.assertEqual(sorted(phone for _, phone in self.waha.checked), [
+            "584141111111", "584142222220", "584143333330", "584143333331", "584144444449"
+        ])
+        self.assertEqual(self.verified(), {
+            "whatsapp": True, "none": False, "second": True, "shared": True,
+            "invalid": True, "error": True,  # Sin resultado no se cambia
+        })
+
+        with Session(self.engine) as session:
+            cached = {row.phone: (row.exists, row.chat_id) for row in session.scalars(select(WhatsAppStatus))}
+        self.assertEqual(len(cached), 4)
+        self.assertEqual(cached["+584142222220"], (False, "584142222220@c.us"))
+
+    def test_recent_results_are_not_checked_again(self):
+        list(WhatsAppValidationService.validate(self.ids.values(), rate=0))
+        checked = len(self.waha.checked)
+
+        progress = list(WhatsAppValidationService.validate(self.ids.values(), rate=0))
+        self.assertIn("4 verificados recientemente", progress[0][2])
+        # Solo se repite el que dio error
+        self.assertEqual([phone for _, phone in self.waha.checked[checked:]], ["584144444449"])
+
+        list(WhatsAppValidationService.validate([self.ids["none"]], force=True, rate=0))
+        self.assertEqual(self.waha.checked[-1][1], "584142222220")
+
+    def test_expired_results_are_checked_again(self):
+        expired = (datetime.now() - timedelta(days=31)).strftime("%Y-%m-%d %H:%M:%S")
+        WhatsAppStatusRepository.save([
+            {"phone": "+584142222220", "exists": True, "chat_id": None, "checked_at": expired}
+        ])
+        list(WhatsAppValidationService.validate([self.ids["none"]], rate=0))
+        self.assertEqual([phone for _, phone in self.waha.checked], ["584142222220"])
+        self.assertFalse(self.verified()["none"])
+        with Session(self.engine) as session:
+            row = session.scalars(select(WhatsAppStatus)).one()
+            self.assertGreater(row.checked_at, expired)
+
+    def test_checks_respect_the_rate(self):
+        started = time.monotonic()
+        list(WhatsAppValidationService.validate(self.ids.values(), rate=20))
+        # 5 consultas a 20 por segundo: la última sale 4 intervalos de 0.05 s después de la primera
+        self.assertGreaterEqual(max(instant for instant, _ in self.waha.checked) - started, 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()